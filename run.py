@@ -10,7 +10,7 @@ import sys
 # Add the src directory to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from app import app
+from app import app, init_database
 from config.config import config
 
 def main():
@@ -38,6 +38,9 @@ def main():
     print(f"📝 Registration: http://localhost:{app_config.PORT}/register")
     print("=" * 60)
     
+    # Local runs get the schema and demo data without a separate init-db step
+    init_database()
+    
     # Run the application
     app.run(
         host=app_config.HOST,
@@ -1,15 +1,80 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
-import sqlite3
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, Response, stream_with_context, send_file
+from werkzeug.security import check_password_hash
 from functools import wraps
+import io
 import os
-from datetime import datetime, date
+import sys
+import uuid
+from datetime import datetime
 
-app = Flask(__name__)
-# Use an environment variable for the secret key in production. Keep a fallback for local development.
-app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-change-me')
+# Make sibling packages (config, database) importable whether we are loaded as `src.app` or `app`
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-DATABASE = os.path.join(os.path.dirname(__file__), 'staffsync.db')  # Database file located next to app.py
+from config.config import config
+from database import connection as db
+from database import demo
+from database import migrate
+from services import analytics
+from services import archive
+from services import attendance as attendance_ingest
+from services.cache import LRUCache
+from services import departments
+from services import employee_import
+from services import etags
+from services import export as exporter
+from services import job_handlers  # noqa: F401  (registers the background job kinds)
+from services import jobs
+from services import leave
+from services import metrics
+from services import notifications
+from services import pagination
+from services import passwords
+from services import payroll as payroll_engine
+from services import search as employee_search
+from services import settings
+from services import stats
+import commands
+
+def create_app(config_name=None):
+    """Build and configure the application for ``config_name`` (default: FLASK_ENV).
+
+    Nothing is created or seeded here; the only database access is a read of the
+    schema version (see ``check_schema``). Use ``flask staffsync init-db`` and
+    ``seed-demo`` to prepare the database.
+    """
+    flask_app = Flask(__name__)
+    flask_app.config.from_object(config.get(config_name or os.environ.get('FLASK_ENV', 'development'),
+                                            config['default']))
+    # Use an environment variable for the secret key in production. Keep a fallback for local development.
+    flask_app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-change-me')
+
+    # A relative DATABASE_PATH is next to app.py, where the database has always lived
+    flask_app.config['DATABASE'] = os.path.join(flask_app.root_path, flask_app.config['DATABASE_PATH'])
+    db.init_app(flask_app)
+    commands.init_app(flask_app)
+    passwords.init_app(flask_app)
+    metrics.init_app(flask_app)
+    jobs.init_app(flask_app)
+    notifications.init_app(flask_app)
+    settings.init_app(flask_app)
+    analytics.init_app(flask_app)
+
+    check_schema(flask_app)
+    return flask_app
+
+def check_schema(flask_app):
+    """Warn when the database is behind the migrations. Returns ``(current, latest)``.
+
+    One read-only query, so every worker can afford it at boot; workers never
+    migrate on their own, which used to race when several started together.
+    """
+    current, latest = migrate.schema_status(flask_app.config['DATABASE'])
+    if current < latest:
+        flask_app.logger.warning('Database schema is at version %s but the code expects %s; '
+                                 'run `flask staffsync init-db`.', current, latest)
+    return current, latest
+
+app = create_app()
 
 # Decorators
 def login_required(f):
@@ -29,209 +94,104 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Sortable columns for the admin list pages, mapped to the indexed expressions they order by
+EMPLOYEE_SORTS = {
+    'id': 'id',
+    'name': 'first_name',
+    'email': 'email',
+    'department': "IFNULL(department, '')",
+    'position': "IFNULL(position, '')",
+    'salary': 'IFNULL(salary, 0)',
+    'status': "IFNULL(status, '')",
+}
+
+PAYROLL_SORTS = {
+    'created': "IFNULL(p.created_at, '')",
+    'period': 'p.pay_period_start',
+    'gross': 'IFNULL(p.gross_pay, 0)',
+    'net': 'IFNULL(p.net_pay, 0)',
+}
+
+@app.template_global()
+def list_url(**changes):
+    """URL of the current page with some query arguments replaced; None or '' drops one."""
+    args = request.args.to_dict()
+    args.update(changes)
+    args = {key: value for key, value in args.items() if value not in (None, '')}
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
 # Database functions
 def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Pooled connection for the current request (read-only for GET and HEAD); released in teardown."""
+    return db.get_db_connection()
 
-def init_database():
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    
-    # Create tables
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT NOT NULL,
-            password_hash TEXT NOT NULL,
-            role TEXT NOT NULL DEFAULT 'staff',
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS employees (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            first_name TEXT NOT NULL,
-            last_name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            phone TEXT,
-            position TEXT,
-            department TEXT,
-            salary REAL DEFAULT 0,
-            hire_date TEXT,
-            status TEXT DEFAULT 'Active'
-        )
-    ''')
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS attendance (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            employee_id INTEGER,
-            date TEXT NOT NULL,
-            check_in_time TEXT,
-            check_out_time TEXT,
-            total_hours REAL DEFAULT 0,
-            overtime_hours REAL DEFAULT 0,
-            status TEXT DEFAULT 'Present',
-            notes TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (employee_id) REFERENCES employees (id)
-        )
-    ''')
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS payroll (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            employee_id INTEGER,
-            pay_period_start TEXT NOT NULL,
-            pay_period_end TEXT NOT NULL,
-            basic_salary REAL DEFAULT 0,
-            overtime_pay REAL DEFAULT 0,
-            allowances REAL DEFAULT 0,
-            gross_pay REAL DEFAULT 0,
-            tax_deduction REAL DEFAULT 0,
-            other_deductions REAL DEFAULT 0,
-            total_deductions REAL DEFAULT 0,
-            net_pay REAL DEFAULT 0,
-            status TEXT DEFAULT 'draft',
-            processed_at TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (employee_id) REFERENCES employees (id)
-        )
-    ''')
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS leaves (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            employee_id INTEGER,
-            leave_type TEXT NOT NULL,
-            start_date TEXT NOT NULL,
-            end_date TEXT NOT NULL,
-            days_count INTEGER,
-            reason TEXT,
-            status TEXT DEFAULT 'pending',
-            applied_date TEXT DEFAULT CURRENT_TIMESTAMP,
-            approved_by INTEGER,
-            approved_date TEXT,
-            FOREIGN KEY (employee_id) REFERENCES employees (id),
-            FOREIGN KEY (approved_by) REFERENCES users (id)
-        )
-    ''')
-    
-    # Insert demo data if tables are empty
-    if c.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0:
-        # Admin user
-        admin_hash = generate_password_hash('admin123')
-        c.execute("INSERT INTO users (username, email, password_hash, role) VALUES (?, ?, ?, ?)",
-                 ('admin', 'admin@staffsync.com', admin_hash, 'admin'))
-        
-        # Staff users
-        staff_users = [
-            ('john.doe', 'john.doe@staffsync.com', 'pass123'),
-            ('jane.smith', 'jane.smith@staffsync.com', 'pass123'),
-            ('mike.johnson', 'mike.johnson@staffsync.com', 'pass123'),
-            ('sarah.wilson', 'sarah.wilson@staffsync.com', 'pass123'),
-            ('david.brown', 'david.brown@staffsync.com', 'pass123')
-        ]
-        
-        for username, email, password in staff_users:
-            password_hash = generate_password_hash(password)
-            c.execute("INSERT INTO users (username, email, password_hash, role) VALUES (?, ?, ?, ?)",
-                     (username, email, password_hash, 'staff'))
-    
-    if c.execute("SELECT COUNT(*) FROM employees").fetchone()[0] == 0:
-        employees_data = [
-            ('John', 'Doe', 'john.doe@staffsync.com', '555-0101', 'Software Developer', 'IT', 75000, '2023-01-15', 'Active'),
-            ('Jane', 'Smith', 'jane.smith@staffsync.com', '555-0102', 'HR Manager', 'Human Resources', 65000, '2023-02-01', 'Active'),
-            ('Mike', 'Johnson', 'mike.johnson@staffsync.com', '555-0103', 'Sales Representative', 'Sales', 55000, '2023-03-10', 'Active'),
-            ('Sarah', 'Wilson', 'sarah.wilson@staffsync.com', '555-0104', 'Accountant', 'Finance', 60000, '2023-01-20', 'Active'),
-            ('David', 'Brown', 'david.brown@staffsync.com', '555-0105', 'Marketing Specialist', 'Marketing', 58000, '2023-04-05', 'Active'),
-            ('Emily', 'Davis', 'emily.davis@staffsync.com', '555-0106', 'Designer', 'Creative', 62000, '2023-05-12', 'Active'),
-            ('Robert', 'Miller', 'robert.miller@staffsync.com', '555-0107', 'Project Manager', 'IT', 80000, '2023-01-08', 'Active'),
-            ('Lisa', 'Garcia', 'lisa.garcia@staffsync.com', '555-0108', 'Customer Service', 'Support', 45000, '2023-06-15', 'Active'),
-            ('James', 'Wilson', 'james.wilson@staffsync.com', '555-0109', 'Data Analyst', 'IT', 70000, '2023-02-28', 'Active'),
-            ('Amanda', 'Taylor', 'amanda.taylor@staffsync.com', '555-0110', 'Operations Manager', 'Operations', 75000, '2023-03-22', 'Active')
-        ]
-        
-        for emp in employees_data:
-            c.execute("""INSERT INTO employees 
-                        (first_name, last_name, email, phone, position, department, salary, hire_date, status) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", emp)
-    
-    # Add attendance records
-    if c.execute("SELECT COUNT(*) FROM attendance").fetchone()[0] == 0:
-        today = datetime.now().strftime('%Y-%m-%d')
-        from datetime import timedelta
-        yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-        
-        attendance_data = [
-            # Today's attendance - mixed scenarios
-            (1, today, '09:00', '17:00', 8.0, 0.0, 'present', 'On time'),
-            (2, today, '09:15', '17:30', 8.25, 0.25, 'late', 'Late arrival'),
-            (3, today, '08:45', '18:00', 9.25, 1.25, 'present', 'Early arrival, overtime'),
-            (4, today, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular hours'),
-            (5, today, '09:30', '17:00', 7.5, 0.0, 'late', 'Late arrival'),
-            (6, today, '09:00', None, 0.0, 0.0, 'present', 'Currently working'),
-            (7, today, '09:00', '13:00', 4.0, 0.0, 'half_day', 'Half day leave'),
-            (8, today, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular hours'),
-            (9, today, None, None, 0.0, 0.0, 'absent', 'Sick leave'),
-            (10, today, '08:30', '17:30', 9.0, 1.0, 'present', 'Overtime'),
-            
-            # Yesterday's attendance - full day records
-            (1, yesterday, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular day'),
-            (2, yesterday, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular day'),
-            (3, yesterday, '08:45', '17:15', 8.5, 0.5, 'present', 'Extra work'),
-            (4, yesterday, '09:15', '17:00', 7.75, 0.0, 'late', 'Late start'),
-            (5, yesterday, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular day'),
-            (6, yesterday, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular day'),
-            (7, yesterday, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular day'),
-            (8, yesterday, None, None, 0.0, 0.0, 'absent', 'Personal leave'),
-            (9, yesterday, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular day'),
-            (10, yesterday, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular day')
-        ]
-        
-        for emp_id, date, check_in, check_out, total_hours, overtime_hours, status, notes in attendance_data:
-            c.execute("""INSERT INTO attendance 
-                        (employee_id, date, check_in_time, check_out_time, total_hours, overtime_hours, status, notes) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                     (emp_id, date, check_in, check_out, total_hours, overtime_hours, status, notes))
-    
-    # Add payroll records
-    if c.execute("SELECT COUNT(*) FROM payroll").fetchone()[0] == 0:
-        payroll_data = [
-            # October 2024 payroll
-            (1, '2024-10-01', '2024-10-31', 75000/12, 500, 750, 500, 150, 650, 0, 'processed'),
-            (2, '2024-10-01', '2024-10-31', 65000/12, 200, 650, 400, 120, 520, 0, 'processed'),
-            (3, '2024-10-01', '2024-10-31', 55000/12, 300, 550, 350, 100, 450, 0, 'paid'),
-            (4, '2024-10-01', '2024-10-31', 60000/12, 150, 600, 375, 110, 485, 0, 'paid'),
-            (5, '2024-10-01', '2024-10-31', 58000/12, 250, 580, 360, 105, 465, 0, 'processed'),
-            
-            # September 2024 payroll (completed)
-            (1, '2024-09-01', '2024-09-30', 75000/12, 600, 750, 550, 160, 710, 0, 'paid'),
-            (2, '2024-09-01', '2024-09-30', 65000/12, 150, 650, 420, 125, 545, 0, 'paid'),
-            (3, '2024-09-01', '2024-09-30', 55000/12, 400, 550, 380, 110, 490, 0, 'paid'),
-            (4, '2024-09-01', '2024-09-30', 60000/12, 200, 600, 400, 120, 520, 0, 'paid'),
-            (5, '2024-09-01', '2024-09-30', 58000/12, 300, 580, 390, 115, 505, 0, 'paid'),
-        ]
-        
-        for emp_id, start_date, end_date, basic_salary, overtime_pay, allowances, tax_deduction, other_deductions, total_deductions, net_pay, status in payroll_data:
-            gross_pay = basic_salary + overtime_pay + allowances
-            net_pay = gross_pay - total_deductions
-            
-            c.execute("""INSERT INTO payroll 
-                        (employee_id, pay_period_start, pay_period_end, basic_salary, overtime_pay, allowances, 
-                         gross_pay, tax_deduction, other_deductions, total_deductions, net_pay, status) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                     (emp_id, start_date, end_date, basic_salary, overtime_pay, allowances, 
-                      gross_pay, tax_deduction, other_deductions, total_deductions, net_pay, status))
+def current_settings():
+    """Company and system settings from the per-process cache."""
+    return settings.current(get_db_connection())
+
+@app.template_global()
+def currency_symbol():
+    return settings.currency_symbol(current_settings())
+
+@app.template_filter()
+def money(value, places=2):
+    """An amount with the configured currency symbol, e.g. ``$1,234.50``."""
+    return f'{currency_symbol()}{value or 0:,.{places}f}'
+
+# Per-worker cache of staff profile rows, keyed by employee id
+EMPLOYEE_PROFILE_COLUMNS = 'id, first_name, last_name, email, phone, position, department, salary, hire_date'
+employee_cache = LRUCache(maxsize=app.config['EMPLOYEE_CACHE_SIZE'], ttl=app.config['EMPLOYEE_CACHE_TTL'])
+
+def link_employee(conn, user):
+    """Return the employee id for a users row, linking accounts that predate the link on first use."""
+    if user['employee_id'] is not None:
+        return user['employee_id']
+    
+    # Same matching as the migration backfill: the account email, then "<username>@staffsync.com"
+    employee = conn.execute('''
+        SELECT id FROM employees WHERE email IN (?, ?) ORDER BY email = ? DESC LIMIT 1
+    ''', (user['email'], f"{user['username']}@staffsync.com", user['email'])).fetchone()
+    if not employee:
+        return None
     
+    conn.execute('UPDATE users SET employee_id = ? WHERE id = ?', (employee['id'], user['id']))
     conn.commit()
-    conn.close()
+    return employee['id']
+
+def current_employee_id():
+    """Employee id of the logged-in user, resolved at login and kept in the session."""
+    if session.get('employee_id') is None:
+        # Sessions created before the users -> employees link existed; linking writes, even on a GET
+        conn = db.get_write_connection()
+        user = conn.execute('SELECT id, username, email, employee_id FROM users WHERE id = ?',
+                            (session['user_id'],)).fetchone()
+        session['employee_id'] = link_employee(conn, user) if user else None
+    return session['employee_id']
+
+def get_employee_profile(employee_id):
+    """Profile row for the staff pages, served from the per-worker cache when possible."""
+    profile = employee_cache.get(employee_id)
+    if profile is None:
+        row = get_db_connection().execute(
+            f'SELECT {EMPLOYEE_PROFILE_COLUMNS} FROM employees WHERE id = ?', (employee_id,)).fetchone()
+        if not row:
+            return None
+        profile = dict(row)
+        employee_cache.set(employee_id, profile)
+    return profile
+
+def init_database():
+    """Create or upgrade the schema and load the demo data into empty tables, for local runs.
+
+    Deployments run ``flask staffsync init-db`` (and ``seed-demo`` if they want the demo data).
+    """
+    conn = db.open_connection(app.config['DATABASE'])
+    try:
+        migrate.migrate(conn)
+        demo.seed(conn, passwords.get_hasher(app).hash)
+        conn.commit()
+    finally:
+        conn.close()
 
 # Routes
 @app.route('/')
@@ -251,12 +211,29 @@ def login():
         
         conn = get_db_connection()
         user = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
-        conn.close()
+        hasher = passwords.get_hasher(app)
+        
+        try:
+            verified = bool(user) and hasher.verify(user['password_hash'], password)
+        except passwords.HashingBusy:
+            flash('The server is busy. Please try logging in again in a moment.', 'error')
+            return render_template('login.html'), 503
+        
+        if verified and hasher.needs_rehash(user['password_hash']):
+            # Hash parameters changed since this password was stored; upgrade it when a slot is free
+            # right now, otherwise at a later login. The login itself has already succeeded.
+            try:
+                conn.execute('UPDATE users SET password_hash = ? WHERE id = ?',
+                             (hasher.hash(password, timeout=0), user['id']))
+                conn.commit()
+            except passwords.HashingBusy:
+                pass
         
-        if user and check_password_hash(user['password_hash'], password):
+        if verified:
             session['user_id'] = user['id']
             session['username'] = user['username']
             session['role'] = user['role']
+            session['employee_id'] = link_employee(conn, user)
             
             if user['role'] == 'admin':
                 return redirect(url_for('admin_dashboard'))
@@ -281,15 +258,18 @@ def register():
         existing_user = conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()
         if existing_user:
             flash('Username already exists', 'error')
-            conn.close()
             return render_template('register.html')
         
         # Create new user
-        password_hash = generate_password_hash(password)
-        conn.execute('INSERT INTO users (username, email, password_hash, role) VALUES (?, ?, ?, ?)',
-                    (username, email, password_hash, role))
+        try:
+            password_hash = passwords.get_hasher(app).hash(password)
+        except passwords.HashingBusy:
+            flash('The server is busy. Please try again in a moment.', 'error')
+            return render_template('register.html'), 503
+        conn.execute('''INSERT INTO users (username, email, password_hash, role, employee_id)
+                        VALUES (?, ?, ?, ?, (SELECT id FROM employees WHERE email = ?))''',
+                    (username, email, password_hash, role, email))
         conn.commit()
-        conn.close()
         
         flash('Registration successful! Please login.', 'success')
         return redirect(url_for('login'))
@@ -307,30 +287,28 @@ def logout():
 @admin_required
 def admin_dashboard():
     conn = get_db_connection()
+    today = settings.today(current_settings())
+    
+    # One snapshot, so the counters and the lists agree
+    with db.snapshot(conn):
+        # Get statistics from the trigger-maintained counters
+        total_employees, present_today, total_departments = stats.dashboard_counts(conn, today)
+    
+        # Recent employees
+        recent_employees = conn.execute('''
+            SELECT first_name, last_name, position, hire_date 
+            FROM employees 
+            ORDER BY id DESC LIMIT 5
+        ''').fetchall()
     
-    # Get statistics
-    total_employees = conn.execute('SELECT COUNT(*) FROM employees').fetchone()[0]
-    present_today = conn.execute("SELECT COUNT(*) FROM attendance WHERE date = ? AND status = 'Present'", 
-                                (datetime.now().strftime('%Y-%m-%d'),)).fetchone()[0]
-    total_departments = conn.execute('SELECT COUNT(DISTINCT department) FROM employees').fetchone()[0]
-    
-    # Recent employees
-    recent_employees = conn.execute('''
-        SELECT first_name, last_name, position, hire_date 
-        FROM employees 
-        ORDER BY id DESC LIMIT 5
-    ''').fetchall()
-    
-    # Today's attendance
-    todays_attendance = conn.execute('''
-        SELECT e.first_name, e.last_name, a.check_in_time, a.check_out_time, a.status
-        FROM employees e
-        LEFT JOIN attendance a ON e.id = a.employee_id AND a.date = ?
-        ORDER BY e.first_name
-        LIMIT 10
-    ''', (datetime.now().strftime('%Y-%m-%d'),)).fetchall()
-    
-    conn.close()
+        # Today's attendance
+        todays_attendance = conn.execute('''
+            SELECT e.first_name, e.last_name, a.check_in_time, a.check_out_time, a.status
+            FROM employees e
+            LEFT JOIN attendance a ON e.id = a.employee_id AND a.date = ?
+            ORDER BY e.first_name
+            LIMIT 10
+        ''', (today,)).fetchall()
     
     return render_template('admin/dashboard.html', 
                          total_employees=total_employees,
@@ -343,22 +321,69 @@ def admin_dashboard():
 @admin_required
 def admin_employees():
     conn = get_db_connection()
-    employees = conn.execute('SELECT * FROM employees ORDER BY first_name').fetchall()
-    conn.close()
-    return render_template('admin/employees.html', employees=employees)
+    
+    sort = request.args.get('sort', 'name')
+    if sort not in EMPLOYEE_SORTS:
+        sort = 'name'
+    direction = 'desc' if request.args.get('dir') == 'desc' else 'asc'
+    search = request.args.get('q', '').strip()
+    department = request.args.get('department', '')
+    status = request.args.get('status', '')
+    
+    where, params = [], []
+    if search:
+        # Same word-prefix matching as the search box; text without a searchable word matches nothing
+        match = employee_search.match_query(search)
+        where.append(employee_search.MATCH_CONDITION if match else '0')
+        params.extend([match] if match else [])
+    if department:
+        where.append('department_id = (SELECT id FROM departments WHERE name = ?)')
+        params.append(department)
+    if status:
+        where.append('status = ?')
+        params.append(status)
+    
+    sort_expr = EMPLOYEE_SORTS[sort]
+    page = pagination.keyset_page(
+        conn, f'SELECT *, {sort_expr} AS _sort_key FROM employees', where, params,
+        sort_expr, descending=direction == 'desc',
+        after=request.args.get('after'), before=request.args.get('before'),
+        limit=pagination.page_size(request.args.get('per_page')))
+    
+    return render_template('admin/employees.html', 
+                         employees=page.rows,
+                         page=page,
+                         departments=departments.names(conn),
+                         search=search,
+                         selected_department=department,
+                         selected_status=status,
+                         sort=sort,
+                         direction=direction)
 
 # API endpoint for employee details
 @app.route('/api/employee/<int:employee_id>')
 @admin_required
 def get_employee_api(employee_id):
-    conn = get_db_connection()
-    employee = conn.execute('SELECT * FROM employees WHERE id = ?', (employee_id,)).fetchone()
-    conn.close()
-    
-    if not employee:
-        return jsonify({'error': 'Employee not found'}), 404
-    
-    return jsonify(dict(employee))
+    return etags.conditional_get(get_db_connection(), etags.EMPLOYEE, employee_id, 'Employee not found')
+
+@app.route('/api/employee/batch', methods=['POST'])
+@admin_required
+def get_employees_batch():
+    """Employees among ``ids`` that changed since the tags the client sent in ``etags``."""
+    try:
+        ids, known = etags.parse_batch_request(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify(etags.batch(get_db_connection(), etags.EMPLOYEE, ids, known))
+
+@app.route('/api/employees/search')
+@admin_required
+def search_employees_api():
+    """Ranked word-prefix search over name, email, position and department."""
+    limit = pagination.page_size(request.args.get('limit'), default=employee_search.DEFAULT_LIMIT)
+    employees, next_cursor = employee_search.search_employees(
+        get_db_connection(), request.args.get('q', ''), limit, request.args.get('cursor'))
+    return jsonify({'success': True, 'employees': employees, 'next_cursor': next_cursor})
 
 @app.route('/admin/employees/add', methods=['GET', 'POST'])
 @admin_required
@@ -373,11 +398,31 @@ def add_employee():
                      request.form['position'], request.form['department'],
                      float(request.form['salary']), request.form['hire_date'], 'Active'))
         conn.commit()
-        conn.close()
         flash('Employee added successfully!', 'success')
         return redirect(url_for('admin_employees'))
     
-    return render_template('admin/add_employee.html')
+    return render_template('admin/add_employee.html', departments=departments.names(get_db_connection()))
+
+@app.route('/admin/employees/import', methods=['POST'])
+@admin_required
+def import_employees():
+    """Import employees from an uploaded CSV file, reporting duplicates and bad lines."""
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'success': False, 'message': 'No CSV file uploaded'}), 400
+    
+    # Read the upload as a text stream so rows are parsed one at a time
+    lines = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    try:
+        report = employee_import.import_employees(get_db_connection(), lines)
+    except UnicodeDecodeError:
+        return jsonify({'success': False, 'message': 'CSV file must be UTF-8 encoded'}), 400
+    
+    result = report.to_dict()
+    result['success'] = True
+    result['message'] = (f"Imported {report.inserted} employees "
+                         f"({len(report.duplicates)} duplicates, {len(report.errors)} errors)")
+    return jsonify(result)
 
 @app.route('/admin/employees/edit/<int:employee_id>', methods=['GET', 'POST'])
 @admin_required
@@ -395,18 +440,17 @@ def edit_employee(employee_id):
                      request.form['position'], request.form['department'],
                      float(request.form['salary']), status, employee_id))
         conn.commit()
-        conn.close()
+        employee_cache.invalidate(employee_id)
         flash('Employee updated successfully!', 'success')
         return redirect(url_for('admin_employees'))
     
     employee = conn.execute('SELECT * FROM employees WHERE id = ?', (employee_id,)).fetchone()
-    conn.close()
     
     if not employee:
         flash('Employee not found', 'error')
         return redirect(url_for('admin_employees'))
     
-    return render_template('admin/edit_employee.html', employee=employee)
+    return render_template('admin/edit_employee.html', employee=employee, departments=departments.names(conn))
 
 @app.route('/admin/employees/delete/<int:employee_id>', methods=['POST'])
 @admin_required
@@ -414,21 +458,20 @@ def delete_employee(employee_id):
     conn = get_db_connection()
     conn.execute('DELETE FROM employees WHERE id = ?', (employee_id,))
     conn.commit()
-    conn.close()
+    employee_cache.invalidate(employee_id)
     return jsonify({'success': True})
-    conn.close()
-    flash('Employee deleted successfully!', 'success')
-    return redirect(url_for('admin_employees'))
 
 @app.route('/admin/attendance')
 @admin_required
 def admin_attendance():
-    selected_date = request.args.get('date', date.today().isoformat())
+    selected_date = request.args.get('date') or settings.today(current_settings())
     
     conn = get_db_connection()
+    # An archived date is read from its year's archive file
+    (attendance_table, _, _), = archive.segments(conn, selected_date, selected_date)
     
     # Get all employees with their attendance for the selected date
-    attendance_data = conn.execute('''
+    attendance_data = conn.execute(f'''
         SELECT 
             e.id as employee_id,
             e.first_name,
@@ -443,7 +486,7 @@ def admin_attendance():
             a.status,
             a.notes
         FROM employees e
-        LEFT JOIN attendance a ON e.id = a.employee_id AND a.date = ?
+        LEFT JOIN {attendance_table} a ON e.id = a.employee_id AND a.date = ?
         WHERE e.status = 'Active'
         ORDER BY e.first_name, e.last_name
     ''', (selected_date,)).fetchall()
@@ -454,8 +497,6 @@ def admin_attendance():
     late_employees = sum(1 for record in attendance_data if record['status'] == 'late')
     attendance_rate = (present_employees / total_employees * 100) if total_employees > 0 else 0
     
-    conn.close()
-    
     return render_template('admin/attendance.html', 
                          attendance_data=attendance_data,
                          selected_date=selected_date,
@@ -469,43 +510,69 @@ def admin_attendance():
 def admin_payroll():
     conn = get_db_connection()
     
-    # Get payroll records with employee information
-    payroll_records = conn.execute('''
-        SELECT 
-            p.id,
-            p.employee_id,
-            e.first_name,
-            e.last_name,
-            e.position,
-            p.pay_period_start,
-            p.pay_period_end,
-            p.basic_salary,
-            p.overtime_pay,
-            p.allowances,
-            p.gross_pay,
-            p.tax_deduction,
-            p.other_deductions,
-            p.total_deductions,
-            p.net_pay,
-            p.status,
-            p.created_at
-        FROM payroll p
-        JOIN employees e ON p.employee_id = e.id
-        ORDER BY p.created_at DESC, e.first_name
-    ''').fetchall()
-    
-    # Calculate payroll statistics
-    total_gross = sum(float(record['gross_pay'] or 0) for record in payroll_records)
-    total_net = sum(float(record['net_pay'] or 0) for record in payroll_records)
-    pending_count = sum(1 for record in payroll_records if record['status'] == 'draft')
-    
-    conn.close()
+    sort = request.args.get('sort', 'created')
+    if sort not in PAYROLL_SORTS:
+        sort = 'created'
+    direction = 'asc' if request.args.get('dir') == 'asc' else 'desc'
+    search = request.args.get('q', '').strip()
+    status = request.args.get('status', '')
+    period = request.args.get('period', '')
+    
+    where, params = [], []
+    if search:
+        where.append("(e.first_name LIKE ? ESCAPE '\\' OR e.last_name LIKE ? ESCAPE '\\')")
+        params.extend([pagination.contains_pattern(search)] * 2)
+    if status:
+        where.append('p.status = ?')
+        params.append(status)
+    if period:
+        where.append('p.pay_period_start = ?')
+        params.append(period)
+    
+    with db.snapshot(conn):
+        # Get one page of payroll records with employee information
+        sort_expr = PAYROLL_SORTS[sort]
+        page = pagination.keyset_page(conn, f'''
+            SELECT 
+                p.id,
+                p.employee_id,
+                e.first_name,
+                e.last_name,
+                e.position,
+                p.pay_period_start,
+                p.pay_period_end,
+                p.basic_salary,
+                p.overtime_pay,
+                p.allowances,
+                p.gross_pay,
+                p.tax_deduction,
+                p.other_deductions,
+                p.total_deductions,
+                p.net_pay,
+                p.status,
+                p.created_at,
+                {sort_expr} AS _sort_key
+            FROM payroll p
+            JOIN employees e ON p.employee_id = e.id
+        ''', where, params, sort_expr, tiebreak='p.id', descending=direction == 'desc',
+            after=request.args.get('after'), before=request.args.get('before'),
+            limit=pagination.page_size(request.args.get('per_page')))
+    
+        # Payroll totals, recomputed only after payroll data changes
+        (total_records, total_gross, total_net, pending_count), _ = analytics.cached(conn, 'summary')
     
     return render_template('admin/payroll.html', 
-                         payroll_records=payroll_records,
+                         payroll_records=page.rows,
+                         page=page,
+                         total_records=total_records,
                          total_gross=total_gross,
                          total_net=total_net,
-                         pending_count=pending_count)
+                         pending_count=pending_count,
+                         search=search,
+                         selected_status=status,
+                         selected_period=period,
+                         sort=sort,
+                         direction=direction)
 
 @app.route('/admin/departments', methods=['GET', 'POST'])
 @admin_required
@@ -513,96 +580,96 @@ def admin_departments():
     conn = get_db_connection()
     
     if request.method == 'POST':
-        name = request.form['name']
-        description = request.form.get('description', '')
-        head = request.form.get('head', '')
-        budget = request.form.get('budget')
-        
-        # Add department logic here (would need departments table)
+        try:
+            departments.create(conn, request.form.get('name'),
+                               description=request.form.get('description', '').strip(),
+                               head_employee_id=departments.resolve_head(conn, request.form.get('head')),
+                               budget=departments.parse_budget(request.form.get('budget')))
+        except ValueError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('admin_departments'))
+        conn.commit()
         flash('Department created successfully!', 'success')
         return redirect(url_for('admin_departments'))
     
-    # Get department data (mock data for now)
-    departments = [
-        {
-            'name': 'Human Resources',
-            'description': 'Manages employee relations, recruitment, and HR policies',
-            'head': 'Sarah Wilson',
-            'budget': 150000,
-            'employee_count': 5,
-            'employees': [
-                {'first_name': 'Sarah', 'last_name': 'Wilson'},
-                {'first_name': 'Mike', 'last_name': 'Johnson'},
-            ]
-        },
-        {
-            'name': 'Information Technology',
-            'description': 'Develops and maintains technology infrastructure',
-            'head': 'John Doe',
-            'budget': 300000,
-            'employee_count': 8,
-            'employees': [
-                {'first_name': 'John', 'last_name': 'Doe'},
-                {'first_name': 'Jane', 'last_name': 'Smith'},
-            ]
-        },
-        {
-            'name': 'Finance',
-            'description': 'Handles financial planning, accounting, and budgets',
-            'head': 'David Brown',
-            'budget': 200000,
-            'employee_count': 4,
-            'employees': [
-                {'first_name': 'David', 'last_name': 'Brown'},
-            ]
-        }
-    ]
-    
-    all_employees = conn.execute('SELECT first_name, last_name FROM employees ORDER BY first_name').fetchall()
-    total_employees = conn.execute('SELECT COUNT(*) FROM employees').fetchone()[0]
-    
-    conn.close()
+    department_list = departments.summary(conn)
+    total_employees = stats.counter(conn, 'employees')
+    
     return render_template('admin/departments.html', 
-                         departments=departments,
-                         all_employees=all_employees,
+                         departments=department_list,
                          total_employees=total_employees)
 
+@app.route('/admin/departments/<int:department_id>/edit', methods=['POST'])
+@admin_required
+def edit_department(department_id):
+    conn = get_db_connection()
+    try:
+        updated = departments.update(conn, department_id, request.form.get('name'),
+                                     description=request.form.get('description', '').strip(),
+                                     head_employee_id=departments.resolve_head(conn, request.form.get('head')),
+                                     budget=departments.parse_budget(request.form.get('budget')))
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin_departments'))
+    conn.commit()
+    
+    if updated:
+        # Members' cached profiles carry the department name
+        employee_cache.clear()
+        flash('Department updated successfully!', 'success')
+    else:
+        flash('Department not found.', 'error')
+    return redirect(url_for('admin_departments'))
+
+@app.route('/admin/departments/<int:department_id>/delete', methods=['POST'])
+@admin_required
+def delete_department(department_id):
+    conn = get_db_connection()
+    unassigned = departments.delete(conn, department_id)
+    conn.commit()
+    employee_cache.clear()
+    flash(f'Department deleted; {unassigned} employee(s) are now unassigned.', 'success')
+    return redirect(url_for('admin_departments'))
+
+@app.route('/api/departments/<int:department_id>/employees')
+@admin_required
+def department_employees(department_id):
+    """One page of a department's members, loaded when the department is opened."""
+    conn = get_db_connection()
+    if departments.get(conn, department_id) is None:
+        return jsonify({'success': False, 'message': 'Department not found'}), 404
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', departments.MEMBERS_PAGE_SIZE, type=int), 1), 200)
+    members, has_more = departments.members(conn, department_id, offset, limit)
+    return jsonify({'success': True, 'employees': members, 'offset': offset, 'has_more': has_more})
+
 @app.route('/admin/settings', methods=['GET', 'POST'])
 @admin_required
 def admin_settings():
-    # Mock settings data
-    settings = {
-        'company_name': 'StaffSync Corporation',
-        'company_email': 'admin@staffsync.com',
-        'company_phone': '+1 (555) 123-4567',
-        'company_website': 'https://staffsync.com',
-        'company_address': '123 Business Street, Suite 100\nCity, State 12345\nCountry',
-        'timezone': 'America/New_York',
-        'date_format': 'MM/DD/YYYY',
-        'currency': 'USD',
-        'working_hours': 8,
-        'email_notifications': True,
-        'auto_backup': True,
-        'two_factor_auth': False
-    }
-    
     return render_template('admin/settings.html', 
-                         settings=settings,
+                         settings=current_settings(),
                          last_backup='2025-10-30 14:30:00')
 
+def save_settings(fields, label):
+    conn = get_db_connection()
+    try:
+        settings.update(conn, settings.parse_form(request.form, fields))
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin_settings'))
+    conn.commit()
+    flash(f'{label} settings updated successfully!', 'success')
+    return redirect(url_for('admin_settings'))
+
 @app.route('/admin/settings/company', methods=['POST'])
 @admin_required
 def update_company_settings():
-    # Here you would update company settings in database
-    flash('Company settings updated successfully!', 'success')
-    return redirect(url_for('admin_settings'))
+    return save_settings(settings.COMPANY_FIELDS, 'Company')
 
 @app.route('/admin/settings/system', methods=['POST'])
 @admin_required
 def update_system_settings():
-    # Here you would update system settings in database
-    flash('System settings updated successfully!', 'success')
-    return redirect(url_for('admin_settings'))
+    return save_settings(settings.SYSTEM_FIELDS, 'System')
 
 # Staff Routes
 @app.route('/staff/dashboard')
@@ -613,49 +680,27 @@ def staff_dashboard():
     
     conn = get_db_connection()
     
-    # Get employee info by matching username with email
-    username = session.get('username')
-    email = f"{username}@staffsync.com"
-    
-    employee = conn.execute('''
-        SELECT id, first_name, last_name, email, phone, position, department, salary, hire_date
-        FROM employees 
-        WHERE email = ?
-    ''', (email,)).fetchone()
+    employee_id = current_employee_id()
+    employee = get_employee_profile(employee_id) if employee_id else None
     
     if not employee:
         flash('Employee profile not found. Please contact admin.', 'error')
-        conn.close()
         return redirect(url_for('login'))
     
-    employee_id = employee['id']
-    
-    # Get recent attendance
-    recent_attendance = conn.execute('''
-        SELECT date, check_in_time, check_out_time, status
-        FROM attendance 
-        WHERE employee_id = ?
-        ORDER BY date DESC LIMIT 10
-    ''', (employee_id,)).fetchall()
+    # Get recent attendance, reaching into the archives only for employees with little recent history
+    recent_attendance = archive.recent_attendance(
+        conn, employee_id, ('date', 'check_in_time', 'check_out_time', 'status'), 10)
     
     # Get today's attendance
-    today = datetime.now().strftime('%Y-%m-%d')
+    today = settings.today(current_settings())
     todays_attendance = conn.execute('''
         SELECT check_in_time, check_out_time, status
         FROM attendance 
         WHERE employee_id = ? AND date = ?
     ''', (employee_id, today)).fetchone()
     
-    # Calculate leave balance
-    used_leaves = conn.execute('''
-        SELECT COALESCE(SUM(days_count), 0) FROM leaves 
-        WHERE employee_id = ? AND status = 'approved' 
-        AND start_date >= date('now', 'start of year')
-    ''', (employee_id,)).fetchone()[0]
-    
-    leave_balance = 20 - used_leaves
-    
-    conn.close()
+    # Annual leave balance from the ledger
+    leave_balance = leave.balance(conn, employee_id)['available']
     
     return render_template('staff/dashboard.html', 
                          employee=employee,
@@ -672,17 +717,14 @@ def mark_attendance():
     action = request.form.get('action')  # 'checkin' or 'checkout'
     
     conn = get_db_connection()
-    username = session.get('username')
-    email = f"{username}@staffsync.com"
-    
-    employee = conn.execute('SELECT id FROM employees WHERE email = ?', (email,)).fetchone()
-    if not employee:
-        conn.close()
+    employee_id = current_employee_id()
+    if not employee_id:
         return jsonify({'success': False, 'message': 'Employee not found'})
     
-    employee_id = employee['id']
-    today = datetime.now().strftime('%Y-%m-%d')
-    current_time = datetime.now().strftime('%H:%M')
+    config = current_settings()
+    now = settings.now(config)
+    today = now.strftime('%Y-%m-%d')
+    current_time = now.strftime('%H:%M')
     
     # Check if attendance record exists for today
     existing = conn.execute('SELECT * FROM attendance WHERE employee_id = ? AND date = ?', 
@@ -690,7 +732,6 @@ def mark_attendance():
     
     if action == 'checkin':
         if existing:
-            conn.close()
             return jsonify({'success': False, 'message': 'Already checked in today'})
         
         conn.execute('INSERT INTO attendance (employee_id, date, check_in_time, status) VALUES (?, ?, ?, ?)',
@@ -699,19 +740,19 @@ def mark_attendance():
     
     elif action == 'checkout':
         if not existing:
-            conn.close()
             return jsonify({'success': False, 'message': 'No check-in record found for today'})
         
         if existing['check_out_time']:
-            conn.close()
             return jsonify({'success': False, 'message': 'Already checked out today'})
         
-        conn.execute('UPDATE attendance SET check_out_time = ? WHERE employee_id = ? AND date = ?',
-                    (current_time, employee_id, today))
+        total_hours = attendance_ingest.hours_between(existing['check_in_time'], current_time)
+        conn.execute('''
+            UPDATE attendance SET check_out_time = ?, total_hours = ?, overtime_hours = ?
+            WHERE employee_id = ? AND date = ?
+        ''', (current_time, total_hours, settings.overtime_hours(config, total_hours), employee_id, today))
         message = f'Checked out at {current_time}'
     
     conn.commit()
-    conn.close()
     
     return jsonify({'success': True, 'message': message})
 
@@ -722,17 +763,11 @@ def staff_profile():
         return redirect(url_for('admin_dashboard'))
     
     conn = get_db_connection()
-    username = session.get('username')
-    email = f"{username}@staffsync.com"
-    
-    employee = conn.execute('''
-        SELECT id, first_name, last_name, email, phone, position, department, salary, hire_date
-        FROM employees WHERE email = ?
-    ''', (email,)).fetchone()
+    employee_id = current_employee_id()
+    employee = get_employee_profile(employee_id) if employee_id else None
     
     if not employee:
         flash('Employee profile not found.', 'error')
-        conn.close()
         return redirect(url_for('staff_dashboard'))
     
     if request.method == 'POST':
@@ -741,11 +776,10 @@ def staff_profile():
         conn.execute('''UPDATE employees SET phone = ? WHERE id = ?''',
                     (phone, employee['id']))
         conn.commit()
+        employee_cache.invalidate(employee['id'])
         flash('Profile updated successfully!', 'success')
-        conn.close()
         return redirect(url_for('staff_profile'))
     
-    conn.close()
     return render_template('staff/profile.html', employee=employee)
 
 @app.route('/staff/leave', methods=['GET', 'POST'])
@@ -755,16 +789,11 @@ def staff_leave():
         return redirect(url_for('admin_dashboard'))
     
     conn = get_db_connection()
-    username = session.get('username')
-    email = f"{username}@staffsync.com"
-    
-    employee = conn.execute('SELECT id FROM employees WHERE email = ?', (email,)).fetchone()
-    if not employee:
+    employee_id = current_employee_id()
+    if not employee_id:
         flash('Employee profile not found.', 'error')
-        conn.close()
         return redirect(url_for('staff_dashboard'))
     
-    employee_id = employee['id']
     
     if request.method == 'POST':
         leave_type = request.form.get('leave_type')
@@ -784,7 +813,6 @@ def staff_leave():
                     (employee_id, leave_type, start_date, end_date, days_count, reason))
         conn.commit()
         flash(f'Leave application submitted successfully for {days_count} days!', 'success')
-        conn.close()
         return redirect(url_for('staff_leave'))
     
     # Get leave history
@@ -792,39 +820,54 @@ def staff_leave():
         SELECT * FROM leaves WHERE employee_id = ? ORDER BY applied_date DESC
     ''', (employee_id,)).fetchall()
     
-    # Calculate leave balance (assume 20 days annual leave)
-    used_leaves = conn.execute('''
-        SELECT COALESCE(SUM(days_count), 0) FROM leaves 
-        WHERE employee_id = ? AND status = 'approved' 
-        AND start_date >= date('now', 'start of year')
-    ''', (employee_id,)).fetchone()[0]
-    
-    leave_balance = 20 - used_leaves
+    balances = leave.balances(conn, employee_id)
     
-    conn.close()
     return render_template('staff/leave.html', 
                          leave_history=leave_history, 
-                         leave_balance=leave_balance)
+                         leave_balance=balances['annual']['available'],
+                         annual=balances['annual'],
+                         balances=balances)
 
 # API Routes
 @app.route('/api/notifications')
+@login_required
 def api_notifications():
-    """Simple notifications endpoint to prevent 404 errors"""
-    return jsonify({
-        'notifications': [],
-        'count': 0
-    })
+    """Poll for notifications after the ``since`` cursor; 304 when there is nothing new."""
+    bus = notifications.get_bus(app)
+    since = request.args.get('since', type=int)
+    if since is None:
+        # First poll: start from now rather than replaying history
+        return jsonify({'notifications': [], 'count': 0, 'cursor': bus.head})
+    if since >= bus.head:
+        return '', 304
+    
+    items, cursor = notifications.poll(get_db_connection(), bus, session['user_id'], session.get('role'), since)
+    return jsonify({'notifications': items, 'count': len(items), 'cursor': cursor})
 
-@app.route('/api/employee/<int:employee_id>')
-@admin_required
-def api_employee(employee_id):
-    conn = get_db_connection()
-    employee = conn.execute('SELECT * FROM employees WHERE id = ?', (employee_id,)).fetchone()
-    conn.close()
-    
-    if employee:
-        return jsonify(dict(employee))
-    return jsonify({'error': 'Employee not found'}), 404
+@app.route('/api/notifications/stream')
+@login_required
+def notification_stream():
+    """Server-Sent Events feed of the user's notifications."""
+    if not app.config['NOTIFICATIONS_STREAM']:
+        return jsonify({'success': False, 'message': 'Notification streaming is disabled'}), 503
+    bus = notifications.get_bus(app)
+    try:
+        bus.open_stream()
+    except notifications.StreamLimitReached:
+        return jsonify({'success': False, 'message': 'Too many open notification streams'}), 503
+    
+    user_id, role = session['user_id'], session.get('role')
+    since = request.headers.get('Last-Event-ID', request.args.get('since', ''))
+    since = int(since) if since.isdigit() else bus.head
+    try:
+        backlog, cursor = notifications.catch_up(get_db_connection(), bus, user_id, role, since)
+    except Exception:
+        bus.close_stream()
+        raise
+    body = notifications.stream(bus, user_id, role, cursor, backlog,
+                                app.config['NOTIFICATIONS_STREAM_TIMEOUT'], app.config['NOTIFICATIONS_KEEPALIVE'])
+    return Response(body, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 # Attendance Management API
 @app.route('/api/attendance/mark_present', methods=['POST'])
@@ -832,10 +875,15 @@ def api_employee(employee_id):
 def mark_employee_present():
     data = request.get_json()
     employee_id = data.get('employee_id')
-    date = data.get('date', datetime.now().strftime('%Y-%m-%d'))
-    check_in_time = data.get('check_in_time', datetime.now().strftime('%H:%M'))
+    now = settings.now(current_settings())
+    date = data.get('date', now.strftime('%Y-%m-%d'))
+    check_in_time = data.get('check_in_time', now.strftime('%H:%M'))
     
     conn = get_db_connection()
+    try:
+        archive.check_writable(conn, date)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     
     # Check if attendance record already exists
     existing = conn.execute('''
@@ -857,7 +905,6 @@ def mark_employee_present():
         ''', (employee_id, date, check_in_time))
     
     conn.commit()
-    conn.close()
     
     return jsonify({'success': True, 'message': 'Attendance marked successfully'})
 
@@ -873,19 +920,14 @@ def edit_attendance():
     notes = data.get('notes', '')
     
     # Calculate total hours if both times are provided
-    total_hours = 0
-    if check_in_time and check_out_time:
-        try:
-            checkin = datetime.strptime(check_in_time, '%H:%M')
-            checkout = datetime.strptime(check_out_time, '%H:%M')
-            # Handle cases where checkout is next day
-            if checkout < checkin:
-                checkout = checkout.replace(day=checkout.day + 1)
-            total_hours = (checkout - checkin).total_seconds() / 3600
-        except:
-            total_hours = 0
+    total_hours = attendance_ingest.hours_between(check_in_time, check_out_time)
     
     conn = get_db_connection()
+    try:
+        archive.check_writable(conn, date)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    overtime_hours = settings.overtime_hours(current_settings(), total_hours)
     
     # Check if record exists
     existing = conn.execute('''
@@ -896,113 +938,185 @@ def edit_attendance():
         # Update existing record
         conn.execute('''
             UPDATE attendance 
-            SET check_in_time = ?, check_out_time = ?, total_hours = ?, 
+            SET check_in_time = ?, check_out_time = ?, total_hours = ?, overtime_hours = ?,
                 status = ?, notes = ?, updated_at = CURRENT_TIMESTAMP
             WHERE employee_id = ? AND date = ?
-        ''', (check_in_time, check_out_time, total_hours, status, notes, employee_id, date))
+        ''', (check_in_time, check_out_time, total_hours, overtime_hours, status, notes, employee_id, date))
     else:
         # Create new record
         conn.execute('''
             INSERT INTO attendance (employee_id, date, check_in_time, check_out_time, 
-                                  total_hours, status, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (employee_id, date, check_in_time, check_out_time, total_hours, status, notes))
-    
+                                  total_hours, overtime_hours, status, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (employee_id, date, check_in_time, check_out_time, total_hours, overtime_hours, status, notes))
+    
+    notifications.publish_to_employee(
+        conn, employee_id, 'attendance.corrected',
+        f'Your attendance for {date} was updated by an administrator (status: {status}).',
+        link=url_for('staff_dashboard'))
     conn.commit()
-    conn.close()
+    notifications.publish_local(app)
     
     return jsonify({'success': True, 'message': 'Attendance updated successfully'})
 
+@app.route('/api/attendance/bulk', methods=['POST'])
+@admin_required
+def bulk_attendance():
+    """Apply a batch of check-in/check-out events (JSON array or NDJSON) in one transaction."""
+    try:
+        events = attendance_ingest.parse_events(request.get_data(as_text=True), request.content_type)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    max_events = app.config['ATTENDANCE_BULK_MAX_EVENTS']
+    if len(events) > max_events:
+        return jsonify({'success': False,
+                        'message': f'Batch too large: {len(events)} events (limit {max_events})'}), 413
+    
+    conn = get_db_connection()
+    config = current_settings()
+    results = attendance_ingest.apply_events(conn, events, settings.today(config), config['working_hours'])
+    conn.commit()
+    
+    applied = sum(1 for result in results if result['success'])
+    return jsonify({
+        'success': applied == len(results),
+        'applied': applied,
+        'failed': len(results) - applied,
+        'results': results
+    })
+
+# Export API
+def export_response(sql, params, fmt, name):
+    """Stream the rows of ``sql`` as a CSV/NDJSON download without buffering the result."""
+    def generate():
+        cursor = get_db_connection().execute(sql, params)
+        yield from exporter.stream_rows(cursor, fmt)
+    
+    return Response(stream_with_context(generate()),
+                    mimetype=exporter.FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={name}.{fmt}'})
+
+@app.route('/api/export/<kind>')
+@admin_required
+def export_data(kind):
+    if kind not in exporter.QUERIES:
+        return jsonify({'error': f'Unknown export: {kind}'}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in exporter.FORMATS:
+        return jsonify({'error': f'Unsupported format: {fmt}'}), 400
+    
+    sql, params = exporter.QUERIES[kind](get_db_connection(), request.args)
+    return export_response(sql, params, fmt, kind)
+
+# Background jobs
+SUBMITTABLE_JOBS = ('payroll.generate', 'export.payroll', 'export.attendance', 'attendance.archive')
+
+def submit_job(kind, params):
+    conn = get_db_connection()
+    job_id = jobs.submit(conn, kind, params, submitted_by=session.get('user_id'))
+    conn.commit()
+    jobs.notify_workers(app)
+    job = jobs.job_to_dict(jobs.get(conn, job_id))
+    return jsonify({'success': True, 'job': job, 'status_url': url_for('get_job', job_id=job_id)}), 202
+
+@app.route('/api/jobs', methods=['POST'])
+@admin_required
+def create_job():
+    data = request.get_json(silent=True) or {}
+    kind = data.get('kind')
+    if kind not in SUBMITTABLE_JOBS:
+        return jsonify({'success': False, 'message': f'Unknown job kind: {kind}'}), 400
+    params = data.get('params') or {}
+    if not isinstance(params, dict):
+        return jsonify({'success': False, 'message': 'params must be an object'}), 400
+    if kind == 'payroll.generate':
+        try:
+            start, end = payroll_engine.pay_period(params.get('pay_period_start'), params.get('pay_period_end'))
+            payroll_engine.rates_with_overrides(params.get('rates'))
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        params = dict(params, pay_period_start=start, pay_period_end=end)
+    if kind == 'attendance.archive':
+        # Each run only ever moves the horizon forward, so the job takes no other parameters
+        params = {'before': archive.horizon(settings.now(current_settings()).date(),
+                                            app.config['ATTENDANCE_ARCHIVE_AFTER_MONTHS']),
+                  'batch_size': app.config['ATTENDANCE_ARCHIVE_BATCH_SIZE']}
+    return submit_job(kind, params)
+
+@app.route('/api/jobs/import-employees', methods=['POST'])
+@admin_required
+def create_import_job():
+    """Queue an employee CSV import; the upload is saved for the worker to read."""
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'success': False, 'message': 'No CSV file uploaded'}), 400
+    
+    directory = os.path.join(app.config['JOBS_DIR'], 'uploads')
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{uuid.uuid4().hex}.csv')
+    upload.save(path)
+    return submit_job('employees.import', {'path': path, 'filename': upload.filename})
+
+@app.route('/api/jobs')
+@admin_required
+def list_jobs():
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    rows = get_db_connection().execute('SELECT * FROM jobs ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+    return jsonify({'success': True, 'jobs': [jobs.job_to_dict(row) for row in rows]})
+
+@app.route('/api/jobs/<int:job_id>')
+@admin_required
+def get_job(job_id):
+    row = jobs.get(get_db_connection(), job_id)
+    if not row:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': jobs.job_to_dict(row)})
+
+@app.route('/api/jobs/<int:job_id>/cancel', methods=['POST'])
+@admin_required
+def cancel_job(job_id):
+    conn = get_db_connection()
+    cancelled = jobs.cancel(conn, job_id)
+    conn.commit()
+    if not cancelled:
+        return jsonify({'success': False, 'message': 'Job not found or already finished'}), 409
+    return jsonify({'success': True, 'job': jobs.job_to_dict(jobs.get(conn, job_id))})
+
+@app.route('/api/jobs/<int:job_id>/download')
+@admin_required
+def download_job_result(job_id):
+    row = jobs.get(get_db_connection(), job_id)
+    job = jobs.job_to_dict(row) if row else None
+    if not job or job['status'] != 'succeeded' or not (job['result'] or {}).get('path'):
+        return jsonify({'success': False, 'message': 'No file for this job'}), 404
+    result = job['result']
+    if not os.path.exists(result['path']):
+        return jsonify({'success': False, 'message': 'Export file has been removed'}), 410
+    return send_file(result['path'], mimetype=result['mimetype'], as_attachment=True,
+                     download_name=result['filename'])
+
 # Payroll Management API
 @app.route('/api/payroll/generate', methods=['POST'])
 @admin_required
 def generate_payroll():
-    data = request.get_json()
-    pay_period_start = data.get('pay_period_start')
-    pay_period_end = data.get('pay_period_end')
+    data = request.get_json(silent=True) or {}
+    try:
+        pay_period_start, pay_period_end = payroll_engine.pay_period(data.get('pay_period_start'),
+                                                                     data.get('pay_period_end'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     employee_selection = data.get('employee_selection', 'all')
     include_overtime = data.get('include_overtime', True)
     include_tax = data.get('include_tax', True)
     
     conn = get_db_connection()
+    rates = settings.payroll_rates(current_settings())
     
-    # Get employees based on selection
-    if employee_selection == 'all':
-        employees = conn.execute('''
-            SELECT id, first_name, last_name, salary, position
-            FROM employees WHERE status = 'Active'
-        ''').fetchall()
-    else:
-        # For now, just handle 'all' - can extend for department/individual selection
-        employees = conn.execute('''
-            SELECT id, first_name, last_name, salary, position
-            FROM employees WHERE status = 'Active'
-        ''').fetchall()
-    
-    payroll_created = 0
-    
-    for employee in employees:
-        employee_id = employee['id']
-        basic_salary = float(employee['salary'] or 0)
-        
-        # Calculate attendance-based adjustments
-        if include_overtime:
-            # Get total hours worked in the pay period
-            attendance_hours = conn.execute('''
-                SELECT SUM(total_hours) as total_hours, SUM(overtime_hours) as overtime_hours
-                FROM attendance 
-                WHERE employee_id = ? AND date BETWEEN ? AND ?
-            ''', (employee_id, pay_period_start, pay_period_end)).fetchone()
-            
-            overtime_hours = float(attendance_hours['overtime_hours'] or 0)
-            # Assuming overtime rate is 1.5x hourly rate
-            hourly_rate = basic_salary / (30 * 8)  # Approximate hourly rate
-            overtime_pay = overtime_hours * hourly_rate * 1.5
-        else:
-            overtime_pay = 0
-        
-        # Calculate allowances (can be customized based on position/department)
-        allowances = basic_salary * 0.1  # 10% of basic salary as allowances
-        
-        # Calculate gross pay
-        gross_pay = basic_salary + overtime_pay + allowances
-        
-        # Calculate deductions
-        if include_tax:
-            tax_rate = 0.2 if gross_pay > 5000 else 0.15  # Progressive tax
-            tax_deduction = gross_pay * tax_rate
-        else:
-            tax_deduction = 0
-        
-        other_deductions = gross_pay * 0.02  # 2% for insurance/benefits
-        total_deductions = tax_deduction + other_deductions
-        
-        # Calculate net pay
-        net_pay = gross_pay - total_deductions
-        
-        # Check if payroll already exists for this period
-        existing_payroll = conn.execute('''
-            SELECT id FROM payroll 
-            WHERE employee_id = ? AND pay_period_start = ? AND pay_period_end = ?
-        ''', (employee_id, pay_period_start, pay_period_end)).fetchone()
-        
-        if not existing_payroll:
-            # Create new payroll record
-            conn.execute('''
-                INSERT INTO payroll (
-                    employee_id, pay_period_start, pay_period_end,
-                    basic_salary, overtime_pay, allowances, gross_pay,
-                    tax_deduction, other_deductions, total_deductions, net_pay,
-                    status
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'draft')
-            ''', (employee_id, pay_period_start, pay_period_end, basic_salary, 
-                 overtime_pay, allowances, gross_pay, tax_deduction, 
-                 other_deductions, total_deductions, net_pay))
-            
-            payroll_created += 1
-    
+    # Only 'all' is supported for now - can extend for department/individual selection
+    payroll_created = payroll_engine.generate_payroll(conn, pay_period_start, pay_period_end,
+                                                      include_overtime, include_tax, rates)
     conn.commit()
-    conn.close()
     
     return jsonify({
         'success': True, 
@@ -1010,22 +1124,66 @@ def generate_payroll():
         'payroll_created': payroll_created
     })
 
+@app.route('/api/payroll/preview', methods=['POST'])
+@admin_required
+def preview_payroll():
+    """What-if payroll: the generate formulas applied in memory, nothing is written."""
+    data = request.get_json(silent=True) or {}
+    try:
+        pay_period_start, pay_period_end = payroll_engine.pay_period(data.get('pay_period_start'),
+                                                                     data.get('pay_period_end'))
+        rates = payroll_engine.rates_with_overrides(data.get('rates'), settings.payroll_rates(current_settings()))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    employee_ids, columns, totals = payroll_engine.preview_payroll(
+        db.get_read_connection(), pay_period_start, pay_period_end,
+        data.get('include_overtime', True), data.get('include_tax', True), rates)
+    
+    result = {'success': True, 'totals': totals, 'rates': rates._asdict()}
+    if data.get('include_employees'):
+        # Column-oriented rows keep the payload and serialization small for large companies
+        result['columns'] = ['employee_id'] + list(payroll_engine.PAYROLL_COLUMNS)
+        result['employees'] = [
+            [employee_id] + [round(amount, 2) for amount in amounts]
+            for employee_id, amounts in zip(employee_ids, zip(*(columns[name] for name in payroll_engine.PAYROLL_COLUMNS)))
+        ]
+    return jsonify(result)
+
+@app.route('/api/payroll/analytics/<report>')
+@admin_required
+def payroll_analytics(report):
+    """Chart-ready payroll aggregates: department-cost, overtime-trend or net-vs-gross."""
+    if report not in analytics.REPORTS:
+        return jsonify({'success': False, 'message': f'Unknown report: {report}'}), 404
+    try:
+        start, end = analytics.month_range(request.args.get('start'), request.args.get('end'),
+                                           settings.now(current_settings()).date())
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    department = request.args.get('department') or None
+    
+    result, version = analytics.cached(get_db_connection(), report, start, end, department)
+    return jsonify({'success': True, 'report': report, 'start': start, 'end': end,
+                    'department': department, 'data_version': version, **result})
+
 @app.route('/api/payroll/<int:payroll_id>/process', methods=['POST'])
 @admin_required
 def process_payroll(payroll_id):
     conn = get_db_connection()
     
     # Update payroll status to processed
-    conn.execute('''
+    cursor = conn.execute('''
         UPDATE payroll 
         SET status = 'processed', processed_at = CURRENT_TIMESTAMP, 
             updated_at = CURRENT_TIMESTAMP
         WHERE id = ? AND status = 'draft'
     ''', (payroll_id,))
     
-    affected_rows = conn.total_changes
+    # rowcount, not total_changes: pooled connections accumulate changes across requests
+    affected_rows = cursor.rowcount
     conn.commit()
-    conn.close()
+    notifications.publish_local(app)  # the payroll trigger queued the employee's notification
     
     if affected_rows > 0:
         return jsonify({'success': True, 'message': 'Payroll processed successfully'})
@@ -1038,15 +1196,14 @@ def mark_payroll_paid(payroll_id):
     conn = get_db_connection()
     
     # Update payroll status to paid
-    conn.execute('''
+    cursor = conn.execute('''
         UPDATE payroll 
         SET status = 'paid', updated_at = CURRENT_TIMESTAMP
         WHERE id = ? AND status = 'processed'
     ''', (payroll_id,))
     
-    affected_rows = conn.total_changes
+    affected_rows = cursor.rowcount
     conn.commit()
-    conn.close()
     
     if affected_rows > 0:
         return jsonify({'success': True, 'message': 'Payroll marked as paid successfully'})
@@ -1056,26 +1213,17 @@ def mark_payroll_paid(payroll_id):
 @app.route('/api/payroll/<int:payroll_id>')
 @admin_required
 def get_payroll_details(payroll_id):
-    conn = get_db_connection()
-    
-    payroll = conn.execute('''
-        SELECT 
-            p.*,
-            e.first_name,
-            e.last_name,
-            e.position,
-            e.email
-        FROM payroll p
-        JOIN employees e ON p.employee_id = e.id
-        WHERE p.id = ?
-    ''', (payroll_id,)).fetchone()
-    
-    conn.close()
-    
-    if payroll:
-        return jsonify(dict(payroll))
-    else:
-        return jsonify({'error': 'Payroll record not found'}), 404
+    return etags.conditional_get(get_db_connection(), etags.PAYROLL, payroll_id, 'Payroll record not found')
+
+@app.route('/api/payroll/batch', methods=['POST'])
+@admin_required
+def get_payroll_batch():
+    """Payroll records among ``ids`` that changed since the tags the client sent in ``etags``."""
+    try:
+        ids, known = etags.parse_batch_request(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify(etags.batch(get_db_connection(), etags.PAYROLL, ids, known))
 
 if __name__ == '__main__':
     print("🚀 Starting StaffSync Employee Management System...")
@@ -1091,17 +1239,8 @@ if __name__ == '__main__':
     print("📝 Registration: http://localhost:5000/register")
     print("=" * 60)
     
-    # Initialize database
+    # Local runs get the schema and demo data without a separate init-db step
     init_database()
     
     # Run the application
     app.run(debug=True, host='0.0.0.0', port=5000)
-
-# Ensure the database exists when the module is imported (useful when running under gunicorn)
-try:
-    init_database()
-except Exception:
-    # If initialization fails during import (rare), defer to before_first_request
-    @app.before_first_request
-    def _init_db_on_first_request():
-        init_database()
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+Attendance ingestion benchmark.
+
+Compares the per-call path (one POST to /api/attendance/mark_present per
+swipe) with /api/attendance/bulk on a throwaway database, driving both
+through the Flask test client so routing and JSON handling are included.
+"""
+import os
+import tempfile
+import time
+
+from database import connection as db
+from database import migrate
+
+
+def _build_database(path, employees):
+    conn = db.open_connection(path)
+    migrate.migrate(conn)
+    conn.executemany(
+        'INSERT INTO employees (first_name, last_name, email) VALUES (?, ?, ?)',
+        ((f'First{i}', f'Last{i}', f'bench{i}@example.com') for i in range(1, employees + 1)))
+    conn.commit()
+    conn.close()
+
+
+def _admin_client(app):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+        sess['role'] = 'admin'
+    return client
+
+
+def run(app, events=5000, batch_size=1000, echo=print):
+    """Ingest ``events`` check-ins both ways; returns events per second for each path."""
+    original_database = app.config['DATABASE']
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            per_call_db = os.path.join(tmp, 'per_call.db')
+            _build_database(per_call_db, events)
+            app.config['DATABASE'] = per_call_db
+            client = _admin_client(app)
+            started = time.perf_counter()
+            for employee_id in range(1, events + 1):
+                client.post('/api/attendance/mark_present', json={
+                    'employee_id': employee_id, 'date': '2024-10-01', 'check_in_time': '09:00'})
+            per_call = events / (time.perf_counter() - started)
+
+            bulk_db = os.path.join(tmp, 'bulk.db')
+            _build_database(bulk_db, events)
+            app.config['DATABASE'] = bulk_db
+            client = _admin_client(app)
+            batch = [{'employee_id': i, 'event': 'check_in', 'date': '2024-10-01', 'time': '09:00'}
+                     for i in range(1, events + 1)]
+            started = time.perf_counter()
+            for offset in range(0, events, batch_size):
+                response = client.post('/api/attendance/bulk', json=batch[offset:offset + batch_size])
+                assert response.get_json()['failed'] == 0
+            bulk = events / (time.perf_counter() - started)
+        finally:
+            app.config['DATABASE'] = original_database
+
+    echo(f'per-call: {per_call:10.0f} events/s')
+    echo(f'bulk:     {bulk:10.0f} events/s (batches of {batch_size}, {bulk / per_call:.1f}x)')
+    return {'per_call_events_per_second': per_call, 'bulk_events_per_second': bulk}
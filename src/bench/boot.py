@@ -0,0 +1,59 @@
+"""
+Worker boot benchmark.
+
+Times what a gunicorn worker pays before it can serve: a fresh interpreter
+importing ``app`` against a database that ``init-db`` has already prepared.
+For comparison it also times the same import followed by ``init_database()``
+(migrations, demo COUNT checks and, on an empty file, the demo password
+hashes), which is what every worker used to run on import. Each row is the
+median of several runs in separate processes.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from database import connection as db
+from database import migrate
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+    ('interpreter + flask import', 'import flask', False),
+    ('worker boot (schema check only)', 'import app', False),
+    ('boot + init_database, existing db', 'import app; app.init_database()', False),
+    ('boot + init_database, fresh db', 'import app; app.init_database()', True),
+]
+
+
+def _time_process(code, database):
+    env = dict(os.environ, DATABASE_PATH=database, JOBS_WORKERS='0')
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=SRC_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def run(runs=5, echo=print):
+    """Median boot time per case, in milliseconds."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        prepared = os.path.join(tmp, 'prepared.db')
+        conn = db.open_connection(prepared)
+        migrate.migrate(conn)
+        conn.close()
+
+        for name, code, fresh in CASES:
+            times = []
+            for n in range(runs):
+                database = os.path.join(tmp, f'fresh-{len(results)}-{n}.db') if fresh else prepared
+                times.append(_time_process(code, database))
+            results[name] = statistics.median(times) * 1000
+
+    echo(f'median of {runs} runs, each in a new process')
+    echo(f"{'case':<36} {'ms':>8}")
+    for name, elapsed in results.items():
+        echo(f'{name:<36} {elapsed:>8.1f}')
+    return results
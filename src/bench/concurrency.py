@@ -0,0 +1,111 @@
+"""
+Read/write concurrency benchmark.
+
+Measures check-in latency (POST /api/attendance/mark_present, one write per
+request) from a few threads, first on an otherwise idle app and then while
+other threads pull the full payroll export (GET /api/export/payroll) over and
+over. Both phases run with read routing on and again with every request on
+the writer pool, so the two can be compared. With the report on read-only
+connections, check-in p95 should stay close to its idle value.
+"""
+import os
+import tempfile
+import threading
+import time
+
+from bench import dataset
+
+
+def _admin_client(app):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        # Generated datasets: user 1 is the admin
+        sess['user_id'] = 1
+        sess['role'] = 'admin'
+    return client
+
+
+def _check_ins(app, count, first_employee, day, latencies, errors):
+    client = _admin_client(app)
+    for i in range(count):
+        started = time.perf_counter()
+        response = client.post('/api/attendance/mark_present', json={
+            'employee_id': first_employee + i, 'date': day, 'check_in_time': '09:00'})
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+
+def _reports(app, stop, runs):
+    client = _admin_client(app)
+    while not stop.is_set():
+        response = client.get('/api/export/payroll')
+        response.get_data()  # drain the stream so the whole query runs
+        runs.append(response.status_code)
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))] * 1000
+
+
+def measure_phase(app, day, check_ins, writers, reports):
+    """Check-in latency stats for one phase, with ``reports`` export threads running alongside."""
+    latencies, errors, runs = [], [], []
+    stop = threading.Event()
+    report_threads = [threading.Thread(target=_reports, args=(app, stop, runs)) for _ in range(reports)]
+    for thread in report_threads:
+        thread.start()
+    if reports:
+        time.sleep(0.2)  # let the exports get going before the first check-in
+
+    per_writer = check_ins // writers
+    started = time.perf_counter()
+    writer_threads = [threading.Thread(target=_check_ins,
+                                       args=(app, per_writer, 1 + n * per_writer, day, latencies, errors))
+                      for n in range(writers)]
+    for thread in writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    for thread in report_threads:
+        thread.join()
+
+    latencies.sort()
+    return {'p50_ms': _percentile(latencies, 0.5), 'p95_ms': _percentile(latencies, 0.95),
+            'max_ms': latencies[-1] * 1000, 'check_ins_per_second': len(latencies) / elapsed,
+            'errors': len(errors), 'reports': len(runs)}
+
+
+def run(app, scale=5, years=1, check_ins=400, writers=4, reports=2, database=None, echo=print):
+    """Check-in latency idle and under a payroll export, with read routing on and off."""
+    original = app.config['DATABASE'], app.config['DATABASE_READ_ROUTING']
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            if database is None:
+                database = os.path.join(tmp, 'bench.db')
+                started = time.perf_counter()
+                counts = dataset.generate(database, scale=scale, years=years, echo=lambda message: None)
+                echo(f'generated {counts} in {time.perf_counter() - started:.1f}s')
+            app.config['DATABASE'] = database
+
+            # Each phase checks in on its own future day, so every request inserts a row
+            phases = [('read routing', True, 0), ('read routing', True, reports),
+                      ('writer pool only', False, 0), ('writer pool only', False, reports)]
+            for number, (mode, routing, report_threads) in enumerate(phases, start=1):
+                app.config['DATABASE_READ_ROUTING'] = routing
+                phase = 'during report' if report_threads else 'idle'
+                results[f'{mode}, {phase}'] = measure_phase(
+                    app, f'2099-01-{number:02d}', check_ins, writers, report_threads)
+        finally:
+            app.config['DATABASE'], app.config['DATABASE_READ_ROUTING'] = original
+
+    echo(f'{check_ins} check-ins from {writers} threads; {reports} threads exporting payroll alongside')
+    echo(f"{'mode':<34} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'per s':>8} {'errors':>7} {'reports':>8}")
+    for name, result in results.items():
+        echo(f"{name:<34} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['max_ms']:>8.2f} "
+             f"{result['check_ins_per_second']:>8.1f} {result['errors']:>7} {result['reports']:>8}")
+    return results
@@ -0,0 +1,164 @@
+"""
+Synthetic dataset generator.
+
+Builds a database at a given scale factor so pages and jobs can be measured
+at realistic sizes instead of against the ten demo employees. Scale 1 is a
+company of 1,000 employees; attendance covers every weekday of the last
+``years`` years, with one payroll run per month and a few leave requests per
+employee per year. Output is deterministic for a given seed.
+
+Rows are generated lazily and written with ``executemany`` inside a single
+transaction, with synchronous=OFF, so a scale-10 dataset takes seconds.
+"""
+import random
+from datetime import date, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from database import connection as db
+from database import migrate
+from services import payroll as payroll_engine
+
+EMPLOYEES_PER_SCALE = 1000
+DEMO_PASSWORD = 'pass123'
+ADMIN_PASSWORD = 'admin123'
+
+DEPARTMENTS = {
+    'IT': ['Software Developer', 'Data Analyst', 'Project Manager', 'QA Engineer'],
+    'Human Resources': ['HR Manager', 'Recruiter'],
+    'Sales': ['Sales Representative', 'Account Manager'],
+    'Finance': ['Accountant', 'Financial Analyst'],
+    'Marketing': ['Marketing Specialist', 'Content Writer'],
+    'Support': ['Customer Service', 'Support Engineer'],
+    'Operations': ['Operations Manager', 'Logistics Coordinator'],
+}
+FIRST_NAMES = ['James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda',
+               'David', 'Elizabeth', 'William', 'Susan', 'Richard', 'Jessica', 'Joseph', 'Sarah',
+               'Thomas', 'Karen', 'Daniel', 'Lisa', 'Amanda', 'Emily', 'Mike', 'Jane']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+              'Rodriguez', 'Martinez', 'Wilson', 'Anderson', 'Taylor', 'Thomas', 'Moore', 'Lee']
+LEAVE_TYPES = ['annual', 'sick', 'personal', 'maternity']
+
+
+def _weekdays(start, end):
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+
+def _month_starts(start, end):
+    month = date(start.year, start.month, 1)
+    while month <= end:
+        yield month
+        month = date(month.year + (month.month == 12), month.month % 12 + 1, 1)
+
+
+def _month_end(month):
+    following = date(month.year + (month.month == 12), month.month % 12 + 1, 1)
+    return following - timedelta(days=1)
+
+
+def _employees(rng, count, first_day):
+    departments = list(DEPARTMENTS)
+    span = (date.today() - first_day).days or 1
+    for i in range(1, count + 1):
+        department = rng.choice(departments)
+        yield (rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), f'employee{i}@staffsync.com',
+               f'555-{i % 10000:04d}', rng.choice(DEPARTMENTS[department]), department,
+               rng.choice([45000, 52000, 58000, 65000, 72000, 80000, 95000]),
+               (first_day + timedelta(days=rng.randrange(span))).isoformat(),
+               'Active' if rng.random() > 0.05 else 'Inactive')
+
+
+def _attendance(rng, employees, days):
+    for day in days:
+        day_text = day.isoformat()
+        for employee_id in range(1, employees + 1):
+            roll = rng.random()
+            if roll < 0.04:
+                yield employee_id, day_text, None, None, 0.0, 0.0, 'absent'
+                continue
+            late = roll < 0.12
+            check_in_minutes = 9 * 60 + (rng.randint(5, 45) if late else -rng.randint(0, 20))
+            worked_minutes = rng.choice([480, 480, 480, 495, 510, 540, 600])
+            check_out_minutes = check_in_minutes + worked_minutes
+            hours = worked_minutes / 60.0
+            yield (employee_id, day_text,
+                   f'{check_in_minutes // 60:02d}:{check_in_minutes % 60:02d}',
+                   f'{check_out_minutes // 60:02d}:{check_out_minutes % 60:02d}',
+                   hours, max(0.0, hours - 8), 'late' if late else 'present')
+
+
+def _leaves(rng, employees, first_day, last_day):
+    span = (last_day - first_day).days or 1
+    years = max(1, span // 365)
+    for employee_id in range(1, employees + 1):
+        for _ in range(rng.randint(1, 4) * years):
+            start = first_day + timedelta(days=rng.randrange(span))
+            days_count = rng.choice([1, 1, 2, 3, 5])
+            status = rng.choice(['approved', 'approved', 'approved', 'rejected', 'pending'])
+            yield (employee_id, rng.choice(LEAVE_TYPES), start.isoformat(),
+                   (start + timedelta(days=days_count - 1)).isoformat(), days_count,
+                   'Generated', status)
+
+
+def generate(path, scale=1.0, years=1, staff_users=100, seed=42, echo=print):
+    """Populate a new database at ``path``; returns the row counts written per table."""
+    rng = random.Random(seed)
+    employees = max(1, int(EMPLOYEES_PER_SCALE * scale))
+    last_day = date.today()
+    first_day = last_day - timedelta(days=365 * years)
+
+    conn = db.open_connection(path)
+    try:
+        migrate.migrate(conn)
+        if conn.execute('SELECT EXISTS (SELECT 1 FROM employees)').fetchone()[0]:
+            raise ValueError(f'{path} already contains employees; generate into a new file')
+
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.execute('BEGIN')
+
+        echo(f'employees: {employees}')
+        conn.executemany('''INSERT INTO employees
+                           (first_name, last_name, email, phone, position, department, salary, hire_date, status)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                         _employees(rng, employees, first_day))
+
+        # One hash shared by every generated staff account keeps generation fast
+        staff_hash = generate_password_hash(DEMO_PASSWORD)
+        conn.execute("INSERT INTO users (username, email, password_hash, role) VALUES (?, ?, ?, 'admin')",
+                     ('admin', 'admin@staffsync.com', generate_password_hash(ADMIN_PASSWORD)))
+        conn.executemany('''INSERT INTO users (username, email, password_hash, role, employee_id)
+                           VALUES (?, ?, ?, 'staff', ?)''',
+                         ((f'employee{i}', f'employee{i}@staffsync.com', staff_hash, i)
+                          for i in range(1, min(staff_users, employees) + 1)))
+
+        days = list(_weekdays(first_day, last_day))
+        echo(f'attendance: {employees * len(days)} slots over {len(days)} weekdays')
+        conn.executemany('''INSERT INTO attendance
+                           (employee_id, date, check_in_time, check_out_time, total_hours, overtime_hours, status)
+                           VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                         _attendance(rng, employees, days))
+
+        conn.executemany('''INSERT INTO leaves
+                           (employee_id, leave_type, start_date, end_date, days_count, reason, status)
+                           VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                         _leaves(rng, employees, first_day, last_day))
+
+        months = [month for month in _month_starts(first_day, last_day) if _month_end(month) < last_day]
+        echo(f'payroll: {len(months)} monthly periods')
+        for month in months:
+            payroll_engine.generate_payroll(conn, month.isoformat(), _month_end(month).isoformat())
+        # Everything but the latest run has been paid out
+        if months:
+            conn.execute("UPDATE payroll SET status = 'paid', processed_at = pay_period_end "
+                         "WHERE pay_period_start < ?", (months[-1].isoformat(),))
+        conn.commit()
+
+        counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                  for table in ('employees', 'users', 'attendance', 'leaves', 'payroll')}
+    finally:
+        conn.close()
+    return counts
@@ -0,0 +1,76 @@
+"""
+Login benchmark.
+
+Fires concurrent logins at POST /login through the Flask test client on a
+throwaway database and reports throughput and latency percentiles. Half of
+the users start with a legacy low-cost hash so the upgrade-on-login path is
+exercised too.
+"""
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+from database import connection as db
+from database import migrate
+from services import passwords
+
+PASSWORD = 'bench-password'
+
+
+def _build_database(path, users, hasher):
+    conn = db.open_connection(path)
+    migrate.migrate(conn)
+    current = hasher.hash(PASSWORD)
+    legacy = generate_password_hash(PASSWORD, 'pbkdf2:sha256:1000')
+    conn.executemany(
+        'INSERT INTO users (username, email, password_hash, role) VALUES (?, ?, ?, ?)',
+        ((f'bench{i}', f'bench{i}@example.com', legacy if i % 2 else current, 'employee')
+         for i in range(users)))
+    conn.commit()
+    conn.close()
+
+
+def _login(app, username):
+    client = app.test_client()
+    started = time.perf_counter()
+    response = client.post('/login', data={'username': username, 'password': PASSWORD})
+    return time.perf_counter() - started, response.status_code
+
+
+def run(app, users=50, concurrency=8, echo=print):
+    """Log ``users`` distinct users in from ``concurrency`` threads; returns timing stats."""
+    original_database = app.config['DATABASE']
+    hasher = passwords.get_hasher(app)
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            path = os.path.join(tmp, 'login.db')
+            _build_database(path, users, hasher)
+            app.config['DATABASE'] = path
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(lambda i: _login(app, f'bench{i}'), range(users)))
+            elapsed = time.perf_counter() - started
+
+            conn = db.open_connection(path)
+            stale = sum(1 for (stored,) in conn.execute('SELECT password_hash FROM users')
+                        if hasher.needs_rehash(stored))
+            conn.close()
+        finally:
+            app.config['DATABASE'] = original_database
+
+    latencies = sorted(latency for latency, _ in results)
+    ok = sum(1 for _, status in results if status == 302)
+    busy = sum(1 for _, status in results if status == 503)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+
+    echo(f'{users} logins from {concurrency} threads with {hasher.concurrency} hashing slots '
+         f'({hasher.method})')
+    echo(f'throughput: {users / elapsed:8.1f} logins/s')
+    echo(f'latency:    p50 {p50:7.1f} ms   p95 {p95:7.1f} ms')
+    echo(f'succeeded:  {ok}   busy (503): {busy}   hashes still needing upgrade: {stale}')
+    return {'logins_per_second': users / elapsed, 'p50_ms': p50, 'p95_ms': p95,
+            'succeeded': ok, 'busy': busy, 'stale_hashes': stale}
@@ -0,0 +1,104 @@
+"""
+Payroll generation benchmark.
+
+Builds throwaway databases of increasing size, times the set-based engine on
+each, and checks a sample of the generated rows against the original
+per-employee formulas. Time per employee should stay roughly constant as the
+company grows.
+"""
+import os
+import random
+import tempfile
+import time
+
+from database import connection as db
+from database import migrate
+from services import payroll as payroll_engine
+
+PERIOD_START = '2024-10-01'
+PERIOD_END = '2024-10-31'
+
+
+def legacy_payroll_row(salary, overtime_hours, include_overtime=True, include_tax=True):
+    """The per-employee formulas from the original generate_payroll() loop."""
+    basic_salary = float(salary or 0)
+    if include_overtime:
+        hourly_rate = basic_salary / (30 * 8)
+        overtime_pay = float(overtime_hours or 0) * hourly_rate * 1.5
+    else:
+        overtime_pay = 0
+    allowances = basic_salary * 0.1
+    gross_pay = basic_salary + overtime_pay + allowances
+    if include_tax:
+        tax_rate = 0.2 if gross_pay > 5000 else 0.15
+        tax_deduction = gross_pay * tax_rate
+    else:
+        tax_deduction = 0
+    other_deductions = gross_pay * 0.02
+    total_deductions = tax_deduction + other_deductions
+    net_pay = gross_pay - total_deductions
+    return (basic_salary, overtime_pay, allowances, gross_pay,
+            tax_deduction, other_deductions, total_deductions, net_pay)
+
+
+def _build_database(path, employees, days=22, seed=42):
+    rng = random.Random(seed)
+    conn = db.open_connection(path)
+    migrate.migrate(conn)
+    conn.executemany(
+        'INSERT INTO employees (first_name, last_name, email, salary, status) VALUES (?, ?, ?, ?, ?)',
+        ((f'First{i}', f'Last{i}', f'bench{i}@example.com',
+          rng.choice([3000, 4200, 4600, 5200, 6100, 75000]),
+          'Active' if i % 20 else 'Inactive')
+         for i in range(1, employees + 1)))
+    conn.executemany(
+        'INSERT INTO attendance (employee_id, date, total_hours, overtime_hours, status) VALUES (?, ?, ?, ?, ?)',
+        ((emp_id, f'2024-10-{day:02d}', 8.0, rng.choice([0, 0, 0, 0.25, 0.5, 1.25]), 'present')
+         for emp_id in range(1, employees + 1)
+         for day in range(1, days + 1)))
+    conn.commit()
+    return conn
+
+
+def _check_against_legacy(conn, sample=200):
+    rows = conn.execute(f'''
+        SELECT p.employee_id, e.salary,
+               (SELECT SUM(overtime_hours) FROM attendance a
+                WHERE a.employee_id = p.employee_id AND a.date BETWEEN ? AND ?),
+               {', '.join('p.' + c for c in payroll_engine.PAYROLL_COLUMNS)}
+        FROM payroll p JOIN employees e ON e.id = p.employee_id
+        ORDER BY RANDOM() LIMIT ?
+    ''', (PERIOD_START, PERIOD_END, sample)).fetchall()
+    mismatches = [row[0] for row in rows if tuple(row[3:]) != legacy_payroll_row(row[1], row[2])]
+    return len(rows), mismatches
+
+
+def run(sizes=(1000, 10000, 100000), echo=print):
+    """Time payroll generation at each size; returns a list of result dicts."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f'payroll_{size}.db')
+            conn = _build_database(path, size)
+            try:
+                started = time.perf_counter()
+                created = payroll_engine.generate_payroll(conn, PERIOD_START, PERIOD_END)
+                conn.commit()
+                elapsed = time.perf_counter() - started
+                checked, mismatches = _check_against_legacy(conn)
+            finally:
+                conn.close()
+
+            result = {
+                'employees': size,
+                'payroll_created': created,
+                'seconds': round(elapsed, 4),
+                'us_per_employee': round(elapsed / size * 1e6, 2),
+                'checked': checked,
+                'mismatches': len(mismatches),
+            }
+            results.append(result)
+            echo(f"{size:>8} employees: {created:>8} rows in {elapsed:8.3f}s "
+                 f"({result['us_per_employee']} us/employee), "
+                 f"{checked} rows checked, {len(mismatches)} mismatches")
+    return results
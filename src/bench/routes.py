@@ -0,0 +1,160 @@
+"""
+Route benchmark suite.
+
+Drives every page and API route through the Flask test client against a
+generated dataset (see ``bench.dataset``) and records p50/p95 latency and SQL
+statements per request for each. Results can be saved as a JSON baseline and
+later runs compared against it: a route regresses when its p95 grows past
+``threshold`` times the baseline (and by more than ``min_delta_ms``, so
+sub-millisecond noise does not fail the run) or when it issues more queries
+than it used to.
+
+Query counts come from the /metrics registry, so they are only reported when
+METRICS_ENABLED is on. Streamed exports run their query after the response
+has started and therefore show 0.
+"""
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from bench import dataset
+from services import metrics
+
+
+def _last_weekday(day):
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+def default_routes():
+    """``(name, role, method, path, kwargs)`` for each route worth measuring."""
+    today = date.today()
+    workday = _last_weekday(today).isoformat()
+    month_start = today.replace(day=1).isoformat()
+    month_ago = (today - timedelta(days=30)).isoformat()
+    return [
+        ('admin_dashboard', 'admin', 'GET', '/admin/dashboard', {}),
+        ('admin_employees', 'admin', 'GET', '/admin/employees', {}),
+        ('admin_employees_search', 'admin', 'GET', '/admin/employees?q=smith&sort=salary&dir=desc', {}),
+        ('admin_attendance', 'admin', 'GET', f'/admin/attendance?date={workday}', {}),
+        ('admin_payroll', 'admin', 'GET', '/admin/payroll', {}),
+        ('admin_payroll_filtered', 'admin', 'GET', '/admin/payroll?status=paid&sort=net', {}),
+        ('admin_departments', 'admin', 'GET', '/admin/departments', {}),
+        ('admin_settings', 'admin', 'GET', '/admin/settings', {}),
+        ('api_employee', 'admin', 'GET', '/api/employee/1', {}),
+        ('api_employee_search', 'admin', 'GET', '/api/employees/search?q=jo', {}),
+        ('api_employee_batch', 'admin', 'POST', '/api/employee/batch', {'json': {'ids': list(range(1, 101))}}),
+        ('api_payroll', 'admin', 'GET', '/api/payroll/1', {}),
+        ('export_payroll', 'admin', 'GET', '/api/export/payroll?status=paid', {}),
+        ('export_attendance', 'admin', 'GET', f'/api/export/attendance?start={month_ago}&end={workday}', {}),
+        # Re-running a period only re-reads inputs; the unique index turns the inserts into no-ops
+        ('generate_payroll', 'admin', 'POST', '/api/payroll/generate',
+         {'json': {'pay_period_start': month_start, 'pay_period_end': today.isoformat()}}),
+        ('mark_present', 'admin', 'POST', '/api/attendance/mark_present',
+         {'json': {'employee_id': 2, 'date': today.isoformat(), 'check_in_time': '09:00'}}),
+        ('staff_dashboard', 'staff', 'GET', '/staff/dashboard', {}),
+        ('staff_profile', 'staff', 'GET', '/staff/profile', {}),
+        ('staff_leave', 'staff', 'GET', '/staff/leave', {}),
+        ('staff_mark_attendance', 'staff', 'POST', '/staff/mark_attendance', {'data': {'action': 'checkin'}}),
+        ('login_page', None, 'GET', '/login', {}),
+    ]
+
+
+def _client(app, role):
+    client = app.test_client()
+    if role:
+        with client.session_transaction() as sess:
+            # Generated datasets: user 1 is the admin, user 2 is employee 1's staff account
+            sess['user_id'] = 1 if role == 'admin' else 2
+            sess['role'] = role
+            if role == 'staff':
+                sess['employee_id'] = 1
+    return client
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def measure(app, routes, iterations=20):
+    """Time each route ``iterations`` times after one warm-up request."""
+    registry = metrics.get_registry(app)
+    adapter = app.url_map.bind('localhost')
+    clients = {role: _client(app, role) for role in ('admin', 'staff', None)}
+    results = {}
+    for name, role, method, path, kwargs in routes:
+        client = clients[role]
+        endpoint = adapter.match(path.split('?')[0], method=method)[0]
+        client.open(path, method=method, **kwargs).get_data()
+        queries_before = registry.queries.totals((endpoint,)) if registry else None
+
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            response.get_data()  # drain streamed bodies so exports are timed in full
+            timings.append((time.perf_counter() - started) * 1000)
+
+        queries = None
+        if registry:
+            count, total = registry.queries.totals((endpoint,))
+            queries = round((total - queries_before[1]) / max(1, count - queries_before[0]), 2)
+        timings.sort()
+        results[name] = {
+            'status': response.status_code,
+            'p50_ms': round(_percentile(timings, 0.5), 3),
+            'p95_ms': round(_percentile(timings, 0.95), 3),
+            'queries': queries,
+        }
+    return results
+
+
+def compare(results, baseline, threshold=1.5, min_delta_ms=2.0):
+    """Return human-readable regressions of ``results`` against a saved baseline."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('routes', {}).get(name)
+        if not previous:
+            continue
+        if (current['p95_ms'] > previous['p95_ms'] * threshold
+                and current['p95_ms'] - previous['p95_ms'] > min_delta_ms):
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.1f} ms -> {current['p95_ms']:.1f} ms")
+        if (current['queries'] is not None and previous.get('queries') is not None
+                and current['queries'] > previous['queries']):
+            regressions.append(f"{name}: queries per request {previous['queries']} -> {current['queries']}")
+    return regressions
+
+
+def run(app, scale=0.1, years=1, iterations=20, database=None, echo=print):
+    """Benchmark every route against ``database`` (generated into a temp dir when not given)."""
+    original_database = app.config['DATABASE']
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            if database is None:
+                database = os.path.join(tmp, 'bench.db')
+                started = time.perf_counter()
+                counts = dataset.generate(database, scale=scale, years=years, echo=lambda message: None)
+                echo(f'generated {counts} in {time.perf_counter() - started:.1f}s')
+            app.config['DATABASE'] = database
+            results = measure(app, default_routes(), iterations)
+        finally:
+            app.config['DATABASE'] = original_database
+
+    echo(f"{'route':<26} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8}")
+    for name, result in results.items():
+        queries = '-' if result['queries'] is None else f"{result['queries']:g}"
+        echo(f"{name:<26} {result['status']:>6} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {queries:>8}")
+    return {'scale': scale, 'years': years, 'iterations': iterations, 'routes': results}
+
+
+def save_baseline(report, path):
+    with open(path, 'w') as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    with open(path) as fh:
+        return json.load(fh)
@@ -0,0 +1,312 @@
+"""
+StaffSync maintenance commands, available as ``flask staffsync <command>``.
+"""
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from database import connection as db
+from database import migrate as migrations
+
+staffsync_cli = AppGroup('staffsync', help='StaffSync maintenance commands.')
+
+
+def init_app(app):
+    app.cli.add_command(staffsync_cli)
+
+
+def _migrate():
+    conn = db.open_connection(current_app.config['DATABASE'])
+    try:
+        return migrations.migrate(conn)
+    finally:
+        conn.close()
+
+
+@staffsync_cli.command('init-db')
+def init_db_command():
+    """Create the database or upgrade its schema. Run once per deploy, before the workers start."""
+    started = time.perf_counter()
+    applied = _migrate()
+    elapsed = time.perf_counter() - started
+
+    if applied:
+        click.echo(f"Applied migrations {', '.join(str(v) for v in applied)} to "
+                   f"{current_app.config['DATABASE']} in {elapsed:.2f}s")
+    else:
+        click.echo(f"{current_app.config['DATABASE']} is at schema version {migrations.latest_version()}.")
+
+
+@staffsync_cli.command('migrate')
+def migrate_command():
+    """Apply pending schema migrations."""
+    applied = _migrate()
+    if applied:
+        click.echo(f"Applied migrations: {', '.join(str(v) for v in applied)}")
+    else:
+        click.echo('Database schema is up to date.')
+
+
+@staffsync_cli.command('seed-demo')
+def seed_demo_command():
+    """Load the demo accounts, employees, attendance and payroll into empty tables."""
+    from database import demo
+    from services import passwords
+
+    current, latest = migrations.schema_status(current_app.config['DATABASE'])
+    if current < latest:
+        raise click.ClickException(f'Schema is at version {current} of {latest}; run `flask staffsync init-db` first.')
+
+    conn = db.open_connection(current_app.config['DATABASE'])
+    try:
+        inserted = demo.seed(conn, passwords.get_hasher(current_app).hash)
+        conn.commit()
+    finally:
+        conn.close()
+
+    if inserted:
+        click.echo('Seeded ' + ', '.join(f'{count} {table}' for table, count in inserted.items()) + '.')
+    else:
+        click.echo('Every demo table already has data; nothing seeded.')
+
+
+@staffsync_cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute the dashboard counters from the base tables."""
+    from services import stats
+
+    conn = db.open_connection(current_app.config['DATABASE'])
+    try:
+        drifted = stats.rebuild(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+    for section, key in drifted:
+        click.echo(f'Repaired {section}: {key}')
+    click.echo(f'Dashboard counters rebuilt ({len(drifted)} drifted).')
+
+
+@staffsync_cli.command('verify-rollups')
+def verify_rollups_command():
+    """Check the monthly attendance rollups against raw attendance."""
+    from services import rollups
+
+    conn = db.open_connection(current_app.config['DATABASE'])
+    try:
+        mismatches = rollups.verify(conn)
+    finally:
+        conn.close()
+
+    for month, employee_id, column, stored, actual in mismatches[:50]:
+        click.echo(f'{month} employee {employee_id}: {column} is {stored}, raw data says {actual}')
+    if mismatches:
+        raise click.ClickException(f'{len(mismatches)} rollup value(s) differ; run rebuild-rollups.')
+    click.echo('Attendance rollups match the raw data.')
+
+
+@staffsync_cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute the monthly attendance rollups from raw attendance."""
+    from services import rollups
+
+    conn = db.open_connection(current_app.config['DATABASE'])
+    try:
+        drifted = rollups.rebuild(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+    for month, employee_id in drifted:
+        click.echo(f'Repaired {month} for employee {employee_id}')
+    click.echo(f'Attendance rollups rebuilt ({len(drifted)} drifted).')
+
+
+@staffsync_cli.command('archive-attendance')
+@click.option('--before', help='Archive attendance dated before this day (YYYY-MM-DD). '
+                               'Defaults to ATTENDANCE_ARCHIVE_AFTER_MONTHS months ago.')
+def archive_attendance_command(before):
+    """Move old attendance into the per-year archive files."""
+    from datetime import date
+
+    from services import archive
+    from services import settings
+
+    conn = db.open_connection(current_app.config['DATABASE'])
+    started = time.perf_counter()
+    try:
+        today = settings.now(settings.current(conn)).date()
+        before = before or archive.horizon(today, current_app.config['ATTENDANCE_ARCHIVE_AFTER_MONTHS'])
+        try:
+            before = date.fromisoformat(before).isoformat()
+        except ValueError:
+            raise click.ClickException(f'Invalid date: {before}')
+        result = archive.archive(conn, before, current_app.config['ATTENDANCE_ARCHIVE_BATCH_SIZE'])
+    finally:
+        conn.close()
+
+    click.echo(f"Archived attendance before {result['archived_before']}: copied {result['copied']} rows, "
+               f"removed {result['deleted']} from the hot table in {time.perf_counter() - started:.1f}s "
+               f"(years: {', '.join(str(y) for y in result['years']) or 'none'}).")
+
+
+@staffsync_cli.command('import-employees')
+@click.argument('csv_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows inserted per transaction.')
+def import_employees_command(csv_file, chunk_size):
+    """Import employees from CSV_FILE (header: first_name,last_name,email,...)."""
+    from services import employee_import
+
+    conn = db.open_connection(current_app.config['DATABASE'])
+    started = time.perf_counter()
+    try:
+        report = employee_import.import_employees(conn, csv_file, chunk_size)
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - started
+
+    for line, email in report.duplicates:
+        click.echo(f'line {line}: duplicate email {email}')
+    for line, message in report.errors:
+        click.echo(f'line {line}: {message}')
+    click.echo(f'Imported {report.inserted} of {report.processed} rows '
+               f'({len(report.duplicates)} duplicates, {len(report.errors)} errors) '
+               f'in {elapsed:.2f}s, {report.processed / elapsed if elapsed else 0:.0f} rows/s')
+
+
+@staffsync_cli.command('bench-payroll')
+@click.option('--sizes', default='1000,10000,100000', show_default=True,
+              help='Comma-separated employee counts to benchmark.')
+def bench_payroll_command(sizes):
+    """Benchmark set-based payroll generation at increasing company sizes."""
+    from bench import payroll as payroll_bench
+
+    results = payroll_bench.run([int(s) for s in sizes.split(',')], echo=click.echo)
+    if any(r['mismatches'] for r in results):
+        raise click.ClickException('Payroll results differ from the per-employee formulas.')
+
+
+@staffsync_cli.command('bench-attendance')
+@click.option('--events', default=5000, show_default=True, help='Number of check-in events.')
+@click.option('--batch-size', default=1000, show_default=True, help='Events per bulk request.')
+def bench_attendance_command(events, batch_size):
+    """Compare per-call and bulk attendance ingestion throughput."""
+    from bench import attendance as attendance_bench
+
+    attendance_bench.run(current_app._get_current_object(), events, batch_size, echo=click.echo)
+
+
+@staffsync_cli.command('bench-login')
+@click.option('--users', default=50, show_default=True, help='Number of distinct users logging in.')
+@click.option('--concurrency', default=8, show_default=True, help='Concurrent login threads.')
+def bench_login_command(users, concurrency):
+    """Measure login throughput and latency under concurrent load."""
+    from bench import login as login_bench
+
+    login_bench.run(current_app._get_current_object(), users, concurrency, echo=click.echo)
+
+
+@staffsync_cli.command('bench-concurrency')
+@click.option('--database', type=click.Path(exists=True, dir_okay=False),
+              help='Existing generated database; a fresh one is generated when omitted.')
+@click.option('--scale', default=5.0, show_default=True, help='Scale factor for the generated dataset.')
+@click.option('--check-ins', default=400, show_default=True, help='Check-ins per phase.')
+@click.option('--writers', default=4, show_default=True, help='Concurrent check-in threads.')
+@click.option('--reports', default=2, show_default=True, help='Concurrent payroll export threads.')
+def bench_concurrency_command(database, scale, check_ins, writers, reports):
+    """Measure check-in latency while a large payroll report runs, with read routing on and off."""
+    from bench import concurrency as concurrency_bench
+
+    concurrency_bench.run(current_app._get_current_object(), scale, 1, check_ins, writers, reports,
+                          database, echo=click.echo)
+
+
+@staffsync_cli.command('bench-boot')
+@click.option('--runs', default=5, show_default=True, help='Processes started per case.')
+def bench_boot_command(runs):
+    """Measure worker boot time, with and without the old import-time database init."""
+    from bench import boot as boot_bench
+
+    boot_bench.run(runs, echo=click.echo)
+
+
+@staffsync_cli.command('generate-dataset')
+@click.argument('path', type=click.Path(dir_okay=False))
+@click.option('--scale', default=1.0, show_default=True, help='Scale factor; 1 = 1,000 employees.')
+@click.option('--years', default=1, show_default=True, help='Years of attendance history.')
+@click.option('--staff-users', default=100, show_default=True, help='Staff login accounts to create.')
+@click.option('--seed', default=42, show_default=True, help='Random seed.')
+def generate_dataset_command(path, scale, years, staff_users, seed):
+    """Generate a synthetic database at PATH for benchmarking."""
+    from bench import dataset
+
+    started = time.perf_counter()
+    try:
+        counts = dataset.generate(path, scale, years, staff_users, seed, echo=click.echo)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    summary = ', '.join(f'{count} {table}' for table, count in counts.items())
+    click.echo(f'Wrote {summary} in {time.perf_counter() - started:.1f}s')
+
+
+@staffsync_cli.command('bench-routes')
+@click.option('--database', type=click.Path(exists=True, dir_okay=False),
+              help='Existing generated database; a fresh one is generated when omitted.')
+@click.option('--scale', default=0.1, show_default=True, help='Scale factor for the generated dataset.')
+@click.option('--years', default=1, show_default=True, help='Years of attendance history to generate.')
+@click.option('--iterations', default=20, show_default=True, help='Timed requests per route.')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False),
+              help='JSON baseline to compare against; regressions fail the command.')
+@click.option('--threshold', default=1.5, show_default=True, help='Allowed p95 growth factor.')
+@click.option('--save', type=click.Path(dir_okay=False), help='Write this run as a JSON baseline.')
+def bench_routes_command(database, scale, years, iterations, baseline, threshold, save):
+    """Measure p50/p95 latency and queries per request for every route."""
+    from bench import routes as routes_bench
+
+    report = routes_bench.run(current_app._get_current_object(), scale, years, iterations,
+                              database, echo=click.echo)
+    if save:
+        routes_bench.save_baseline(report, save)
+        click.echo(f'Baseline written to {save}')
+    if baseline:
+        regressions = routes_bench.compare(report['routes'], routes_bench.load_baseline(baseline), threshold)
+        if regressions:
+            raise click.ClickException('Routes regressed:\n  ' + '\n  '.join(regressions))
+        click.echo('No regressions against baseline.')
+
+
+@staffsync_cli.command('leave-rollover')
+@click.option('--year', type=int, help='Year being closed; defaults to last year.')
+@click.option('--batch-size', default=500, show_default=True, help='Employees per transaction.')
+def leave_rollover_command(year, batch_size):
+    """Open next year's leave balances, carrying unused days over per policy."""
+    from services import leave
+    from services import settings
+
+    conn = db.open_connection(current_app.config['DATABASE'])
+    try:
+        year = year or settings.now(settings.current(conn)).year - 1
+        processed = leave.rollover(conn, year, batch_size,
+                                   progress=lambda done: click.echo(f'{done} employees rolled over'))
+    finally:
+        conn.close()
+    click.echo(f'Leave balances for {year + 1} opened for {processed} employees.')
+
+
+@staffsync_cli.command('run-jobs')
+@click.option('--workers', default=2, show_default=True, help='Number of job workers.')
+@click.option('--mode', type=click.Choice(['thread', 'process']), default='thread', show_default=True)
+def run_jobs_command(workers, mode):
+    """Run background job workers in the foreground until interrupted."""
+    from services import jobs
+
+    pool = jobs.WorkerPool(jobs.worker_settings(current_app), workers, mode)
+    pool.start()
+    click.echo(f'Running {workers} job worker(s) in {mode} mode. Press Ctrl+C to stop.')
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        click.echo('Stopping job workers...')
+        pool.stop(timeout=30)
@@ -9,7 +9,57 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-change-this-in-production'
     
     # Database settings
-    DATABASE_PATH = 'staffsync.db'
+    # Relative paths are resolved against src/. Create or upgrade the schema with `flask staffsync init-db`.
+    DATABASE_PATH = os.environ.get('DATABASE_PATH', 'staffsync.db')
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 8))  # Idle connections kept per worker
+    DATABASE_BUSY_TIMEOUT_MS = int(os.environ.get('DATABASE_BUSY_TIMEOUT_MS', 5000))
+    DATABASE_STATEMENT_CACHE = 256  # Prepared statements cached per connection
+    # GET/HEAD requests read through read-only connections; off sends everything to the writer pool
+    DATABASE_READ_ROUTING = os.environ.get('DATABASE_READ_ROUTING', 'True').lower() == 'true'
+    
+    # Per-worker cache of staff profile rows; other workers see edits within the TTL
+    EMPLOYEE_CACHE_SIZE = 4096
+    EMPLOYEE_CACHE_TTL = 30  # seconds
+    
+    # Per-worker cache of payroll analytics results, keyed by the payroll data version
+    ANALYTICS_CACHE_SIZE = 256
+    
+    # Bulk attendance ingestion (/api/attendance/bulk)
+    ATTENDANCE_BULK_MAX_EVENTS = int(os.environ.get('ATTENDANCE_BULK_MAX_EVENTS', 5000))
+    
+    # Attendance older than this many months is moved to per-year archive files by the
+    # attendance.archive job or `flask staffsync archive-attendance`. Archived days are read-only.
+    ATTENDANCE_ARCHIVE_AFTER_MONTHS = int(os.environ.get('ATTENDANCE_ARCHIVE_AFTER_MONTHS', 24))
+    ATTENDANCE_ARCHIVE_BATCH_SIZE = 1000  # rows per archive transaction; each delete batch holds the write lock
+    
+    # Password hashing. Stored hashes made with other parameters are upgraded at login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_SALT_LENGTH = 16
+    PASSWORD_HASH_CONCURRENCY = int(os.environ.get('PASSWORD_HASH_CONCURRENCY', os.cpu_count() or 2))
+    PASSWORD_HASH_QUEUE_TIMEOUT = 5  # seconds to wait for a free hashing slot before answering 503
+    
+    # Per-route latency and per-request SQL metrics, served at /metrics in Prometheus format
+    # to logged-in admins, and to scrapers sending "Authorization: Bearer <METRICS_TOKEN>"
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', 'False').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # Background jobs (payroll runs, exports, imports). Workers run inside each web
+    # worker process; set JOBS_WORKERS=0 and use `flask staffsync run-jobs` to run them separately.
+    JOBS_WORKERS = int(os.environ.get('JOBS_WORKERS', 2))
+    JOBS_WORKER_MODE = os.environ.get('JOBS_WORKER_MODE', 'thread')  # 'thread' or 'process'
+    JOBS_POLL_INTERVAL = 1.0  # seconds between checks for queued jobs
+    JOBS_STALE_AFTER = 600  # a running job silent this long is marked failed
+    JOBS_DIR = os.environ.get('JOBS_DIR')  # export files and uploads; defaults next to the database
+    
+    # Notifications. Each open stream holds a request thread, so streams are capped per
+    # process; browsers turned away (or with NOTIFICATIONS_STREAM off) poll every 30 seconds.
+    NOTIFICATIONS_STREAM = os.environ.get('NOTIFICATIONS_STREAM', 'True').lower() == 'true'
+    NOTIFICATIONS_MAX_STREAMS = int(os.environ.get('NOTIFICATIONS_MAX_STREAMS', 32))
+    NOTIFICATIONS_STREAM_TIMEOUT = 300  # seconds before a stream closes and the browser reconnects
+    NOTIFICATIONS_KEEPALIVE = 15  # seconds between keep-alive comments on an idle stream
+    NOTIFICATIONS_POLL_INTERVAL = 1.0  # seconds between checks for rows written by other processes
+    NOTIFICATIONS_RETENTION_DAYS = 30
     
     # Session settings
     PERMANENT_SESSION_LIFETIME = timedelta(hours=2)
@@ -41,7 +91,7 @@ class TestingConfig(Config):
     """Testing configuration."""
     DEBUG = True
     TESTING = True
-    DATABASE_PATH = 'test_staffsync.db'
+    DATABASE_PATH = os.environ.get('DATABASE_PATH', 'test_staffsync.db')
 
 # Configuration dictionary
 config = {
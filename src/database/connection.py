@@ -0,0 +1,386 @@
+"""
+SQLite connection management for StaffSync.
+
+Connections are opened once per worker process, tuned with the pragmas below
+and kept in a small pool. Each Flask app context checks out at most one
+connection through ``get_db_connection()`` and hands it back in teardown, so
+routes never open or close connections themselves.
+
+Requests are routed between two pools. GET and HEAD requests read through
+read-only connections (``mode=ro`` and ``PRAGMA query_only``), which under WAL
+see a stable snapshot and never queue for the write lock. Everything else
+gets a writer connection. Writers in one process take turns through a
+process-wide lock per database file, from their first write (an
+INSERT/UPDATE/DELETE, a ``WITH`` that writes, or ``BEGIN IMMEDIATE``) until
+commit or rollback, so concurrent check-ins wait in line here instead of
+backing off in SQLite's busy handler. A plain ``BEGIN`` only reads until it
+writes, so a ``snapshot()`` on a writer connection never takes the lock. Job and
+notification threads open their connections with ``serialize_writes`` and
+queue on the same lock. GET handlers that must write ask for
+``get_write_connection()`` explicitly; report queries in other requests can
+ask for ``get_read_connection()``.
+
+Each read statement outside a transaction sees the latest commit, so a page
+built from several queries wraps them in ``snapshot()`` to read them all
+from one point in time.
+
+When metrics are enabled the pools hand out instrumented connections, which
+count the statements they run and the time spent executing them (up to the
+first row; fetching the rest is not timed) so each request can report its SQL
+cost.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from flask import current_app, g, has_request_context, request
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+DEFAULT_STATEMENT_CACHE = 256
+
+READ_METHODS = ('GET', 'HEAD')
+
+# Statements Python's sqlite3 opens a transaction for
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+# Transactions that take SQLite's write lock as soon as they begin
+_WRITE_TRANSACTION_RE = re.compile(r'^BEGIN\s+(?:IMMEDIATE|EXCLUSIVE)\b')
+
+_WRITE_KEYWORD_RE = re.compile(r'\b(?:INSERT|UPDATE|DELETE|REPLACE)\b')
+
+_writer_locks = {}
+_writer_locks_guard = threading.Lock()
+_writer_locks_pid = os.getpid()
+
+
+def starts_write(sql):
+    """Whether ``sql`` writes: a write, a WITH ending in one, or BEGIN IMMEDIATE/EXCLUSIVE.
+
+    A plain (deferred) BEGIN or a SAVEPOINT is not: it reads until its first write.
+    """
+    statement = sql.lstrip().upper()
+    if statement.startswith(WRITE_STATEMENTS) or _WRITE_TRANSACTION_RE.match(statement):
+        return True
+    return statement.startswith('WITH') and _WRITE_KEYWORD_RE.search(statement) is not None
+
+
+def writer_lock(path):
+    """The lock this process's writers to the database at ``path`` take turns on."""
+    global _writer_locks_pid
+    with _writer_locks_guard:
+        if _writer_locks_pid != os.getpid():
+            # Locks held by the parent's threads mean nothing in a forked child
+            _writer_locks.clear()
+            _writer_locks_pid = os.getpid()
+        return _writer_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.connection.record_query(time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.connection.record_query(time.perf_counter() - started)
+
+    def executescript(self, sql_script):
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self.connection.record_query(time.perf_counter() - started)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """A connection that tallies statements run and seconds spent executing them."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reset_query_stats()
+
+    def reset_query_stats(self):
+        self.query_count = 0
+        self.query_seconds = 0.0
+
+    def record_query(self, elapsed):
+        self.query_count += 1
+        self.query_seconds += elapsed
+
+    # The C-level shortcuts bypass Python cursor subclasses, so route them through cursor()
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+class SerializedWrites:
+    """Connection mixin holding ``writer_lock`` from a transaction's first write until it ends.
+
+    Statements have to go through the connection's own execute methods, as
+    everything handed out by the pool does.
+    """
+    writer_lock = None
+    writer_timeout = DEFAULT_BUSY_TIMEOUT_MS / 1000.0
+    _holds_writer_lock = False
+
+    def _begin_write(self, sql):
+        # Checked inside open transactions too: a deferred one takes the lock at its first write
+        if self._holds_writer_lock or self.writer_lock is None:
+            return
+        if not starts_write(sql):
+            return
+        if not self.writer_lock.acquire(timeout=self.writer_timeout):
+            raise sqlite3.OperationalError('database is locked (timed out waiting for the writer lock)')
+        self._holds_writer_lock = True
+
+    def _end_write(self):
+        if self._holds_writer_lock and not self.in_transaction:
+            self._holds_writer_lock = False
+            self.writer_lock.release()
+
+    def execute(self, sql, parameters=()):
+        self._begin_write(sql)
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._end_write()
+
+    def executemany(self, sql, seq_of_parameters):
+        self._begin_write(sql)
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._end_write()
+
+    def executescript(self, sql_script):
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self._end_write()
+
+    def commit(self):
+        try:
+            super().commit()
+        finally:
+            self._end_write()
+
+    def rollback(self):
+        try:
+            super().rollback()
+        finally:
+            self._end_write()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            if self._holds_writer_lock:
+                self._holds_writer_lock = False
+                self.writer_lock.release()
+
+
+class WriterConnection(SerializedWrites, sqlite3.Connection):
+    pass
+
+
+class InstrumentedWriterConnection(SerializedWrites, InstrumentedConnection):
+    pass
+
+
+def open_connection(path, busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS,
+                    statement_cache=DEFAULT_STATEMENT_CACHE, factory=sqlite3.Connection,
+                    read_only=False, serialize_writes=False):
+    """Open a tuned SQLite connection. Callers outside a request must close it.
+
+    With ``serialize_writes`` its write transactions take turns with the
+    request writers of this process (see ``SerializedWrites``).
+    """
+    serialize_writes = serialize_writes and not read_only
+    if serialize_writes and not issubclass(factory, SerializedWrites):
+        factory = WriterConnection
+    target = f'file:{quote(os.path.abspath(path))}?mode=ro' if read_only else path
+    conn = sqlite3.connect(target,
+                           timeout=busy_timeout_ms / 1000.0,
+                           cached_statements=statement_cache,
+                           check_same_thread=False,
+                           factory=factory,
+                           uri=read_only)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f'PRAGMA busy_timeout={int(busy_timeout_ms)}')
+    if read_only:
+        conn.execute('PRAGMA query_only=ON')
+    else:
+        # WAL lets readers run alongside the writer; NORMAL sync is safe under WAL
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+    if serialize_writes:
+        conn.writer_lock = writer_lock(path)
+        conn.writer_timeout = busy_timeout_ms / 1000.0
+    return conn
+
+
+@contextmanager
+def snapshot(conn):
+    """Run the block's reads in one transaction, so they all see the same commit.
+
+    The deferred BEGIN takes no lock, so on a writer connection the block does
+    not hold up other writers. Nothing in the block may ATTACH an archive:
+    SQLite refuses to inside a transaction. Within a transaction that is
+    already open this adds nothing.
+    """
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute('BEGIN')
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+class ConnectionPool:
+    """A per-process pool of idle connections to a single database file.
+
+    A read-only pool opens ``mode=ro`` connections; any other pool serializes
+    its connections' write transactions through the file's ``writer_lock``.
+    """
+
+    def __init__(self, path, size=DEFAULT_POOL_SIZE,
+                 busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS,
+                 statement_cache=DEFAULT_STATEMENT_CACHE, instrument=False, read_only=False):
+        self.path = path
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.statement_cache = statement_cache
+        self.instrument = instrument
+        self.read_only = read_only
+        if read_only:
+            self.factory = InstrumentedConnection if instrument else sqlite3.Connection
+        else:
+            self.factory = InstrumentedWriterConnection if instrument else WriterConnection
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def acquire(self):
+        with self._lock:
+            self._check_fork()
+            if self._idle:
+                conn = self._idle.pop()
+                if self.instrument:
+                    conn.reset_query_stats()
+                return conn
+        return open_connection(self.path, self.busy_timeout_ms, self.statement_cache, self.factory,
+                               read_only=self.read_only, serialize_writes=not self.read_only)
+
+    def release(self, conn):
+        try:
+            # Never hand a half-finished transaction to the next request
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+
+        with self._lock:
+            if self._pid == os.getpid() and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def _check_fork(self):
+        # SQLite handles must not cross a fork (gunicorn --preload); start fresh in the child
+        if self._pid != os.getpid():
+            self._idle = []
+            self._pid = os.getpid()
+
+
+def init_app(app):
+    """Attach the connection pools to ``app`` and release connections on teardown."""
+    app.config.setdefault('DATABASE_POOL_SIZE', DEFAULT_POOL_SIZE)
+    app.config.setdefault('DATABASE_BUSY_TIMEOUT_MS', DEFAULT_BUSY_TIMEOUT_MS)
+    app.config.setdefault('DATABASE_STATEMENT_CACHE', DEFAULT_STATEMENT_CACHE)
+    app.config.setdefault('DATABASE_READ_ROUTING', True)
+    app.teardown_appcontext(release_db_connection)
+
+
+def get_pool(app, read_only=False):
+    key = 'staffsync_db_ro' if read_only else 'staffsync_db'
+    pool = app.extensions.get(key)
+    if pool is None or pool.path != app.config['DATABASE']:
+        pool = ConnectionPool(app.config['DATABASE'],
+                              size=app.config['DATABASE_POOL_SIZE'],
+                              busy_timeout_ms=app.config['DATABASE_BUSY_TIMEOUT_MS'],
+                              statement_cache=app.config['DATABASE_STATEMENT_CACHE'],
+                              instrument=app.config.get('METRICS_ENABLED', False),
+                              read_only=read_only)
+        app.extensions[key] = pool
+    return pool
+
+
+# g attribute holding each kind of checked-out connection
+_CONNECTION_SLOTS = (('_db_conn', False), ('_db_read_conn', True))
+
+
+def get_write_connection():
+    """Return the writer connection bound to the current app context, checking one out if needed."""
+    conn = g.get('_db_conn')
+    if conn is None:
+        conn = g._db_conn = get_pool(current_app).acquire()
+    return conn
+
+
+def get_read_connection():
+    """Return a read-only connection bound to the current app context, checking one out if needed."""
+    if not current_app.config['DATABASE_READ_ROUTING']:
+        return get_write_connection()
+    conn = g.get('_db_read_conn')
+    if conn is None:
+        conn = g._db_read_conn = get_pool(current_app, read_only=True).acquire()
+    return conn
+
+
+def get_db_connection():
+    """The connection for the current request: read-only for GET and HEAD, the writer otherwise."""
+    if has_request_context() and request.method in READ_METHODS:
+        return get_read_connection()
+    return get_write_connection()
+
+
+def checked_out_connections():
+    """The connections the current app context holds."""
+    return [conn for attr, _ in _CONNECTION_SLOTS if (conn := g.get(attr)) is not None]
+
+
+def release_db_connection(exc=None):
+    for attr, read_only in _CONNECTION_SLOTS:
+        conn = g.pop(attr, None)
+        if conn is not None:
+            get_pool(current_app, read_only).release(conn)
@@ -0,0 +1,131 @@
+"""
+Demo data for a fresh StaffSync database: an admin, five staff accounts, ten
+employees, today's and yesterday's attendance and two months of payroll.
+
+Loaded by ``flask staffsync seed-demo`` (and by ``run.py`` for local
+development), never when a worker starts. Each table is filled only while it
+is empty, so seeding twice changes nothing.
+"""
+from datetime import date, timedelta
+
+# (username, email, password, role)
+USERS = [
+    ('admin', 'admin@staffsync.com', 'admin123', 'admin'),
+    ('john.doe', 'john.doe@staffsync.com', 'pass123', 'staff'),
+    ('jane.smith', 'jane.smith@staffsync.com', 'pass123', 'staff'),
+    ('mike.johnson', 'mike.johnson@staffsync.com', 'pass123', 'staff'),
+    ('sarah.wilson', 'sarah.wilson@staffsync.com', 'pass123', 'staff'),
+    ('david.brown', 'david.brown@staffsync.com', 'pass123', 'staff'),
+]
+
+EMPLOYEES = [
+    ('John', 'Doe', 'john.doe@staffsync.com', '555-0101', 'Software Developer', 'IT', 75000, '2023-01-15', 'Active'),
+    ('Jane', 'Smith', 'jane.smith@staffsync.com', '555-0102', 'HR Manager', 'Human Resources', 65000, '2023-02-01', 'Active'),
+    ('Mike', 'Johnson', 'mike.johnson@staffsync.com', '555-0103', 'Sales Representative', 'Sales', 55000, '2023-03-10', 'Active'),
+    ('Sarah', 'Wilson', 'sarah.wilson@staffsync.com', '555-0104', 'Accountant', 'Finance', 60000, '2023-01-20', 'Active'),
+    ('David', 'Brown', 'david.brown@staffsync.com', '555-0105', 'Marketing Specialist', 'Marketing', 58000, '2023-04-05', 'Active'),
+    ('Emily', 'Davis', 'emily.davis@staffsync.com', '555-0106', 'Designer', 'Creative', 62000, '2023-05-12', 'Active'),
+    ('Robert', 'Miller', 'robert.miller@staffsync.com', '555-0107', 'Project Manager', 'IT', 80000, '2023-01-08', 'Active'),
+    ('Lisa', 'Garcia', 'lisa.garcia@staffsync.com', '555-0108', 'Customer Service', 'Support', 45000, '2023-06-15', 'Active'),
+    ('James', 'Wilson', 'james.wilson@staffsync.com', '555-0109', 'Data Analyst', 'IT', 70000, '2023-02-28', 'Active'),
+    ('Amanda', 'Taylor', 'amanda.taylor@staffsync.com', '555-0110', 'Operations Manager', 'Operations', 75000, '2023-03-22', 'Active')
+]
+
+# (employee_id, start, end, basic_salary, overtime_pay, allowances, tax_deduction,
+#  other_deductions, total_deductions, net_pay, status); gross and net pay are derived
+PAYROLL = [
+    # October 2024 payroll
+    (1, '2024-10-01', '2024-10-31', 75000/12, 500, 750, 500, 150, 650, 0, 'processed'),
+    (2, '2024-10-01', '2024-10-31', 65000/12, 200, 650, 400, 120, 520, 0, 'processed'),
+    (3, '2024-10-01', '2024-10-31', 55000/12, 300, 550, 350, 100, 450, 0, 'paid'),
+    (4, '2024-10-01', '2024-10-31', 60000/12, 150, 600, 375, 110, 485, 0, 'paid'),
+    (5, '2024-10-01', '2024-10-31', 58000/12, 250, 580, 360, 105, 465, 0, 'processed'),
+
+    # September 2024 payroll (completed)
+    (1, '2024-09-01', '2024-09-30', 75000/12, 600, 750, 550, 160, 710, 0, 'paid'),
+    (2, '2024-09-01', '2024-09-30', 65000/12, 150, 650, 420, 125, 545, 0, 'paid'),
+    (3, '2024-09-01', '2024-09-30', 55000/12, 400, 550, 380, 110, 490, 0, 'paid'),
+    (4, '2024-09-01', '2024-09-30', 60000/12, 200, 600, 400, 120, 520, 0, 'paid'),
+    (5, '2024-09-01', '2024-09-30', 58000/12, 300, 580, 390, 115, 505, 0, 'paid'),
+]
+
+
+def attendance(today):
+    """Attendance rows for ``today`` and the day before."""
+    yesterday = (today - timedelta(days=1)).isoformat()
+    today = today.isoformat()
+    return [
+        # Today's attendance - mixed scenarios
+        (1, today, '09:00', '17:00', 8.0, 0.0, 'present', 'On time'),
+        (2, today, '09:15', '17:30', 8.25, 0.25, 'late', 'Late arrival'),
+        (3, today, '08:45', '18:00', 9.25, 1.25, 'present', 'Early arrival, overtime'),
+        (4, today, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular hours'),
+        (5, today, '09:30', '17:00', 7.5, 0.0, 'late', 'Late arrival'),
+        (6, today, '09:00', None, 0.0, 0.0, 'present', 'Currently working'),
+        (7, today, '09:00', '13:00', 4.0, 0.0, 'half_day', 'Half day leave'),
+        (8, today, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular hours'),
+        (9, today, None, None, 0.0, 0.0, 'absent', 'Sick leave'),
+        (10, today, '08:30', '17:30', 9.0, 1.0, 'present', 'Overtime'),
+
+        # Yesterday's attendance - full day records
+        (1, yesterday, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular day'),
+        (2, yesterday, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular day'),
+        (3, yesterday, '08:45', '17:15', 8.5, 0.5, 'present', 'Extra work'),
+        (4, yesterday, '09:15', '17:00', 7.75, 0.0, 'late', 'Late start'),
+        (5, yesterday, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular day'),
+        (6, yesterday, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular day'),
+        (7, yesterday, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular day'),
+        (8, yesterday, None, None, 0.0, 0.0, 'absent', 'Personal leave'),
+        (9, yesterday, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular day'),
+        (10, yesterday, '09:00', '17:00', 8.0, 0.0, 'present', 'Regular day')
+    ]
+
+
+def _is_empty(conn, table):
+    return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] == 0
+
+
+def seed(conn, hash_password, today=None):
+    """Insert the demo rows into whichever tables are empty. Returns ``{table: rows inserted}``.
+
+    ``hash_password`` turns a plain password into a stored hash. The caller commits.
+    """
+    inserted = {}
+
+    if _is_empty(conn, 'users'):
+        conn.executemany('INSERT INTO users (username, email, password_hash, role) VALUES (?, ?, ?, ?)',
+                         [(username, email, hash_password(password), role)
+                          for username, email, password, role in USERS])
+        inserted['users'] = len(USERS)
+
+    if _is_empty(conn, 'employees'):
+        conn.executemany('''
+            INSERT INTO employees (first_name, last_name, email, phone, position, department, salary, hire_date, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', EMPLOYEES)
+        inserted['employees'] = len(EMPLOYEES)
+
+    if _is_empty(conn, 'attendance'):
+        rows = attendance(today or date.today())
+        conn.executemany('''
+            INSERT INTO attendance (employee_id, date, check_in_time, check_out_time, total_hours, overtime_hours,
+                                    status, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        inserted['attendance'] = len(rows)
+
+    if _is_empty(conn, 'payroll'):
+        rows = []
+        for (employee_id, start, end, basic_salary, overtime_pay, allowances, tax_deduction,
+             other_deductions, total_deductions, _, status) in PAYROLL:
+            gross_pay = basic_salary + overtime_pay + allowances
+            rows.append((employee_id, start, end, basic_salary, overtime_pay, allowances, gross_pay,
+                         tax_deduction, other_deductions, total_deductions, gross_pay - total_deductions, status))
+        conn.executemany('''
+            INSERT INTO payroll (employee_id, pay_period_start, pay_period_end, basic_salary, overtime_pay, allowances,
+                                 gross_pay, tax_deduction, other_deductions, total_deductions, net_pay, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        inserted['payroll'] = len(rows)
+
+    return inserted
@@ -0,0 +1,122 @@
+"""
+Versioned schema migrations for StaffSync.
+
+Migrations are plain SQL files in ``database/migrations`` named
+``NNNN_description.sql``. They are applied in version order and recorded in
+the ``schema_migrations`` table, so existing databases upgrade in place and
+each file runs exactly once.
+"""
+import os
+import re
+import sqlite3
+from urllib.parse import quote
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+_FILENAME_RE = re.compile(r'^(\d{4})_(\w+)\.sql$')
+
+
+def migration_files():
+    """Return ``(version, name, filename)`` for every migration file, in order."""
+    files = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = _FILENAME_RE.match(filename)
+        if match:
+            files.append((int(match.group(1)), match.group(2), filename))
+    return files
+
+
+def latest_version():
+    """The version the code expects, from the file names alone."""
+    files = migration_files()
+    return files[-1][0] if files else 0
+
+
+def load_migrations():
+    """Return ``(version, name, sql)`` tuples for every migration file, in order."""
+    migrations = []
+    for version, name, filename in migration_files():
+        with open(os.path.join(MIGRATIONS_DIR, filename), encoding='utf-8') as f:
+            migrations.append((version, name, f.read()))
+    return migrations
+
+
+def split_statements(sql):
+    """Split a script into single statements (trigger bodies stay intact)."""
+    statements, buffer = [], ''
+    for line in sql.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            if buffer.strip():
+                statements.append(buffer.strip())
+            buffer = ''
+    if buffer.strip() and not _is_comment_only(buffer):
+        raise ValueError(f'Incomplete SQL statement in migration: {buffer.strip()[:80]}')
+    return statements
+
+
+def _is_comment_only(sql):
+    return all(not line.strip() or line.strip().startswith('--') for line in sql.splitlines())
+
+
+def applied_versions(conn):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_migrations'"
+    ).fetchone()
+    if not exists:
+        return set()
+    return {row[0] for row in conn.execute('SELECT version FROM schema_migrations')}
+
+
+def current_version(conn):
+    """The newest applied version, or 0 for a database that was never migrated."""
+    versions = applied_versions(conn)
+    return max(versions) if versions else 0
+
+
+def schema_status(path):
+    """``(current, latest)`` versions for the database at ``path``, without writing to it.
+
+    A missing database file is at version 0.
+    """
+    latest = latest_version()
+    if not os.path.exists(path):
+        return 0, latest
+    conn = sqlite3.connect(f'file:{quote(os.path.abspath(path))}?mode=ro', uri=True)
+    try:
+        return current_version(conn), latest
+    finally:
+        conn.close()
+
+
+def migrate(conn):
+    """Apply all pending migrations in one write transaction. Returns the versions applied."""
+    previous_isolation = conn.isolation_level
+    conn.isolation_level = None  # manage the transaction explicitly
+    try:
+        # IMMEDIATE takes the write lock up front, so workers starting together apply each file once
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            done = applied_versions(conn)
+            applied = []
+            for version, name, sql in load_migrations():
+                if version in done:
+                    continue
+                for statement in split_statements(sql):
+                    conn.execute(statement)
+                conn.execute('INSERT INTO schema_migrations (version, name) VALUES (?, ?)',
+                             (version, name))
+                applied.append(version)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    finally:
+        conn.isolation_level = previous_isolation
+    return applied
@@ -0,0 +1,74 @@
+-- Baseline schema. Uses IF NOT EXISTS so databases created before migrations upgrade in place.
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    email TEXT NOT NULL,
+    password_hash TEXT NOT NULL,
+    role TEXT NOT NULL DEFAULT 'staff',
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS employees (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    phone TEXT,
+    position TEXT,
+    department TEXT,
+    salary REAL DEFAULT 0,
+    hire_date TEXT,
+    status TEXT DEFAULT 'Active'
+);
+
+CREATE TABLE IF NOT EXISTS attendance (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id INTEGER,
+    date TEXT NOT NULL,
+    check_in_time TEXT,
+    check_out_time TEXT,
+    total_hours REAL DEFAULT 0,
+    overtime_hours REAL DEFAULT 0,
+    status TEXT DEFAULT 'Present',
+    notes TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (employee_id) REFERENCES employees (id)
+);
+
+CREATE TABLE IF NOT EXISTS payroll (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id INTEGER,
+    pay_period_start TEXT NOT NULL,
+    pay_period_end TEXT NOT NULL,
+    basic_salary REAL DEFAULT 0,
+    overtime_pay REAL DEFAULT 0,
+    allowances REAL DEFAULT 0,
+    gross_pay REAL DEFAULT 0,
+    tax_deduction REAL DEFAULT 0,
+    other_deductions REAL DEFAULT 0,
+    total_deductions REAL DEFAULT 0,
+    net_pay REAL DEFAULT 0,
+    status TEXT DEFAULT 'draft',
+    processed_at TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (employee_id) REFERENCES employees (id)
+);
+
+CREATE TABLE IF NOT EXISTS leaves (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id INTEGER,
+    leave_type TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    days_count INTEGER,
+    reason TEXT,
+    status TEXT DEFAULT 'pending',
+    applied_date TEXT DEFAULT CURRENT_TIMESTAMP,
+    approved_by INTEGER,
+    approved_date TEXT,
+    FOREIGN KEY (employee_id) REFERENCES employees (id),
+    FOREIGN KEY (approved_by) REFERENCES users (id)
+);
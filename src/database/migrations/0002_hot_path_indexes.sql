@@ -0,0 +1,70 @@
+-- Indexes for the lookups every staff and admin page runs.
+-- employees.email is already covered by the UNIQUE constraint's automatic index.
+
+-- One attendance row per employee per day. Older databases may hold duplicates
+-- from double-submitted check-ins; keep the most complete one (checked out,
+-- then checked in, then the first).
+DELETE FROM attendance WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY employee_id, date
+            ORDER BY check_out_time IS NULL, check_in_time IS NULL, id
+        ) AS n
+        FROM attendance
+        WHERE employee_id IS NOT NULL
+    )
+    WHERE n > 1
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_employee_date
+    ON attendance (employee_id, date);
+
+-- Dashboard "present today" and per-day admin views
+CREATE INDEX IF NOT EXISTS idx_attendance_date_status
+    ON attendance (date, status);
+
+-- One payroll row per employee per pay period. Two processed or paid payslips
+-- for the same period cannot be merged automatically: the upgrade stops on this
+-- CHECK (and, being one transaction, changes nothing) until they are resolved.
+-- List them with:
+--   SELECT employee_id, pay_period_start, pay_period_end, COUNT(*) FROM payroll
+--   WHERE status IS NOT 'draft' GROUP BY 1, 2, 3 HAVING COUNT(*) > 1;
+CREATE TEMP TABLE migration_0002_payroll_check (
+    conflicting_periods INTEGER
+        CONSTRAINT resolve_duplicate_processed_payslips_first CHECK (conflicting_periods = 0)
+);
+
+INSERT INTO migration_0002_payroll_check
+SELECT COUNT(*) FROM (
+    SELECT 1 FROM payroll
+    WHERE employee_id IS NOT NULL AND status IS NOT 'draft'
+    GROUP BY employee_id, pay_period_start, pay_period_end
+    HAVING COUNT(*) > 1
+);
+
+DROP TABLE migration_0002_payroll_check;
+
+-- Otherwise only drafts are removed: a period keeps its processed or paid
+-- payslip if it has one, else its latest draft.
+DELETE FROM payroll WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY employee_id, pay_period_start, pay_period_end
+            ORDER BY status IS 'draft', id DESC
+        ) AS n
+        FROM payroll
+        WHERE employee_id IS NOT NULL
+    )
+    WHERE n > 1
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_payroll_employee_period
+    ON payroll (employee_id, pay_period_start, pay_period_end);
+
+-- Covers the leave-balance SUM(days_count) without touching the table
+CREATE INDEX IF NOT EXISTS idx_leaves_employee_status_start
+    ON leaves (employee_id, status, start_date, days_count);
+
+-- Leave history, newest first
+CREATE INDEX IF NOT EXISTS idx_leaves_employee_applied
+    ON leaves (employee_id, applied_date);
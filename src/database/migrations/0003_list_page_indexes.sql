@@ -0,0 +1,19 @@
+-- Indexes backing the sortable, filterable admin employee and payroll lists.
+-- Every index implicitly ends in the rowid, so (sort key, id) keyset seeks stay index-only.
+-- Nullable columns are sorted through IFNULL so cursor comparisons never meet NULL.
+
+CREATE INDEX IF NOT EXISTS idx_employees_first_name ON employees (first_name);
+CREATE INDEX IF NOT EXISTS idx_employees_department_sort ON employees (IFNULL(department, ''));
+CREATE INDEX IF NOT EXISTS idx_employees_position_sort ON employees (IFNULL(position, ''));
+CREATE INDEX IF NOT EXISTS idx_employees_salary_sort ON employees (IFNULL(salary, 0));
+CREATE INDEX IF NOT EXISTS idx_employees_status_sort ON employees (IFNULL(status, ''));
+
+-- Filtered lists in the default name order
+CREATE INDEX IF NOT EXISTS idx_employees_department_name ON employees (department, first_name);
+CREATE INDEX IF NOT EXISTS idx_employees_status_name ON employees (status, first_name);
+
+CREATE INDEX IF NOT EXISTS idx_payroll_created ON payroll (IFNULL(created_at, ''));
+CREATE INDEX IF NOT EXISTS idx_payroll_period_start ON payroll (pay_period_start);
+CREATE INDEX IF NOT EXISTS idx_payroll_gross ON payroll (IFNULL(gross_pay, 0));
+CREATE INDEX IF NOT EXISTS idx_payroll_net ON payroll (IFNULL(net_pay, 0));
+CREATE INDEX IF NOT EXISTS idx_payroll_status_created ON payroll (status, IFNULL(created_at, ''));
@@ -0,0 +1,102 @@
+-- Counters behind the admin dashboard, kept current by triggers so each
+-- statistic is a single-row read instead of a COUNT over the base tables.
+-- Drift can be repaired with `flask staffsync rebuild-stats`.
+
+CREATE TABLE IF NOT EXISTS stats_counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+
+-- Employees per department; a department counts towards 'departments' while it has members
+CREATE TABLE IF NOT EXISTS department_counts (
+    department TEXT PRIMARY KEY NOT NULL,
+    employees INTEGER NOT NULL DEFAULT 0
+);
+
+-- Attendance rows per day and status
+CREATE TABLE IF NOT EXISTS attendance_daily_counts (
+    date TEXT NOT NULL,
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, status)
+) WITHOUT ROWID;
+
+-- Employees
+
+CREATE TRIGGER IF NOT EXISTS trg_employees_stats_insert AFTER INSERT ON employees
+BEGIN
+    UPDATE stats_counters SET value = value + 1 WHERE name = 'employees';
+    INSERT OR IGNORE INTO department_counts (department, employees)
+        SELECT NEW.department, 0 WHERE NEW.department IS NOT NULL;
+    UPDATE department_counts SET employees = employees + 1 WHERE department = NEW.department;
+    UPDATE stats_counters SET value = value + 1
+        WHERE name = 'departments'
+        AND (SELECT employees FROM department_counts WHERE department = NEW.department) = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_employees_stats_delete AFTER DELETE ON employees
+BEGIN
+    UPDATE stats_counters SET value = value - 1 WHERE name = 'employees';
+    UPDATE department_counts SET employees = employees - 1 WHERE department = OLD.department;
+    UPDATE stats_counters SET value = value - 1
+        WHERE name = 'departments'
+        AND (SELECT employees FROM department_counts WHERE department = OLD.department) = 0;
+    DELETE FROM department_counts WHERE department = OLD.department AND employees = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_employees_stats_department AFTER UPDATE OF department ON employees
+WHEN OLD.department IS NOT NEW.department
+BEGIN
+    UPDATE department_counts SET employees = employees - 1 WHERE department = OLD.department;
+    UPDATE stats_counters SET value = value - 1
+        WHERE name = 'departments'
+        AND (SELECT employees FROM department_counts WHERE department = OLD.department) = 0;
+    DELETE FROM department_counts WHERE department = OLD.department AND employees = 0;
+
+    INSERT OR IGNORE INTO department_counts (department, employees)
+        SELECT NEW.department, 0 WHERE NEW.department IS NOT NULL;
+    UPDATE department_counts SET employees = employees + 1 WHERE department = NEW.department;
+    UPDATE stats_counters SET value = value + 1
+        WHERE name = 'departments'
+        AND (SELECT employees FROM department_counts WHERE department = NEW.department) = 1;
+END;
+
+-- Attendance
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_stats_insert AFTER INSERT ON attendance
+WHEN NEW.status IS NOT NULL
+BEGIN
+    INSERT INTO attendance_daily_counts (date, status, count) VALUES (NEW.date, NEW.status, 1)
+        ON CONFLICT (date, status) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_stats_delete AFTER DELETE ON attendance
+WHEN OLD.status IS NOT NULL
+BEGIN
+    UPDATE attendance_daily_counts SET count = count - 1
+        WHERE date = OLD.date AND status = OLD.status;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_stats_update AFTER UPDATE OF date, status ON attendance
+WHEN OLD.date IS NOT NEW.date OR OLD.status IS NOT NEW.status
+BEGIN
+    UPDATE attendance_daily_counts SET count = count - 1
+        WHERE date = OLD.date AND status = OLD.status;
+    INSERT INTO attendance_daily_counts (date, status, count)
+        SELECT NEW.date, NEW.status, 1 WHERE NEW.status IS NOT NULL
+        ON CONFLICT (date, status) DO UPDATE SET count = count + 1;
+END;
+
+-- Backfill from existing data
+
+INSERT OR REPLACE INTO stats_counters (name, value)
+    SELECT 'employees', COUNT(*) FROM employees;
+
+INSERT OR REPLACE INTO department_counts (department, employees)
+    SELECT department, COUNT(*) FROM employees WHERE department IS NOT NULL GROUP BY department;
+
+INSERT OR REPLACE INTO stats_counters (name, value)
+    SELECT 'departments', COUNT(*) FROM department_counts;
+
+INSERT OR REPLACE INTO attendance_daily_counts (date, status, count)
+    SELECT date, status, COUNT(*) FROM attendance WHERE status IS NOT NULL GROUP BY date, status;
@@ -0,0 +1,11 @@
+-- Link login accounts to employee records so staff pages no longer derive
+-- the employee from "<username>@staffsync.com" on every request.
+
+ALTER TABLE users ADD COLUMN employee_id INTEGER REFERENCES employees (id);
+
+-- Prefer the account's own email, then the historical username convention
+UPDATE users SET employee_id = (SELECT e.id FROM employees e WHERE e.email = users.email)
+WHERE employee_id IS NULL;
+
+UPDATE users SET employee_id = (SELECT e.id FROM employees e WHERE e.email = users.username || '@staffsync.com')
+WHERE employee_id IS NULL;
@@ -0,0 +1,7 @@
+-- Covering index for per-employee hour sums over a date range (payroll
+-- generation and preview). Each employee becomes one index seek plus a short
+-- range read, with no table lookups and no temp B-tree for the GROUP BY.
+-- idx_attendance_employee_date stays: ON CONFLICT (employee_id, date) needs it.
+
+CREATE INDEX IF NOT EXISTS idx_attendance_employee_date_hours
+    ON attendance (employee_id, date, overtime_hours, total_hours);
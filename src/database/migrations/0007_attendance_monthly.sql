@@ -0,0 +1,90 @@
+-- Per-employee monthly attendance rollups, kept current by triggers on every
+-- attendance write (staff check-in/out, admin marking and edits, bulk
+-- ingestion). Range totals read whole months from here and only touch raw
+-- attendance rows for the partial months at either end of the range.
+-- `flask staffsync verify-rollups` / `rebuild-rollups` check and repair them.
+
+CREATE TABLE IF NOT EXISTS attendance_monthly (
+    month TEXT NOT NULL,                -- 'YYYY-MM'
+    employee_id INTEGER NOT NULL,
+    days_present INTEGER NOT NULL DEFAULT 0,  -- present, late or half day
+    late_count INTEGER NOT NULL DEFAULT 0,
+    absent_count INTEGER NOT NULL DEFAULT 0,
+    total_hours REAL NOT NULL DEFAULT 0,
+    overtime_hours REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, employee_id)
+) WITHOUT ROWID;
+
+-- Covers per-employee hour sums over a month range without touching the table
+CREATE INDEX IF NOT EXISTS idx_attendance_monthly_employee
+    ON attendance_monthly (employee_id, month, total_hours, overtime_hours);
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_monthly_insert AFTER INSERT ON attendance
+WHEN NEW.employee_id IS NOT NULL
+BEGIN
+    INSERT INTO attendance_monthly
+        (month, employee_id, days_present, late_count, absent_count, total_hours, overtime_hours)
+    VALUES (substr(NEW.date, 1, 7), NEW.employee_id,
+            IFNULL(lower(NEW.status) IN ('present', 'late', 'half_day'), 0),
+            IFNULL(lower(NEW.status) = 'late', 0),
+            IFNULL(lower(NEW.status) = 'absent', 0),
+            IFNULL(NEW.total_hours, 0), IFNULL(NEW.overtime_hours, 0))
+    ON CONFLICT (month, employee_id) DO UPDATE SET
+        days_present = days_present + excluded.days_present,
+        late_count = late_count + excluded.late_count,
+        absent_count = absent_count + excluded.absent_count,
+        total_hours = total_hours + excluded.total_hours,
+        overtime_hours = overtime_hours + excluded.overtime_hours;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_monthly_delete AFTER DELETE ON attendance
+WHEN OLD.employee_id IS NOT NULL
+BEGIN
+    UPDATE attendance_monthly SET
+        days_present = days_present - IFNULL(lower(OLD.status) IN ('present', 'late', 'half_day'), 0),
+        late_count = late_count - IFNULL(lower(OLD.status) = 'late', 0),
+        absent_count = absent_count - IFNULL(lower(OLD.status) = 'absent', 0),
+        total_hours = total_hours - IFNULL(OLD.total_hours, 0),
+        overtime_hours = overtime_hours - IFNULL(OLD.overtime_hours, 0)
+    WHERE month = substr(OLD.date, 1, 7) AND employee_id = OLD.employee_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_monthly_update
+AFTER UPDATE OF employee_id, date, status, total_hours, overtime_hours ON attendance
+BEGIN
+    UPDATE attendance_monthly SET
+        days_present = days_present - IFNULL(lower(OLD.status) IN ('present', 'late', 'half_day'), 0),
+        late_count = late_count - IFNULL(lower(OLD.status) = 'late', 0),
+        absent_count = absent_count - IFNULL(lower(OLD.status) = 'absent', 0),
+        total_hours = total_hours - IFNULL(OLD.total_hours, 0),
+        overtime_hours = overtime_hours - IFNULL(OLD.overtime_hours, 0)
+    WHERE month = substr(OLD.date, 1, 7) AND employee_id = OLD.employee_id;
+
+    INSERT INTO attendance_monthly
+        (month, employee_id, days_present, late_count, absent_count, total_hours, overtime_hours)
+    SELECT substr(NEW.date, 1, 7), NEW.employee_id,
+           IFNULL(lower(NEW.status) IN ('present', 'late', 'half_day'), 0),
+           IFNULL(lower(NEW.status) = 'late', 0),
+           IFNULL(lower(NEW.status) = 'absent', 0),
+           IFNULL(NEW.total_hours, 0), IFNULL(NEW.overtime_hours, 0)
+    WHERE NEW.employee_id IS NOT NULL
+    ON CONFLICT (month, employee_id) DO UPDATE SET
+        days_present = days_present + excluded.days_present,
+        late_count = late_count + excluded.late_count,
+        absent_count = absent_count + excluded.absent_count,
+        total_hours = total_hours + excluded.total_hours,
+        overtime_hours = overtime_hours + excluded.overtime_hours;
+END;
+
+-- Backfill from existing data
+
+INSERT OR REPLACE INTO attendance_monthly
+    (month, employee_id, days_present, late_count, absent_count, total_hours, overtime_hours)
+SELECT substr(date, 1, 7), employee_id,
+       SUM(IFNULL(lower(status) IN ('present', 'late', 'half_day'), 0)),
+       SUM(IFNULL(lower(status) = 'late', 0)),
+       SUM(IFNULL(lower(status) = 'absent', 0)),
+       SUM(IFNULL(total_hours, 0)), SUM(IFNULL(overtime_hours, 0))
+FROM attendance
+WHERE employee_id IS NOT NULL
+GROUP BY substr(date, 1, 7), employee_id;
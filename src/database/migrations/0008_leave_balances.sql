@@ -0,0 +1,95 @@
+-- Leave balance ledger. Each leave type has a policy (yearly allowance, how it
+-- accrues, how much may carry over), and each employee has one balance row per
+-- year and leave type. Triggers on leaves keep used/pending days current in the
+-- same transaction as the leave change, so a balance is a single primary-key
+-- read. `flask staffsync leave-rollover` opens the next year's rows.
+
+CREATE TABLE IF NOT EXISTS leave_policies (
+    leave_type TEXT PRIMARY KEY,
+    annual_allowance REAL NOT NULL DEFAULT 0,
+    accrual TEXT NOT NULL DEFAULT 'annual' CHECK (accrual IN ('annual', 'monthly')),
+    max_carry_over REAL NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO leave_policies (leave_type, annual_allowance, accrual, max_carry_over) VALUES
+    ('annual', 20, 'annual', 5),
+    ('sick', 10, 'annual', 0),
+    ('emergency', 3, 'annual', 0),
+    ('personal', 3, 'annual', 0),
+    ('maternity', 90, 'annual', 0),
+    ('paternity', 10, 'annual', 0),
+    ('bereavement', 5, 'annual', 0);
+
+CREATE TABLE IF NOT EXISTS leave_balances (
+    employee_id INTEGER NOT NULL REFERENCES employees (id),
+    year INTEGER NOT NULL,
+    leave_type TEXT NOT NULL,
+    entitlement REAL NOT NULL DEFAULT 0,   -- the policy allowance for the year
+    carried_over REAL NOT NULL DEFAULT 0,
+    used REAL NOT NULL DEFAULT 0,          -- approved days
+    pending REAL NOT NULL DEFAULT 0,       -- days awaiting a decision
+    PRIMARY KEY (employee_id, year, leave_type)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_leaves_balance_insert AFTER INSERT ON leaves
+WHEN NEW.employee_id IS NOT NULL
+BEGIN
+    INSERT OR IGNORE INTO leave_balances (employee_id, year, leave_type, entitlement)
+    VALUES (NEW.employee_id, CAST(substr(NEW.start_date, 1, 4) AS INTEGER), NEW.leave_type,
+            IFNULL((SELECT annual_allowance FROM leave_policies WHERE leave_type = NEW.leave_type), 0));
+    UPDATE leave_balances SET
+        used = used + IFNULL(NEW.days_count, 0) * (NEW.status = 'approved'),
+        pending = pending + IFNULL(NEW.days_count, 0) * (NEW.status = 'pending')
+    WHERE employee_id = NEW.employee_id
+      AND year = CAST(substr(NEW.start_date, 1, 4) AS INTEGER)
+      AND leave_type = NEW.leave_type;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_leaves_balance_delete AFTER DELETE ON leaves
+WHEN OLD.employee_id IS NOT NULL
+BEGIN
+    UPDATE leave_balances SET
+        used = used - IFNULL(OLD.days_count, 0) * (OLD.status = 'approved'),
+        pending = pending - IFNULL(OLD.days_count, 0) * (OLD.status = 'pending')
+    WHERE employee_id = OLD.employee_id
+      AND year = CAST(substr(OLD.start_date, 1, 4) AS INTEGER)
+      AND leave_type = OLD.leave_type;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_leaves_balance_update
+AFTER UPDATE OF employee_id, leave_type, start_date, days_count, status ON leaves
+BEGIN
+    UPDATE leave_balances SET
+        used = used - IFNULL(OLD.days_count, 0) * (OLD.status = 'approved'),
+        pending = pending - IFNULL(OLD.days_count, 0) * (OLD.status = 'pending')
+    WHERE employee_id = OLD.employee_id
+      AND year = CAST(substr(OLD.start_date, 1, 4) AS INTEGER)
+      AND leave_type = OLD.leave_type;
+
+    INSERT OR IGNORE INTO leave_balances (employee_id, year, leave_type, entitlement)
+    SELECT NEW.employee_id, CAST(substr(NEW.start_date, 1, 4) AS INTEGER), NEW.leave_type,
+           IFNULL((SELECT annual_allowance FROM leave_policies WHERE leave_type = NEW.leave_type), 0)
+    WHERE NEW.employee_id IS NOT NULL;
+    UPDATE leave_balances SET
+        used = used + IFNULL(NEW.days_count, 0) * (NEW.status = 'approved'),
+        pending = pending + IFNULL(NEW.days_count, 0) * (NEW.status = 'pending')
+    WHERE employee_id = NEW.employee_id
+      AND year = CAST(substr(NEW.start_date, 1, 4) AS INTEGER)
+      AND leave_type = NEW.leave_type;
+END;
+
+-- Backfill: every year and type that already has leaves, plus this year's rows for everyone
+
+INSERT OR REPLACE INTO leave_balances (employee_id, year, leave_type, entitlement, used, pending)
+SELECT l.employee_id, CAST(substr(l.start_date, 1, 4) AS INTEGER), l.leave_type,
+       IFNULL(p.annual_allowance, 0),
+       SUM(IFNULL(l.days_count, 0) * (l.status = 'approved')),
+       SUM(IFNULL(l.days_count, 0) * (l.status = 'pending'))
+FROM leaves l
+LEFT JOIN leave_policies p ON p.leave_type = l.leave_type
+WHERE l.employee_id IS NOT NULL
+GROUP BY l.employee_id, CAST(substr(l.start_date, 1, 4) AS INTEGER), l.leave_type;
+
+INSERT OR IGNORE INTO leave_balances (employee_id, year, leave_type, entitlement)
+SELECT e.id, CAST(strftime('%Y', 'now') AS INTEGER), p.leave_type, p.annual_allowance
+FROM employees e CROSS JOIN leave_policies p;
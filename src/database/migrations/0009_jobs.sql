@@ -0,0 +1,25 @@
+-- Background jobs for work that outlives an HTTP request (payroll runs,
+-- exports, imports). Workers claim queued rows in id order; progress,
+-- heartbeat and cancellation requests all live on the row, so any worker
+-- process or web worker can report on or cancel any job.
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL DEFAULT '{}',          -- JSON
+    status TEXT NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'succeeded', 'failed', 'cancelled')),
+    progress REAL,                              -- 0..1 when the job knows its size
+    message TEXT,
+    result TEXT,                                -- JSON
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    submitted_by INTEGER REFERENCES users (id),
+    worker TEXT,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at TEXT,
+    heartbeat_at TEXT,
+    finished_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id);
@@ -0,0 +1,45 @@
+-- User notifications, doubling as the change log every worker process tails.
+-- Rows are addressed to one user or, with user_id NULL, to everyone with a
+-- role. Ids only grow and SQLite commits writers one at a time, so "every row
+-- with id > N" is a complete cursor for what a reader has not seen yet.
+--
+-- Leave decisions and processed payslips are recorded by triggers, so they are
+-- picked up whichever code path changes the row. Attendance corrections are
+-- published by the admin edit endpoint, since a trigger cannot tell them apart
+-- from a staff check-out.
+
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER REFERENCES users (id),
+    role TEXT,                                  -- audience when user_id is NULL
+    kind TEXT NOT NULL,
+    level TEXT NOT NULL DEFAULT 'info',         -- info, success, warning, error
+    message TEXT NOT NULL,
+    link TEXT,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_leaves_notify_decision
+AFTER UPDATE OF status ON leaves
+WHEN new.status IN ('approved', 'rejected') AND old.status IS NOT new.status
+BEGIN
+    INSERT INTO notifications (user_id, kind, level, message, link)
+    SELECT u.id, 'leave.decision',
+           CASE new.status WHEN 'approved' THEN 'success' ELSE 'warning' END,
+           'Your ' || new.leave_type || ' leave from ' || new.start_date || ' to ' || new.end_date
+               || ' was ' || new.status || '.',
+           '/staff/leave'
+    FROM users u WHERE u.employee_id = new.employee_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_payroll_notify_processed
+AFTER UPDATE OF status ON payroll
+WHEN new.status = 'processed' AND old.status IS NOT 'processed'
+BEGIN
+    INSERT INTO notifications (user_id, kind, level, message, link)
+    SELECT u.id, 'payroll.processed', 'success',
+           'Your payslip for ' || new.pay_period_start || ' to ' || new.pay_period_end
+               || ' has been processed (net ' || printf('%.2f', new.net_pay) || ').',
+           '/staff/dashboard'
+    FROM users u WHERE u.employee_id = new.employee_id;
+END;
@@ -0,0 +1,19 @@
+-- Row versions for conditional GETs. Every update to an employee or payroll
+-- row bumps its version, whichever code path made it, so the detail APIs can
+-- answer If-None-Match from this one column instead of loading the row.
+-- A statement that sets version itself (none do today) is left alone.
+
+ALTER TABLE employees ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE payroll ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
+
+CREATE TRIGGER IF NOT EXISTS trg_employees_version AFTER UPDATE ON employees
+WHEN new.version IS old.version
+BEGIN
+    UPDATE employees SET version = old.version + 1 WHERE id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_payroll_version AFTER UPDATE ON payroll
+WHEN new.version IS old.version
+BEGIN
+    UPDATE payroll SET version = old.version + 1 WHERE id = new.id;
+END;
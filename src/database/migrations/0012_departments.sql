@@ -0,0 +1,61 @@
+-- Departments as rows instead of free text on employees. employees.department_id
+-- is the reference; the old employees.department column stays as the
+-- department's name so forms, imports, exports and the dashboard counters keep
+-- working. Triggers keep the two in step in both directions: writing a name on
+-- an employee links the matching department, creating it if needed, and
+-- renaming a department rewrites its members' names. Names match case- and
+-- space-insensitively, so filter on department_id rather than on the name.
+
+CREATE TABLE IF NOT EXISTS departments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+    description TEXT,
+    head_employee_id INTEGER REFERENCES employees (id),
+    budget REAL,                                -- annual
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE employees ADD COLUMN department_id INTEGER REFERENCES departments (id);
+
+-- Serves the employee list filtered by department in name order, and covers the
+-- per-department headcount and salary aggregate
+CREATE INDEX IF NOT EXISTS idx_employees_department_id ON employees (department_id, first_name, salary);
+
+-- Migrate the free-text values; case variants of a name become one department
+-- and members take its spelling
+INSERT OR IGNORE INTO departments (name)
+    SELECT trim(department) FROM employees
+    WHERE trim(IFNULL(department, '')) != ''
+    GROUP BY trim(department) COLLATE NOCASE ORDER BY MIN(id);
+
+UPDATE employees SET (department, department_id) =
+        (SELECT d.name, d.id FROM departments d WHERE d.name = trim(employees.department))
+    WHERE trim(IFNULL(department, '')) != '';
+
+CREATE TRIGGER IF NOT EXISTS trg_employees_department_link_insert AFTER INSERT ON employees
+WHEN trim(IFNULL(NEW.department, '')) != ''
+BEGIN
+    INSERT OR IGNORE INTO departments (name) VALUES (trim(NEW.department));
+    UPDATE employees SET department_id = (SELECT id FROM departments WHERE name = trim(NEW.department))
+        WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_employees_department_link_update AFTER UPDATE OF department ON employees
+WHEN OLD.department IS NOT NEW.department
+BEGIN
+    INSERT OR IGNORE INTO departments (name)
+        SELECT trim(NEW.department) WHERE trim(IFNULL(NEW.department, '')) != '';
+    UPDATE employees SET department_id = (SELECT id FROM departments WHERE name = trim(NEW.department))
+        WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_departments_rename AFTER UPDATE OF name ON departments
+WHEN OLD.name IS NOT NEW.name
+BEGIN
+    UPDATE employees SET department = NEW.name WHERE department_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_employees_department_head_delete AFTER DELETE ON employees
+BEGIN
+    UPDATE departments SET head_employee_id = NULL WHERE head_employee_id = OLD.id;
+END;
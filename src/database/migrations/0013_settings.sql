@@ -0,0 +1,48 @@
+-- Company and system settings as key/value rows. Values are JSON so numbers and
+-- flags keep their type. Every write to the table bumps the single
+-- settings_version row, whichever code path or worker made it, so a process
+-- holding the settings in memory only has to read that one integer to know
+-- whether its copy is current.
+
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,                        -- JSON
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS settings_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO settings_version (id, version) VALUES (1, 1);
+
+-- The values the settings page used to show. The time zone is left unset, so
+-- attendance keeps using the server's local time until an admin picks one.
+INSERT OR IGNORE INTO settings (key, value) VALUES
+    ('company_name', '"StaffSync Corporation"'),
+    ('company_email', '"admin@staffsync.com"'),
+    ('company_phone', '"+1 (555) 123-4567"'),
+    ('company_website', '"https://staffsync.com"'),
+    ('company_address', '"123 Business Street, Suite 100\nCity, State 12345\nCountry"'),
+    ('date_format', '"MM/DD/YYYY"'),
+    ('currency', '"USD"'),
+    ('working_hours', '8'),
+    ('email_notifications', 'true'),
+    ('auto_backup', 'true'),
+    ('two_factor_auth', 'false');
+
+CREATE TRIGGER IF NOT EXISTS trg_settings_version_insert AFTER INSERT ON settings
+BEGIN
+    UPDATE settings_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_settings_version_update AFTER UPDATE ON settings
+BEGIN
+    UPDATE settings_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_settings_version_delete AFTER DELETE ON settings
+BEGIN
+    UPDATE settings_version SET version = version + 1 WHERE id = 1;
+END;
@@ -0,0 +1,37 @@
+-- Full-text index over the employee fields admins search by. It is an
+-- external-content FTS5 table: it stores only the index and reads column
+-- values from employees, so the triggers below must give it each row's old
+-- values when the row changes or goes away. Prefix indexes of one to three
+-- characters keep as-you-type queries from merging whole term lists; at 100k
+-- employees they make the index about a third bigger.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS employees_fts USING fts5(
+    first_name, last_name, email, position, department,
+    content='employees', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='1 2 3'
+);
+
+INSERT INTO employees_fts (employees_fts) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS trg_employees_fts_insert AFTER INSERT ON employees
+BEGIN
+    INSERT INTO employees_fts (rowid, first_name, last_name, email, position, department)
+    VALUES (new.id, new.first_name, new.last_name, new.email, new.position, new.department);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_employees_fts_delete AFTER DELETE ON employees
+BEGIN
+    INSERT INTO employees_fts (employees_fts, rowid, first_name, last_name, email, position, department)
+    VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.position, old.department);
+END;
+
+-- Only changes to indexed columns; salary edits and version bumps leave the index alone
+CREATE TRIGGER IF NOT EXISTS trg_employees_fts_update
+AFTER UPDATE OF first_name, last_name, email, position, department ON employees
+BEGIN
+    INSERT INTO employees_fts (employees_fts, rowid, first_name, last_name, email, position, department)
+    VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.position, old.department);
+    INSERT INTO employees_fts (rowid, first_name, last_name, email, position, department)
+    VALUES (new.id, new.first_name, new.last_name, new.email, new.position, new.department);
+END;
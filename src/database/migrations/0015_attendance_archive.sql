@@ -0,0 +1,63 @@
+-- Attendance archival state (see services/archive.py). Rows dated before
+-- archived_before live in per-year archive files instead of attendance.
+-- Rows dated before frozen_before can no longer be written; the archiver
+-- freezes a range before copying it, so the copy cannot miss an edit.
+--
+-- While archiving = 1 (set only inside the archiver's own delete
+-- transactions, so no other connection ever sees it) deletes leave the
+-- dashboard counters and monthly rollups alone: they keep covering the
+-- archived history.
+
+CREATE TABLE IF NOT EXISTS attendance_archive_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    frozen_before TEXT,
+    archived_before TEXT,
+    archiving INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO attendance_archive_state (id) VALUES (1);
+
+DROP TRIGGER IF EXISTS trg_attendance_stats_delete;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_stats_delete AFTER DELETE ON attendance
+WHEN OLD.status IS NOT NULL AND NOT (SELECT archiving FROM attendance_archive_state WHERE id = 1)
+BEGIN
+    UPDATE attendance_daily_counts SET count = count - 1
+        WHERE date = OLD.date AND status = OLD.status;
+END;
+
+DROP TRIGGER IF EXISTS trg_attendance_monthly_delete;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_monthly_delete AFTER DELETE ON attendance
+WHEN OLD.employee_id IS NOT NULL AND NOT (SELECT archiving FROM attendance_archive_state WHERE id = 1)
+BEGIN
+    UPDATE attendance_monthly SET
+        days_present = days_present - IFNULL(lower(OLD.status) IN ('present', 'late', 'half_day'), 0),
+        late_count = late_count - IFNULL(lower(OLD.status) = 'late', 0),
+        absent_count = absent_count - IFNULL(lower(OLD.status) = 'absent', 0),
+        total_hours = total_hours - IFNULL(OLD.total_hours, 0),
+        overtime_hours = overtime_hours - IFNULL(OLD.overtime_hours, 0)
+    WHERE month = substr(OLD.date, 1, 7) AND employee_id = OLD.employee_id;
+END;
+
+-- Frozen rows are read-only; the archiver's deletes are the one exception
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_frozen_insert BEFORE INSERT ON attendance
+WHEN NEW.date < (SELECT frozen_before FROM attendance_archive_state WHERE id = 1)
+BEGIN
+    SELECT RAISE(ABORT, 'Attendance for this date is archived');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_frozen_update BEFORE UPDATE ON attendance
+WHEN OLD.date < (SELECT frozen_before FROM attendance_archive_state WHERE id = 1)
+  OR NEW.date < (SELECT frozen_before FROM attendance_archive_state WHERE id = 1)
+BEGIN
+    SELECT RAISE(ABORT, 'Attendance for this date is archived');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_frozen_delete BEFORE DELETE ON attendance
+WHEN OLD.date < (SELECT frozen_before FROM attendance_archive_state WHERE id = 1)
+  AND NOT (SELECT archiving FROM attendance_archive_state WHERE id = 1)
+BEGIN
+    SELECT RAISE(ABORT, 'Attendance for this date is archived');
+END;
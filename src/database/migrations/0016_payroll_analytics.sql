@@ -0,0 +1,35 @@
+-- Data version for the payroll analytics cache (see services/analytics.py).
+-- Payroll updates and deletes, and every employee change that moves payroll
+-- rows to another department or out of the reports, bump it. Inserts do not:
+-- payroll ids are AUTOINCREMENT, so MAX(id) already changes with every new
+-- row, and a per-row trigger doubled the cost of generating payroll. Cached
+-- aggregates are keyed by both, read with one cheap query.
+
+CREATE TABLE IF NOT EXISTS payroll_data_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO payroll_data_version (id, version) VALUES (1, 1);
+
+CREATE TRIGGER IF NOT EXISTS trg_payroll_data_version_update AFTER UPDATE ON payroll
+BEGIN
+    UPDATE payroll_data_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_payroll_data_version_delete AFTER DELETE ON payroll
+BEGIN
+    UPDATE payroll_data_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_payroll_data_version_employee_update
+AFTER UPDATE OF department ON employees
+WHEN OLD.department IS NOT NEW.department
+BEGIN
+    UPDATE payroll_data_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_payroll_data_version_employee_delete AFTER DELETE ON employees
+BEGIN
+    UPDATE payroll_data_version SET version = version + 1 WHERE id = 1;
+END;
@@ -0,0 +1,212 @@
+"""
+Payroll analytics.
+
+Payroll cost by department and month, overtime trends and net-vs-gross
+breakdowns. Grouping happens in SQL, and month-over-month changes come from
+window functions over the monthly groups. Results are shaped for charts: one
+``labels`` list of months plus one list of values per series, with months
+that have no payroll filled with zeros.
+
+Each process caches results keyed by report, parameters and the payroll
+data version: the ``payroll_data_version`` row (migration 0016), which
+payroll updates and deletes and department changes bump, together with the
+highest payroll id, which every insert raises. A request reads those two
+integers, and the aggregate runs only when the data or the parameters are
+new.
+"""
+import re
+from datetime import date
+
+from flask import current_app
+
+from database import connection as db
+from services.cache import LRUCache
+
+DEFAULT_MONTHS = 36
+MAX_MONTHS = 120
+
+# Keys carry the data version, so stale entries are never served; this only ages out unused ones
+CACHE_TTL = 3600
+
+UNASSIGNED = 'Unassigned'
+
+_MONTH_RE = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+# Month of the pay period start; a pay period belongs to the month it starts in
+_MONTH = 'substr(p.pay_period_start, 1, 7)'
+_PREVIOUS_MONTH = "strftime('%Y-%m', month || '-01', '-1 month')"
+
+
+def read_version(conn):
+    """The payroll data version as 'version.last_id'; it changes with every payroll write."""
+    row = conn.execute('''
+        SELECT (SELECT version FROM payroll_data_version WHERE id = 1), (SELECT IFNULL(MAX(id), 0) FROM payroll)
+    ''').fetchone()
+    return f'{row[0] or 0}.{row[1]}'
+
+
+def _shift(month, months):
+    index = int(month[:4]) * 12 + int(month[5:7]) - 1 + months
+    return f'{index // 12:04d}-{index % 12 + 1:02d}'
+
+
+def month_range(start=None, end=None, today=None):
+    """Validate a 'YYYY-MM' range; defaults to the DEFAULT_MONTHS months up to ``today``.
+
+    Raises ValueError for a malformed, reversed or too long range.
+    """
+    end = end or (today or date.today()).strftime('%Y-%m')
+    start = start or _shift(end, 1 - DEFAULT_MONTHS)
+    for value in (start, end):
+        if not _MONTH_RE.match(value):
+            raise ValueError(f'Months must be YYYY-MM: {value}')
+    if start > end:
+        raise ValueError('start must not be after end')
+    if len(months_between(start, end)) > MAX_MONTHS:
+        raise ValueError(f'At most {MAX_MONTHS} months per request')
+    return start, end
+
+
+def months_between(start, end):
+    months, month = [], start
+    while month <= end:
+        months.append(month)
+        month = _shift(month, 1)
+    return months
+
+
+def _filters(start, end, department, previous=False):
+    """``(where, params)`` for payroll in the months; ``previous`` adds the month before ``start``.
+
+    Reports with month-over-month changes read that extra month so the first
+    label has a change too; ``_series`` leaves it out of the result.
+    """
+    where = ['p.pay_period_start >= ?', 'p.pay_period_start < ?']
+    params = [f'{_shift(start, -1) if previous else start}-01', f'{_shift(end, 1)}-01']
+    if department:
+        where.append('e.department = ?')
+        params.append(department)
+    return ' AND '.join(where), params
+
+
+def _series(rows, labels, columns):
+    """``{column: [value per label]}`` from rows keyed by their 'month'; missing months are 0 (changes None)."""
+    by_month = {row['month']: row for row in rows}
+    return {column: [by_month[month][column] if month in by_month
+                     else (None if column.endswith('change') else 0) for month in labels]
+            for column in columns}
+
+
+def department_cost(conn, start, end, department=None):
+    """Gross, net and overtime pay per department and month, with the month-over-month gross change."""
+    where, params = _filters(start, end, department, previous=True)
+    rows = conn.execute(f'''
+        SELECT month, department, payslips, gross, net, overtime,
+               CASE WHEN LAG(month) OVER w = {_PREVIOUS_MONTH}
+                    THEN ROUND(gross - LAG(gross) OVER w, 2) END AS gross_change
+        FROM (
+            SELECT {_MONTH} AS month, IFNULL(e.department, '{UNASSIGNED}') AS department,
+                   COUNT(*) AS payslips, ROUND(SUM(p.gross_pay), 2) AS gross,
+                   ROUND(SUM(p.net_pay), 2) AS net, ROUND(SUM(p.overtime_pay), 2) AS overtime
+            FROM payroll p
+            JOIN employees e ON e.id = p.employee_id
+            WHERE {where}
+            GROUP BY month, department
+        )
+        WINDOW w AS (PARTITION BY department ORDER BY month)
+        ORDER BY department, month
+    ''', params).fetchall()
+
+    labels = months_between(start, end)
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row['department'], []).append(row)
+    departments = [{'department': name,
+                    **_series(department_rows, labels, ('payslips', 'gross', 'net', 'overtime', 'gross_change'))}
+                   for name, department_rows in grouped.items()]
+    return {'labels': labels, 'departments': departments}
+
+
+def overtime_trend(conn, start, end, department=None):
+    """Overtime pay per month, its share of gross pay, and the change from the month before."""
+    where, params = _filters(start, end, department, previous=True)
+    rows = conn.execute(f'''
+        SELECT month, overtime, ROUND(overtime * 100.0 / NULLIF(gross, 0), 2) AS overtime_share,
+               CASE WHEN LAG(month) OVER w = {_PREVIOUS_MONTH}
+                    THEN ROUND(overtime - LAG(overtime) OVER w, 2) END AS overtime_change,
+               CASE WHEN LAG(month) OVER w = {_PREVIOUS_MONTH}
+                    THEN ROUND((overtime - LAG(overtime) OVER w) * 100.0 / NULLIF(LAG(overtime) OVER w, 0), 2)
+               END AS overtime_pct_change
+        FROM (
+            SELECT {_MONTH} AS month, ROUND(SUM(p.overtime_pay), 2) AS overtime, SUM(p.gross_pay) AS gross
+            FROM payroll p
+            JOIN employees e ON e.id = p.employee_id
+            WHERE {where}
+            GROUP BY month
+        )
+        WINDOW w AS (ORDER BY month)
+        ORDER BY month
+    ''', params).fetchall()
+
+    labels = months_between(start, end)
+    return {'labels': labels,
+            **_series(rows, labels, ('overtime', 'overtime_share', 'overtime_change', 'overtime_pct_change'))}
+
+
+def net_vs_gross(conn, start, end, department=None):
+    """Gross pay per month split into net pay, tax and other deductions."""
+    where, params = _filters(start, end, department)
+    rows = conn.execute(f'''
+        SELECT {_MONTH} AS month, ROUND(SUM(p.gross_pay), 2) AS gross, ROUND(SUM(p.net_pay), 2) AS net,
+               ROUND(SUM(p.tax_deduction), 2) AS tax, ROUND(SUM(p.other_deductions), 2) AS other_deductions,
+               ROUND(SUM(p.net_pay) * 100.0 / NULLIF(SUM(p.gross_pay), 0), 2) AS net_share
+        FROM payroll p
+        JOIN employees e ON e.id = p.employee_id
+        WHERE {where}
+        GROUP BY month
+        ORDER BY month
+    ''', params).fetchall()
+
+    labels = months_between(start, end)
+    return {'labels': labels, **_series(rows, labels, ('gross', 'net', 'tax', 'other_deductions', 'net_share'))}
+
+
+def summary(conn):
+    """Record count, gross and net totals and draft count over all payroll, for the payroll page."""
+    row = conn.execute('''
+        SELECT COUNT(*), COALESCE(SUM(p.gross_pay), 0), COALESCE(SUM(p.net_pay), 0),
+               COALESCE(SUM(p.status = 'draft'), 0)
+        FROM payroll p
+        JOIN employees e ON p.employee_id = e.id
+    ''').fetchone()
+    return tuple(row)
+
+
+REPORTS = {
+    'department-cost': department_cost,
+    'overtime-trend': overtime_trend,
+    'net-vs-gross': net_vs_gross,
+}
+
+
+def get_cache(app=None):
+    return (app or current_app).extensions['staffsync_analytics']
+
+
+def cached(conn, name, *args):
+    """``(result, data_version)`` for report ``name`` (or 'summary') with ``args``, from the cache when current."""
+    cache = get_cache()
+    # The version and the aggregate must come from the same snapshot, or a result could be cached under a newer version
+    with db.snapshot(conn):
+        version = read_version(conn)
+        key = (name, args, version)
+        result = cache.get(key)
+        if result is None:
+            result = (summary if name == 'summary' else REPORTS[name])(conn, *args)
+            cache.set(key, result)
+    return result, version
+
+
+def init_app(app):
+    app.config.setdefault('ANALYTICS_CACHE_SIZE', 256)
+    app.extensions['staffsync_analytics'] = LRUCache(maxsize=app.config['ANALYTICS_CACHE_SIZE'], ttl=CACHE_TTL)
@@ -0,0 +1,276 @@
+"""
+Attendance archival.
+
+Attendance older than a horizon moves out of the hot ``attendance`` table
+into one SQLite file per year (``<database>-archive/attendance_YYYY.db``),
+attached to a connection with ``ATTACH DATABASE`` only when a query's dates
+reach back that far. ``segments`` splits a date range into the physical
+tables that hold it; payroll, the staff dashboard history, exports and the
+rollup checks build their queries from it, so a range inside the hot period
+never touches an archive.
+
+``archive`` moves rows in three steps, each made of short transactions:
+
+1. freeze: rows before the new horizon become read-only (migration 0015
+   triggers), so the copy cannot miss an edit;
+2. copy: frozen rows are copied into the year files in id windows. Only the
+   archive files are written; the hot database is just read;
+3. switch and delete: ``archived_before`` moves up in one statement, from
+   then on readers take those dates from the archives, and the hot rows are
+   deleted in batches.
+
+Every step can be rerun, so an interrupted run is finished by the next one.
+The dashboard counters and monthly rollups keep covering archived dates.
+"""
+import os
+import re
+from datetime import date, timedelta
+
+DEFAULT_BATCH_SIZE = 1000
+
+HOT_TABLE = 'attendance'
+COLUMNS = ('id', 'employee_id', 'date', 'check_in_time', 'check_out_time', 'total_hours',
+           'overtime_hours', 'status', 'notes', 'created_at', 'updated_at')
+
+# Open bounds for whole-history queries
+FIRST_DATE, LAST_DATE = '0001-01-01', '9999-12-31'
+
+# SQLite's default limit on attached databases per connection
+MAX_ATTACHED = 10
+
+_FILENAME_RE = re.compile(r'^attendance_(\d{4})\.db$')
+
+_ARCHIVE_SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS {schema}.attendance (
+        id INTEGER PRIMARY KEY,
+        employee_id INTEGER,
+        date TEXT NOT NULL,
+        check_in_time TEXT,
+        check_out_time TEXT,
+        total_hours REAL DEFAULT 0,
+        overtime_hours REAL DEFAULT 0,
+        status TEXT,
+        notes TEXT,
+        created_at TEXT,
+        updated_at TEXT
+    )''',
+    # The hot table's read indexes: per-employee hour sums and history, and date-ordered exports
+    'CREATE INDEX IF NOT EXISTS {schema}.idx_attendance_employee_date_hours '
+    'ON attendance (employee_id, date, overtime_hours, total_hours)',
+    'CREATE INDEX IF NOT EXISTS {schema}.idx_attendance_date ON attendance (date)',
+)
+
+
+def state(conn):
+    """``(frozen_before, archived_before)``; either is None until the first run."""
+    row = conn.execute(
+        'SELECT frozen_before, archived_before FROM attendance_archive_state WHERE id = 1').fetchone()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def horizon(today, months):
+    """The first day of the month ``months`` months before ``today``, as an ISO date."""
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1).isoformat()
+
+
+def archive_dir(conn):
+    """The directory holding the year files, next to the connection's main database."""
+    main = next(row[2] for row in conn.execute('PRAGMA database_list') if row[1] == 'main')
+    return os.path.splitext(main)[0] + '-archive'
+
+
+def archive_files(conn):
+    """``{year: path}`` for every archive file on disk."""
+    directory = archive_dir(conn)
+    if not os.path.isdir(directory):
+        return {}
+    files = {}
+    for filename in os.listdir(directory):
+        match = _FILENAME_RE.match(filename)
+        if match:
+            files[int(match.group(1))] = os.path.join(directory, filename)
+    return files
+
+
+def _schema(year):
+    return f'attendance_{year}'
+
+
+def attach(conn, years, files=None):
+    """Attach the archive files for ``years`` that are not attached yet. Returns their schema names.
+
+    Archives attached for earlier queries stay attached; when the limit would be
+    exceeded, the ones not needed now are detached first (outside a transaction).
+    """
+    files = archive_files(conn) if files is None else files
+    wanted = {_schema(year): files[year] for year in years if year in files}
+    attached = {row[1] for row in conn.execute('PRAGMA database_list')}
+    missing = [name for name in wanted if name not in attached]
+    if missing and len(attached) + len(missing) > MAX_ATTACHED + 1 and not conn.in_transaction:
+        for name in attached:
+            if name.startswith('attendance_') and name not in wanted:
+                conn.execute(f'DETACH DATABASE {name}')
+    for name in missing:
+        conn.execute(f'ATTACH DATABASE ? AS {name}', (wanted[name],))
+    return list(wanted)
+
+
+def segments(conn, start=FIRST_DATE, end=LAST_DATE):
+    """Split the inclusive ISO date range into ``(table, start, end)`` pieces, oldest first.
+
+    Dates before ``archived_before`` come from the archive files for their
+    year, which are attached as needed; the rest from the hot table. A range
+    inside the hot period is ``[('attendance', start, end)]`` and reads nothing
+    else.
+    """
+    _, archived_before = state(conn)
+    if not archived_before or start >= archived_before:
+        return [(HOT_TABLE, start, end)]
+
+    last_archived = (date.fromisoformat(archived_before) - timedelta(days=1)).isoformat()
+    files = archive_files(conn)
+    years = [year for year in sorted(files)
+             if f'{year:04d}-01-01' <= min(end, last_archived) and f'{year:04d}-12-31' >= start]
+    attach(conn, years, files)
+
+    pieces = [(f'{_schema(year)}.attendance', max(start, f'{year:04d}-01-01'),
+               min(end, last_archived, f'{year:04d}-12-31')) for year in years]
+    if end >= archived_before:
+        pieces.append((HOT_TABLE, archived_before, end))
+    # Nothing was ever archived for these dates; any hot rows left there are the same rows
+    return pieces or [(HOT_TABLE, start, end)]
+
+
+def clip(pieces, start, end):
+    """The parts of ``pieces`` (from ``segments``) that fall inside ``start``..``end``."""
+    return [(table, max(start, piece_start), min(end, piece_end))
+            for table, piece_start, piece_end in pieces
+            if piece_start <= end and piece_end >= start]
+
+
+def source(conn, columns, start=FIRST_DATE, end=LAST_DATE):
+    """``(sql, params)`` for a subquery yielding ``columns`` of every attendance row in the range."""
+    select = ', '.join(columns)
+    parts, params = [], []
+    for table, piece_start, piece_end in segments(conn, start, end):
+        parts.append(f'SELECT {select} FROM {table} WHERE date BETWEEN ? AND ?')
+        params.extend((piece_start, piece_end))
+    return f"({' UNION ALL '.join(parts)})", params
+
+
+def recent_attendance(conn, employee_id, columns, limit):
+    """An employee's latest ``limit`` attendance rows, newest first.
+
+    Archives are read, newest year first, only when the hot table has fewer rows.
+    """
+    select = ', '.join(columns)
+    _, archived_before = state(conn)
+    rows = conn.execute(f'''
+        SELECT {select} FROM attendance WHERE employee_id = ? AND date >= ? ORDER BY date DESC LIMIT ?
+    ''', (employee_id, archived_before or FIRST_DATE, limit)).fetchall()
+    if len(rows) >= limit or not archived_before:
+        return rows
+
+    files = archive_files(conn)
+    for year in sorted(files, reverse=True):
+        if len(rows) >= limit:
+            break
+        if f'{year:04d}-01-01' >= archived_before:
+            continue
+        schema, = attach(conn, [year], files)
+        rows.extend(conn.execute(f'''
+            SELECT {select} FROM {schema}.attendance
+            WHERE employee_id = ? AND date < ?
+            ORDER BY date DESC LIMIT ?
+        ''', (employee_id, archived_before, limit - len(rows))).fetchall())
+    return rows
+
+
+def check_writable(conn, day):
+    """Raise ValueError if attendance for ``day`` is archived (read-only)."""
+    frozen_before, _ = state(conn)
+    if frozen_before and day and day < frozen_before:
+        raise ValueError(f'Attendance before {frozen_before} is archived and can no longer be changed')
+
+
+def _open_archive(conn, year, directory):
+    """Attach the year file, creating it with the archive schema if needed. Outside a transaction."""
+    os.makedirs(directory, exist_ok=True)
+    schema = _schema(year)
+    if schema not in {row[1] for row in conn.execute('PRAGMA database_list')}:
+        conn.execute(f'ATTACH DATABASE ? AS {schema}', (os.path.join(directory, f'attendance_{year}.db'),))
+        conn.execute(f'PRAGMA {schema}.journal_mode=WAL')
+        for statement in _ARCHIVE_SCHEMA:
+            conn.execute(statement.format(schema=schema))
+        conn.commit()
+    return schema
+
+
+def archive(conn, before, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Move attendance dated before ``before`` into the yearly archive files.
+
+    ``conn`` must be a plain connection of its own (not a pooled request
+    connection); the function commits after every batch. ``progress(step,
+    done, total)`` is called between batches. Returns row counts per step.
+    """
+    frozen_before, archived_before = state(conn)
+    if frozen_before and before < frozen_before:
+        # The horizon never moves back; finish what an earlier run froze
+        before = frozen_before
+
+    # 1. Freeze
+    conn.execute('UPDATE attendance_archive_state SET frozen_before = ? WHERE id = 1', (before,))
+    conn.commit()
+
+    # 2. Copy, including rows a crashed run already copied but had not deleted yet
+    years = [int(row[0]) for row in conn.execute(
+        'SELECT DISTINCT substr(date, 1, 4) FROM attendance WHERE date < ?', (before,))]
+    low, high = conn.execute('SELECT MIN(id), MAX(id) FROM attendance WHERE date < ?', (before,)).fetchone()
+    directory = archive_dir(conn)
+    schemas = {year: _open_archive(conn, year, directory) for year in years}
+    select = ', '.join(COLUMNS)
+
+    copied = 0
+    if low is not None:
+        for window_start in range(low, high + 1, batch_size):
+            window = (window_start, window_start + batch_size - 1)
+            for year, schema in schemas.items():
+                copied += conn.execute(f'''
+                    INSERT OR REPLACE INTO {schema}.attendance ({select})
+                    SELECT {select} FROM main.attendance
+                    WHERE id BETWEEN ? AND ? AND date >= ? AND date < ? AND date < ?
+                ''', window + (f'{year:04d}-01-01', f'{year + 1:04d}-01-01', before)).rowcount
+            conn.commit()
+            if progress:
+                progress('copy', window[1] - low + 1, high - low + 1)
+
+    # Every frozen hot row must be in its archive before readers are switched over
+    for year, schema in schemas.items():
+        missing = conn.execute(f'''
+            SELECT COUNT(*) FROM main.attendance h
+            WHERE h.date >= ? AND h.date < ? AND h.date < ?
+            AND NOT EXISTS (SELECT 1 FROM {schema}.attendance a WHERE a.id = h.id)
+        ''', (f'{year:04d}-01-01', f'{year + 1:04d}-01-01', before)).fetchone()[0]
+        if missing:
+            raise RuntimeError(f'{missing} attendance rows from {year} were not copied to the archive')
+
+    # 3. Switch readers over, then delete in batches
+    conn.execute('UPDATE attendance_archive_state SET archived_before = ? WHERE id = 1', (before,))
+    conn.commit()
+
+    deleted = 0
+    while True:
+        conn.execute('UPDATE attendance_archive_state SET archiving = 1 WHERE id = 1')
+        count = conn.execute('''
+            DELETE FROM attendance WHERE id IN (SELECT id FROM attendance WHERE date < ? LIMIT ?)
+        ''', (before, batch_size)).rowcount
+        conn.execute('UPDATE attendance_archive_state SET archiving = 0 WHERE id = 1')
+        conn.commit()
+        deleted += count
+        if progress:
+            progress('delete', deleted, None)
+        if count < batch_size:
+            break
+
+    return {'archived_before': before, 'copied': copied, 'deleted': deleted, 'years': sorted(schemas)}
@@ -0,0 +1,142 @@
+"""
+Bulk attendance ingestion for badge readers and kiosks.
+
+A batch of check-in/check-out events is validated item by item and applied in
+a single transaction with UPSERTs on the (employee_id, date) unique index.
+Applying the same batch twice leaves the table unchanged: the earliest
+check-in and the latest check-out of a day always win.
+"""
+import json
+from datetime import datetime
+
+from services import archive
+
+EVENT_TYPES = ('check_in', 'check_out')
+
+
+def parse_events(body, content_type):
+    """Decode a JSON array or NDJSON body into a list of raw events.
+
+    NDJSON lines that are not valid JSON become ``None`` placeholders so they
+    still get a per-item error. Raises ValueError for an unreadable JSON body.
+    """
+    if 'ndjson' in (content_type or ''):
+        events = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                events.append(None)
+        return events
+
+    events = json.loads(body or 'null')
+    if isinstance(events, dict):
+        events = events.get('events')
+    if not isinstance(events, list):
+        raise ValueError('Expected a JSON array of events')
+    return events
+
+
+def validate_event(event, today):
+    """Return ``(normalized_event, None)`` or ``(None, error_message)``."""
+    if not isinstance(event, dict):
+        return None, 'Invalid event'
+
+    employee_id = event.get('employee_id')
+    if isinstance(employee_id, bool) or not isinstance(employee_id, int):
+        return None, 'employee_id must be an integer'
+
+    kind = event.get('event')
+    if kind not in EVENT_TYPES:
+        return None, "event must be 'check_in' or 'check_out'"
+
+    day = event.get('date', today)
+    time = event.get('time')
+    try:
+        # Re-format so '9:05' is stored as '09:05' and MIN/MAX compare correctly as text
+        day = datetime.strptime(day, '%Y-%m-%d').strftime('%Y-%m-%d')
+        time = datetime.strptime(time, '%H:%M').strftime('%H:%M')
+    except (TypeError, ValueError):
+        return None, 'date must be YYYY-MM-DD and time HH:MM'
+
+    return {'employee_id': employee_id, 'event': kind, 'date': day, 'time': time}, None
+
+
+def hours_between(check_in, check_out):
+    """Hours from an HH:MM check-in to check-out, wrapping past midnight; 0 if either is missing."""
+    try:
+        start = datetime.strptime(check_in, '%H:%M')
+        end = datetime.strptime(check_out, '%H:%M')
+    except (TypeError, ValueError):
+        return 0
+    return (end - start).total_seconds() % 86400 / 3600
+
+
+def apply_events(conn, events, today, working_hours=8):
+    """Validate and apply a batch of events. Returns one result dict per input item.
+
+    Hours beyond ``working_hours`` on a completed day are recorded as overtime.
+
+    The caller commits; nothing is written if an exception escapes.
+    """
+    results = [None] * len(events)
+    valid = []
+    for index, event in enumerate(events):
+        normalized, error = validate_event(event, today)
+        if error:
+            results[index] = {'index': index, 'success': False, 'error': error}
+        else:
+            valid.append((index, normalized))
+
+    # Archived dates are read-only; rejecting them here keeps the rest of the batch applying
+    frozen_before, _ = archive.state(conn)
+    if frozen_before:
+        for index, event in valid:
+            if event['date'] < frozen_before:
+                results[index] = {'index': index, 'success': False,
+                                  'error': f'Attendance before {frozen_before} is archived'}
+        valid = [(index, event) for index, event in valid if results[index] is None]
+
+    # One lookup for every employee referenced in the batch
+    ids = sorted({e['employee_id'] for _, e in valid})
+    known = {row[0] for row in conn.execute(
+        'SELECT id FROM employees WHERE id IN (SELECT value FROM json_each(?))', (json.dumps(ids),))}
+
+    check_ins, check_outs, touched = [], [], set()
+    for index, event in valid:
+        if event['employee_id'] not in known:
+            results[index] = {'index': index, 'success': False, 'error': 'Employee not found'}
+            continue
+        row = (event['employee_id'], event['date'], event['time'])
+        (check_ins if event['event'] == 'check_in' else check_outs).append(row)
+        touched.add((event['employee_id'], event['date']))
+        results[index] = {'index': index, 'success': True}
+
+    conn.executemany('''
+        INSERT INTO attendance (employee_id, date, check_in_time, status)
+        VALUES (?, ?, ?, 'Present')
+        ON CONFLICT (employee_id, date) DO UPDATE SET
+            check_in_time = MIN(IFNULL(check_in_time, excluded.check_in_time), excluded.check_in_time),
+            updated_at = CURRENT_TIMESTAMP
+    ''', check_ins)
+    conn.executemany('''
+        INSERT INTO attendance (employee_id, date, check_out_time, status)
+        VALUES (?, ?, ?, 'Present')
+        ON CONFLICT (employee_id, date) DO UPDATE SET
+            check_out_time = MAX(IFNULL(check_out_time, excluded.check_out_time), excluded.check_out_time),
+            updated_at = CURRENT_TIMESTAMP
+    ''', check_outs)
+
+    # Recompute hours for completed days, wrapping past midnight like hours_between does
+    hours = '''((strftime('%s', '2000-01-01 ' || check_out_time)
+               - strftime('%s', '2000-01-01 ' || check_in_time) + 86400) % 86400) / 3600.0'''
+    conn.executemany(f'''
+        UPDATE attendance
+        SET total_hours = {hours}, overtime_hours = MAX({hours} - ?, 0)
+        WHERE employee_id = ? AND date = ?
+          AND check_in_time IS NOT NULL AND check_out_time IS NOT NULL
+    ''', [(working_hours, employee_id, day) for employee_id, day in sorted(touched)])
+
+    return results
@@ -0,0 +1,128 @@
+"""
+Departments and their statistics.
+
+The departments page is built from ``summary``: one grouped query that reads
+headcount and salary cost for every department from
+idx_employees_department_id, with no table lookups and no query per
+department. Member lists are loaded separately, a page at a time, when a
+department is opened (see ``members``).
+
+Employees are linked by ``employees.department_id``. Migration 0012 keeps it
+in step with the older ``employees.department`` name column, so renaming or
+deleting a department here only needs to touch the name.
+"""
+import sqlite3
+
+MEMBERS_PAGE_SIZE = 50
+
+
+def summary(conn):
+    """Every department with headcount, salary cost and budget utilisation, by name."""
+    rows = conn.execute('''
+        SELECT d.id, d.name, d.description, d.budget, d.head_employee_id,
+               h.first_name || ' ' || h.last_name AS head, h.email AS head_email,
+               IFNULL(m.headcount, 0) AS headcount, IFNULL(m.salary_cost, 0) AS salary_cost
+        FROM departments d
+        LEFT JOIN employees h ON h.id = d.head_employee_id
+        LEFT JOIN (
+            SELECT department_id, COUNT(*) AS headcount, SUM(IFNULL(salary, 0)) AS salary_cost
+            FROM employees WHERE department_id IS NOT NULL
+            GROUP BY department_id
+        ) m ON m.department_id = d.id
+        ORDER BY d.name
+    ''').fetchall()
+
+    departments = []
+    for row in rows:
+        department = dict(row)
+        # Salaries are annual, like budgets
+        department['annual_cost'] = department['salary_cost']
+        department['utilisation'] = (department['annual_cost'] / department['budget']
+                                     if department['budget'] else None)
+        departments.append(department)
+    return departments
+
+
+def members(conn, department_id, offset=0, limit=MEMBERS_PAGE_SIZE):
+    """One page of a department's employees by name, plus whether more follow."""
+    rows = conn.execute('''
+        SELECT id, first_name, last_name, email, position, salary, status
+        FROM employees WHERE department_id = ?
+        ORDER BY last_name, first_name, id
+        LIMIT ? OFFSET ?
+    ''', (department_id, limit + 1, offset)).fetchall()
+    return [dict(row) for row in rows[:limit]], len(rows) > limit
+
+
+def get(conn, department_id):
+    return conn.execute('SELECT * FROM departments WHERE id = ?', (department_id,)).fetchone()
+
+
+def resolve_head(conn, value):
+    """The employee id for a head given by id or email; None for a blank value.
+
+    Raises ValueError when no employee matches.
+    """
+    value = (value or '').strip()
+    if not value:
+        return None
+    column = 'id' if value.isdigit() else 'email'
+    row = conn.execute(f'SELECT id FROM employees WHERE {column} = ?', (value,)).fetchone()
+    if row is None:
+        raise ValueError(f'No employee found for department head "{value}"')
+    return row[0]
+
+
+def parse_budget(value):
+    """The budget from a form value; None when blank. Raises ValueError for a bad amount."""
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        budget = float(value)
+    except ValueError:
+        raise ValueError(f'Invalid budget: {value}')
+    if budget < 0:
+        raise ValueError('Budget cannot be negative')
+    return budget
+
+
+def create(conn, name, description=None, head_employee_id=None, budget=None):
+    """Insert a department and return its id. Raises ValueError for a blank or taken name. The caller commits."""
+    name = (name or '').strip()
+    if not name:
+        raise ValueError('Department name is required')
+    try:
+        cursor = conn.execute('''
+            INSERT INTO departments (name, description, head_employee_id, budget) VALUES (?, ?, ?, ?)
+        ''', (name, description or None, head_employee_id, budget))
+    except sqlite3.IntegrityError:
+        raise ValueError(f'A department named "{name}" already exists')
+    return cursor.lastrowid
+
+
+def update(conn, department_id, name, description=None, head_employee_id=None, budget=None):
+    """Update a department; members follow a rename. Returns False if it does not exist. The caller commits."""
+    name = (name or '').strip()
+    if not name:
+        raise ValueError('Department name is required')
+    try:
+        cursor = conn.execute('''
+            UPDATE departments SET name = ?, description = ?, head_employee_id = ?, budget = ?
+            WHERE id = ?
+        ''', (name, description or None, head_employee_id, budget, department_id))
+    except sqlite3.IntegrityError:
+        raise ValueError(f'A department named "{name}" already exists')
+    return cursor.rowcount > 0
+
+
+def delete(conn, department_id):
+    """Delete a department, leaving its members unassigned. Returns the number unassigned. The caller commits."""
+    unassigned = conn.execute('UPDATE employees SET department = NULL WHERE department_id = ?',
+                              (department_id,)).rowcount
+    conn.execute('DELETE FROM departments WHERE id = ?', (department_id,))
+    return unassigned
+
+
+def names(conn):
+    return [row[0] for row in conn.execute('SELECT name FROM departments ORDER BY name')]
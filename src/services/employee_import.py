@@ -0,0 +1,126 @@
+"""
+Chunked bulk employee import from CSV.
+
+The file is parsed row by row, so memory does not grow with its size. Valid
+rows are inserted with ``executemany`` in chunked transactions. Rows with a
+duplicate email (in the file or already in ``employees``) and rows that fail
+validation are reported by line number without aborting the import.
+"""
+import csv
+import json
+from datetime import datetime
+
+REQUIRED_FIELDS = ('first_name', 'last_name', 'email')
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class ImportReport:
+    """Outcome of an import: counts plus per-line duplicates and errors."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.duplicates = []  # (line, email)
+        self.errors = []      # (line, message)
+
+    @property
+    def processed(self):
+        return self.inserted + len(self.duplicates) + len(self.errors)
+
+    def to_dict(self, max_items=1000):
+        return {
+            'processed': self.processed,
+            'inserted': self.inserted,
+            'duplicate_count': len(self.duplicates),
+            'error_count': len(self.errors),
+            'duplicates': [{'line': line, 'email': email} for line, email in self.duplicates[:max_items]],
+            'errors': [{'line': line, 'error': message} for line, message in self.errors[:max_items]],
+        }
+
+
+def validate_row(row):
+    """Return ``(values_tuple, None)`` or ``(None, error_message)`` for one CSV row."""
+    values = {key.strip().lower(): (value or '').strip()
+              for key, value in row.items() if key is not None}
+
+    missing = [field for field in REQUIRED_FIELDS if not values.get(field)]
+    if missing:
+        return None, f"Missing required field(s): {', '.join(missing)}"
+    if '@' not in values['email']:
+        return None, f"Invalid email: {values['email']}"
+
+    try:
+        salary = float(values.get('salary') or 0)
+    except ValueError:
+        return None, f"Invalid salary: {values['salary']}"
+    if salary < 0:
+        return None, 'Salary cannot be negative'
+
+    hire_date = values.get('hire_date') or None
+    if hire_date:
+        try:
+            datetime.strptime(hire_date, '%Y-%m-%d')
+        except ValueError:
+            return None, f'Invalid hire_date (expected YYYY-MM-DD): {hire_date}'
+
+    return (values['first_name'], values['last_name'], values['email'],
+            values.get('phone') or None, values.get('position') or None,
+            values.get('department') or None, salary, hire_date,
+            values.get('status') or 'Active'), None
+
+
+def import_employees(conn, lines, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Import employees from an iterable of CSV text lines (header first).
+
+    ``progress(report)``, if given, is called after each committed chunk.
+    """
+    report = ImportReport()
+    reader = csv.DictReader(lines)
+    seen_emails = set()
+    chunk = []
+
+    for row in reader:
+        line = reader.line_num
+        values, error = validate_row(row)
+        if error:
+            report.errors.append((line, error))
+            continue
+        if values[2] in seen_emails:
+            report.duplicates.append((line, values[2]))
+            continue
+        seen_emails.add(values[2])
+        chunk.append((line, values))
+        if len(chunk) >= chunk_size:
+            _insert_chunk(conn, chunk, report)
+            chunk = []
+            if progress:
+                progress(report)
+
+    if chunk:
+        _insert_chunk(conn, chunk, report)
+    return report
+
+
+def _insert_chunk(conn, chunk, report):
+    # IMMEDIATE so no other writer can add one of these emails between the check and the insert
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        emails = [values[2] for _, values in chunk]
+        existing = {row[0] for row in conn.execute(
+            'SELECT email FROM employees WHERE email IN (SELECT value FROM json_each(?))',
+            (json.dumps(emails),))}
+
+        rows = []
+        for line, values in chunk:
+            if values[2] in existing:
+                report.duplicates.append((line, values[2]))
+            else:
+                rows.append(values)
+
+        conn.executemany('''INSERT INTO employees
+                           (first_name, last_name, email, phone, position, department, salary, hire_date, status)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    report.inserted += len(rows)
@@ -0,0 +1,123 @@
+"""
+Entity tags and conditional GETs for the JSON detail endpoints.
+
+Migration 0011 versions employee and payroll rows. A row's tag is built from
+its version(s) and the schema revision, so it changes whenever the JSON for
+the row can. A request whose If-None-Match already holds the current tag is
+answered 304 from a version-only query, without loading or serialising the
+row. Responses carry ``Cache-Control: private, no-cache``, so browsers keep
+the body and revalidate it on every ``fetch()`` without any change to the
+calling code.
+
+``batch`` does the same for a list of ids in two queries: one for every
+version, and one for the rows whose tag the client does not have.
+"""
+from collections import namedtuple
+
+from flask import Response, jsonify, request
+
+from database import migrate
+
+# Part of every tag, so new columns from a later migration invalidate cached bodies
+SCHEMA_REVISION = migrate.latest_version()
+
+BATCH_LIMIT = 500
+
+Resource = namedtuple('Resource', 'kind versions_sql rows_sql version_columns')
+
+EMPLOYEE = Resource(
+    'employee',
+    'SELECT id, version FROM employees WHERE id IN ({ids})',
+    'SELECT * FROM employees WHERE id IN ({ids})',
+    ('version',),
+)
+
+# A payslip embeds employee fields, so its tag covers both rows
+PAYROLL = Resource(
+    'payroll',
+    '''SELECT p.id, p.version, e.version FROM payroll p
+       JOIN employees e ON p.employee_id = e.id WHERE p.id IN ({ids})''',
+    '''SELECT p.*, e.first_name, e.last_name, e.position, e.email, e.version AS employee_version
+       FROM payroll p JOIN employees e ON p.employee_id = e.id WHERE p.id IN ({ids})''',
+    ('version', 'employee_version'),
+)
+
+
+def make_etag(resource, row_id, versions):
+    return f"{resource.kind}-{row_id}-v{'.'.join(str(version) for version in versions)}-s{SCHEMA_REVISION}"
+
+
+def _placeholders(ids):
+    return ', '.join('?' for _ in ids)
+
+
+def current_etags(conn, resource, ids):
+    """``{id: etag}`` for the ids that exist, from the version columns alone."""
+    sql = resource.versions_sql.format(ids=_placeholders(ids))
+    return {row[0]: make_etag(resource, row[0], row[1:]) for row in conn.execute(sql, list(ids))}
+
+
+def load_rows(conn, resource, ids):
+    """``{id: (etag, row dict)}``; the tag is taken from the row itself, so it matches the body."""
+    sql = resource.rows_sql.format(ids=_placeholders(ids))
+    loaded = {}
+    for row in conn.execute(sql, list(ids)):
+        data = dict(row)
+        loaded[data['id']] = (make_etag(resource, data['id'], [data[c] for c in resource.version_columns]), data)
+    return loaded
+
+
+def _with_validators(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def conditional_get(conn, resource, row_id, not_found):
+    """The JSON for one row, or 304 when the client's If-None-Match is current."""
+    if request.if_none_match:
+        etag = current_etags(conn, resource, [row_id]).get(row_id)
+        if etag is None:
+            return jsonify({'error': not_found}), 404
+        if request.if_none_match.contains(etag):
+            return _with_validators(Response(status=304), etag)
+
+    loaded = load_rows(conn, resource, [row_id]).get(row_id)
+    if loaded is None:
+        return jsonify({'error': not_found}), 404
+    etag, data = loaded
+    return _with_validators(jsonify(data), etag)
+
+
+def batch(conn, resource, ids, known):
+    """Rows among ``ids`` whose tag differs from the one in ``known`` (``{id: etag}``).
+
+    Returns ``{'changed': [{'id', 'etag', 'data'}], 'unchanged': [ids], 'missing': [ids]}``.
+    """
+    etags = current_etags(conn, resource, ids)
+    stale = [row_id for row_id in ids if row_id in etags and known.get(row_id) != etags[row_id]]
+    loaded = load_rows(conn, resource, stale) if stale else {}
+    return {
+        'changed': [{'id': row_id, 'etag': loaded[row_id][0], 'data': loaded[row_id][1]}
+                    for row_id in stale if row_id in loaded],
+        'unchanged': [row_id for row_id in ids if row_id in etags and row_id not in stale],
+        'missing': [row_id for row_id in ids if row_id not in etags
+                    or (row_id in stale and row_id not in loaded)],
+    }
+
+
+def parse_batch_request(data):
+    """``(ids, known)`` from a ``{"ids": [...], "etags": {"<id>": "<etag>"}}`` body.
+
+    Raises ValueError for a malformed or oversized request.
+    """
+    try:
+        ids = list(dict.fromkeys(int(row_id) for row_id in data.get('ids') or []))
+        known = {int(row_id): str(etag).strip('"') for row_id, etag in (data.get('etags') or {}).items()}
+    except (TypeError, ValueError, AttributeError):
+        raise ValueError('ids must be a list of integers and etags a mapping of id to tag')
+    if not ids:
+        raise ValueError('No ids given')
+    if len(ids) > BATCH_LIMIT:
+        raise ValueError(f'Too many ids: {len(ids)} (limit {BATCH_LIMIT})')
+    return ids, known
@@ -0,0 +1,104 @@
+"""
+Handlers for the background job kinds the app submits.
+
+Each one works in chunks, commits as it goes and reports progress between
+chunks (see ``services.jobs``).
+"""
+import os
+
+from services import archive
+from services import employee_import
+from services import export as exporter
+from services import payroll as payroll_engine
+from services import settings
+from services.jobs import JobCancelled, handler
+
+PAYROLL_CHUNK_SIZE = 2000
+
+
+@handler('payroll.generate')
+def generate_payroll(ctx):
+    params = ctx.params
+    start, end = payroll_engine.pay_period(params.get('pay_period_start'), params.get('pay_period_end'))
+    conn = ctx.conn
+    # Read directly: a job runs outside any request and only needs them once
+    rates = payroll_engine.rates_with_overrides(params.get('rates'), settings.payroll_rates(settings.read(conn)))
+
+    ctx.progress(0, 1, 'Calculating payroll', force=True)
+    rows = payroll_engine.payroll_rows(conn, start, end, params.get('include_overtime', True),
+                                       params.get('include_tax', True), rates)
+    # Rows above this id were created by this run; they are removed again if it is cancelled
+    first_new_id = conn.execute('SELECT IFNULL(MAX(id), 0) FROM payroll').fetchone()[0]
+
+    created = 0
+    try:
+        for offset in range(0, len(rows), PAYROLL_CHUNK_SIZE):
+            ctx.progress(offset, len(rows), f'{offset} of {len(rows)} employees')
+            created += payroll_engine.insert_payroll_rows(conn, rows[offset:offset + PAYROLL_CHUNK_SIZE])
+            conn.commit()
+    except JobCancelled:
+        conn.execute('''
+            DELETE FROM payroll
+            WHERE id > ? AND pay_period_start = ? AND pay_period_end = ? AND status = 'draft'
+        ''', (first_new_id, start, end))
+        conn.commit()
+        raise
+    return {'payroll_created': created, 'employees': len(rows)}
+
+
+def _export(ctx, kind):
+    fmt = ctx.params.get('format', 'csv')
+    if fmt not in exporter.FORMATS:
+        raise ValueError(f'Unsupported format: {fmt}')
+    sql, params = exporter.QUERIES[kind](ctx.conn, ctx.params.get('filters') or {})
+
+    directory = os.path.join(ctx.settings['JOBS_DIR'], 'exports')
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{kind}-{ctx.id}.{fmt}')
+    rows = 0
+
+    def on_rows(count):
+        nonlocal rows
+        rows = count
+        ctx.progress(message=f'{count} rows written')
+
+    try:
+        with open(path, 'w', newline='', encoding='utf-8') as fh:
+            for chunk in exporter.stream_rows(ctx.conn.execute(sql, params), fmt, on_rows=on_rows):
+                fh.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return {'rows': rows, 'path': path, 'filename': f'{kind}.{fmt}', 'mimetype': exporter.FORMATS[fmt]}
+
+
+@handler('export.payroll')
+def export_payroll(ctx):
+    return _export(ctx, 'payroll')
+
+
+@handler('export.attendance')
+def export_attendance(ctx):
+    return _export(ctx, 'attendance')
+
+
+@handler('attendance.archive')
+def archive_attendance(ctx):
+    def progress(step, done, total):
+        ctx.progress(done, total, f'{step}: {done} rows' if total is None else f'{step}: {done} of {total} ids')
+
+    return archive.archive(ctx.conn, ctx.params['before'],
+                           ctx.params.get('batch_size', archive.DEFAULT_BATCH_SIZE), progress)
+
+
+@handler('employees.import')
+def import_employees(ctx):
+    path = ctx.params['path']
+    try:
+        with open(path, encoding='utf-8-sig', newline='') as fh:
+            report = employee_import.import_employees(
+                ctx.conn, fh, progress=lambda report: ctx.progress(
+                    message=f'{report.processed} rows processed, {report.inserted} imported'))
+    finally:
+        os.remove(path)
+    return report.to_dict()
@@ -0,0 +1,289 @@
+"""
+Background jobs backed by the ``jobs`` table.
+
+Work that can outlive a gunicorn request (payroll runs, exports, imports) is
+submitted as a row and picked up by a small worker pool. The pool runs threads
+or processes and needs no broker. Claiming a job is a single
+``UPDATE ... RETURNING`` inside ``BEGIN IMMEDIATE``, so any number of pools,
+whether in web workers or in ``flask staffsync run-jobs``, can share one
+database without running a job twice.
+
+Handlers are plain functions registered with ``@handler('kind')``. They get a
+``JobContext`` with their parameters, a connection to do the work on and a
+``progress()`` method. Calling ``progress()`` records how far the job has got,
+refreshes its heartbeat and raises ``JobCancelled`` once a cancel has been
+requested.
+
+Handlers work in chunks and commit each one, calling ``progress()`` in
+between. That keeps the writer lock free for check-ins during a long run.
+It also means progress, which is written on a second connection, never has
+to wait for the job's own open transaction. A handler that must not leave
+partial work behind cleans up when it sees ``JobCancelled``.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+from database import connection as db
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+# Progress writes go through their own connection; this caps how often a chatty job writes
+PROGRESS_MIN_INTERVAL = 0.5
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job has been cancelled."""
+
+
+def handler(kind):
+    """Register the decorated function as the handler for jobs of ``kind``."""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+class JobContext:
+    def __init__(self, job, conn, status_conn, settings):
+        self.id = job['id']
+        self.kind = job['kind']
+        self.params = json.loads(job['params'] or '{}')
+        self.conn = conn
+        self.settings = settings
+        self._status_conn = status_conn
+        self._last_report = 0.0
+
+    def progress(self, done=None, total=None, message=None, force=False):
+        """Record progress and heartbeat; raises JobCancelled if a cancel was requested."""
+        now = time.monotonic()
+        if not force and now - self._last_report < PROGRESS_MIN_INTERVAL:
+            return
+        self._last_report = now
+        fraction = min(1.0, done / total) if done is not None and total else None
+        self._status_conn.execute('''
+            UPDATE jobs SET progress = COALESCE(?, progress), message = COALESCE(?, message),
+                            heartbeat_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (fraction, message, self.id))
+        self._status_conn.commit()
+        if self._status_conn.execute('SELECT cancel_requested FROM jobs WHERE id = ?',
+                                     (self.id,)).fetchone()[0]:
+            raise JobCancelled()
+
+
+def job_to_dict(row):
+    job = dict(row)
+    job['params'] = json.loads(job['params'] or '{}')
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    job['cancel_requested'] = bool(job['cancel_requested'])
+    return job
+
+
+def submit(conn, kind, params=None, submitted_by=None):
+    """Queue a job and return its id. The caller commits."""
+    if kind not in HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    cursor = conn.execute('INSERT INTO jobs (kind, params, submitted_by) VALUES (?, ?, ?)',
+                          (kind, json.dumps(params or {}), submitted_by))
+    return cursor.lastrowid
+
+
+def get(conn, job_id):
+    return conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+
+def cancel(conn, job_id):
+    """Cancel a queued job outright, or ask a running one to stop. The caller commits.
+
+    Returns False when the job does not exist or has already finished.
+    """
+    cursor = conn.execute('''
+        UPDATE jobs SET status = 'cancelled', finished_at = CURRENT_TIMESTAMP, cancel_requested = 1
+        WHERE id = ? AND status = 'queued'
+    ''', (job_id,))
+    if cursor.rowcount:
+        return True
+    cursor = conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'",
+                          (job_id,))
+    return cursor.rowcount > 0
+
+
+def claim(conn, worker, stale_after):
+    """Take the oldest queued job for ``worker``, or return None.
+
+    Running jobs whose heartbeat is older than ``stale_after`` seconds belonged
+    to a worker that died; they are failed here rather than silently re-run.
+
+    Idle workers poll every second, so a read-only probe runs first and the
+    write lock is only taken when there is a queued or stale job to act on.
+    """
+    stale_cutoff = f'-{int(stale_after)} seconds'
+    if conn.execute('''
+        SELECT 1 FROM jobs
+        WHERE status = 'queued' OR (status = 'running' AND heartbeat_at < datetime('now', ?))
+        LIMIT 1
+    ''', (stale_cutoff,)).fetchone() is None:
+        return None
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute('''
+            UPDATE jobs SET status = 'failed', finished_at = CURRENT_TIMESTAMP,
+                            error = 'Worker stopped responding'
+            WHERE status = 'running' AND heartbeat_at < datetime('now', ?)
+        ''', (stale_cutoff,))
+        claimed = conn.execute('''
+            UPDATE jobs SET status = 'running', worker = ?, started_at = CURRENT_TIMESTAMP,
+                            heartbeat_at = CURRENT_TIMESTAMP
+            WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1)
+            RETURNING *
+        ''', (worker,)).fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return claimed[0] if claimed else None
+
+
+def _finish(conn, job_id, status, result=None, error=None):
+    conn.execute('''
+        UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = CURRENT_TIMESTAMP,
+                        progress = CASE WHEN ? = 'succeeded' THEN 1 ELSE progress END
+        WHERE id = ?
+    ''', (status, json.dumps(result) if result is not None else None, error, status, job_id))
+    conn.commit()
+
+
+def run_job(job, status_conn, settings):
+    """Run one claimed job to completion on a fresh connection."""
+    work_conn = db.open_connection(settings['DATABASE'], settings['DATABASE_BUSY_TIMEOUT_MS'],
+                                   serialize_writes=True)
+    ctx = JobContext(job, work_conn, status_conn, settings)
+    try:
+        result = HANDLERS[job['kind']](ctx)
+        work_conn.commit()
+    except JobCancelled:
+        work_conn.rollback()
+        _finish(status_conn, job['id'], 'cancelled')
+    except Exception as e:
+        work_conn.rollback()
+        logger.exception('Job %s (%s) failed', job['id'], job['kind'])
+        _finish(status_conn, job['id'], 'failed', error=str(e) or e.__class__.__name__)
+    else:
+        _finish(status_conn, job['id'], 'succeeded', result)
+    finally:
+        work_conn.close()
+
+
+def worker_loop(settings, name, stop, wake=None):
+    """Claim and run jobs until ``stop`` is set."""
+    conn = db.open_connection(settings['DATABASE'], settings['DATABASE_BUSY_TIMEOUT_MS'],
+                              serialize_writes=True)
+    try:
+        while not stop.is_set():
+            try:
+                job = claim(conn, name, settings['JOBS_STALE_AFTER'])
+            except Exception:
+                logger.exception('Job worker %s could not claim a job', name)
+                job = None
+            if job is None:
+                if wake is not None:
+                    wake.wait(settings['JOBS_POLL_INTERVAL'])
+                    wake.clear()
+                else:
+                    stop.wait(settings['JOBS_POLL_INTERVAL'])
+                continue
+            run_job(job, conn, settings)
+    finally:
+        conn.close()
+
+
+def _process_main(settings, name, stop):
+    from services import job_handlers  # noqa: F401  (registers the handlers in the child)
+    worker_loop(settings, name, stop)
+
+
+class WorkerPool:
+    """``size`` job workers as daemon threads, or as child processes in 'process' mode."""
+
+    def __init__(self, settings, size=2, mode='thread'):
+        self.settings = settings
+        self.size = size
+        self.mode = mode
+        self.pid = os.getpid()
+        self._workers = []
+        if mode == 'process':
+            self._stop = multiprocessing.Event()
+            self._wake = None
+        else:
+            self._stop = threading.Event()
+            self._wake = threading.Event()
+
+    def start(self):
+        for index in range(self.size):
+            name = f'{os.uname().nodename}:{os.getpid()}:{index}'
+            if self.mode == 'process':
+                worker = multiprocessing.Process(target=_process_main, name=f'job-worker-{index}',
+                                                 args=(self.settings, name, self._stop), daemon=True)
+            else:
+                worker = threading.Thread(target=worker_loop, name=f'job-worker-{index}',
+                                          args=(self.settings, name, self._stop, self._wake), daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def notify(self):
+        """Wake idle thread workers so a job submitted from this process starts immediately."""
+        if self._wake is not None:
+            self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self.notify()
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def join(self):
+        for worker in self._workers:
+            worker.join()
+
+
+def worker_settings(app):
+    keys = ('DATABASE', 'DATABASE_BUSY_TIMEOUT_MS', 'JOBS_DIR', 'JOBS_POLL_INTERVAL', 'JOBS_STALE_AFTER')
+    return {key: app.config[key] for key in keys}
+
+
+def init_app(app):
+    """Start the in-process worker pool lazily, on the first request of each worker process."""
+    app.config.setdefault('JOBS_WORKERS', 2)
+    app.config.setdefault('JOBS_WORKER_MODE', 'thread')
+    app.config.setdefault('JOBS_POLL_INTERVAL', 1.0)
+    app.config.setdefault('JOBS_STALE_AFTER', 600)
+    if not app.config.get('JOBS_DIR'):
+        app.config['JOBS_DIR'] = os.path.join(os.path.dirname(os.path.abspath(app.config['DATABASE'])), 'jobs')
+    lock = threading.Lock()
+
+    @app.before_request
+    def ensure_job_workers():
+        pool = app.extensions.get('staffsync_jobs')
+        # Threads do not survive a fork (gunicorn --preload), so each process starts its own
+        if app.config['JOBS_WORKERS'] <= 0 or (pool is not None and pool.pid == os.getpid()):
+            return
+        with lock:
+            pool = app.extensions.get('staffsync_jobs')
+            if pool is None or pool.pid != os.getpid():
+                pool = WorkerPool(worker_settings(app), app.config['JOBS_WORKERS'],
+                                  app.config['JOBS_WORKER_MODE'])
+                pool.start()
+                app.extensions['staffsync_jobs'] = pool
+
+
+def notify_workers(app):
+    pool = app.extensions.get('staffsync_jobs')
+    if pool is not None and pool.pid == os.getpid():
+        pool.notify()
@@ -0,0 +1,111 @@
+"""
+Leave balance ledger.
+
+Migration 0008 keeps ``leave_balances`` current with triggers on ``leaves``:
+approving, rejecting, editing or deleting a request adjusts the matching
+balance row in the same transaction. Reading a balance is therefore one
+primary-key lookup. Employees without a row yet (new hires, a year not rolled
+over) fall back to their policy's full allowance.
+
+``rollover`` opens the following year's rows, carrying unused days forward up
+to each policy's ``max_carry_over``. It works through employees in id order in
+batches, one short write transaction per batch, and is safe to re-run.
+"""
+from services import settings
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def policies(conn):
+    return {row['leave_type']: row for row in conn.execute('SELECT * FROM leave_policies')}
+
+
+def _accrued(policy, entitlement, year, today):
+    # Monthly accrual earns 1/12 of the allowance at the start of each month of the year
+    if policy is None or policy['accrual'] != 'monthly' or year != today.year:
+        return entitlement
+    return entitlement * today.month / 12
+
+
+def _balance(row, policy, year, today):
+    entitlement = row['entitlement'] if row else (policy['annual_allowance'] if policy else 0)
+    carried_over = row['carried_over'] if row else 0
+    used = row['used'] if row else 0
+    pending = row['pending'] if row else 0
+    accrued = _accrued(policy, entitlement, year, today)
+    return {
+        'entitlement': entitlement,
+        'accrued': accrued,
+        'carried_over': carried_over,
+        'used': used,
+        'pending': pending,
+        'available': accrued + carried_over - used,
+    }
+
+
+def balance(conn, employee_id, leave_type='annual', year=None, today=None):
+    """The balance for one employee, leave type and year (default: the current year)."""
+    today = today or settings.now(settings.current(conn)).date()
+    year = year or today.year
+    row = conn.execute('''
+        SELECT entitlement, carried_over, used, pending FROM leave_balances
+        WHERE employee_id = ? AND year = ? AND leave_type = ?
+    ''', (employee_id, year, leave_type)).fetchone()
+    policy = conn.execute('SELECT * FROM leave_policies WHERE leave_type = ?', (leave_type,)).fetchone()
+    return _balance(row, policy, year, today)
+
+
+def balances(conn, employee_id, year=None, today=None):
+    """Balances for every leave type with a policy or a row this year, keyed by leave type."""
+    today = today or settings.now(settings.current(conn)).date()
+    year = year or today.year
+    rows = {row['leave_type']: row for row in conn.execute('''
+        SELECT leave_type, entitlement, carried_over, used, pending FROM leave_balances
+        WHERE employee_id = ? AND year = ?
+    ''', (employee_id, year))}
+    all_policies = policies(conn)
+    return {leave_type: _balance(rows.get(leave_type), all_policies.get(leave_type), year, today)
+            for leave_type in sorted(set(all_policies) | set(rows))}
+
+
+def rollover(conn, year, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Open ``year + 1`` balances for every employee. Returns the number of employees processed.
+
+    Re-running only recomputes entitlement and carry-over; used and pending
+    days already booked against the new year are left alone.
+    """
+    processed = 0
+    last_id = 0
+    while True:
+        ids = [row[0] for row in conn.execute(
+            'SELECT id FROM employees WHERE id > ? ORDER BY id LIMIT ?', (last_id, batch_size))]
+        if not ids:
+            break
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('''
+                INSERT INTO leave_balances (employee_id, year, leave_type, entitlement, carried_over)
+                SELECT e.id, :next_year, p.leave_type, p.annual_allowance,
+                       MIN(p.max_carry_over,
+                           MAX(0, IFNULL(b.entitlement, p.annual_allowance)
+                                  + IFNULL(b.carried_over, 0) - IFNULL(b.used, 0)))
+                FROM employees e
+                CROSS JOIN leave_policies p
+                LEFT JOIN leave_balances b
+                    ON b.employee_id = e.id AND b.year = :year AND b.leave_type = p.leave_type
+                WHERE e.id BETWEEN :first AND :last
+                ON CONFLICT (employee_id, year, leave_type) DO UPDATE SET
+                    entitlement = excluded.entitlement,
+                    carried_over = excluded.carried_over
+            ''', {'year': year, 'next_year': year + 1, 'first': ids[0], 'last': ids[-1]})
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        processed += len(ids)
+        last_id = ids[-1]
+        if progress:
+            progress(processed)
+    return processed
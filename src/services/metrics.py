@@ -0,0 +1,181 @@
+"""
+Request and SQL instrumentation exposed in Prometheus text format.
+
+Every request is timed and its endpoint's latency histogram updated; the
+pooled connections it used report how many statements ran and how long they
+took to execute. ``/metrics`` renders the lot for a logged-in admin or a
+scraper sending ``Authorization: Bearer <METRICS_TOKEN>``, and with
+METRICS_SERVER_TIMING on each response also carries a ``Server-Timing``
+header for browser devtools.
+
+Metrics live in process memory, so under gunicorn each worker keeps (and
+serves) its own series. Scrape every worker, or sum the series per instance.
+"""
+import bisect
+import hmac
+import threading
+import time
+
+from flask import Response, g, request, session
+
+from database import connection as db
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+SQL_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+
+class Histogram:
+    """A labelled Prometheus histogram; labels are given as a tuple of values."""
+
+    def __init__(self, name, documentation, label_names, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def totals(self, labels):
+        """``(count, sum)`` observed so far for one label set."""
+        with self._lock:
+            series = self._series.get(labels)
+            return (sum(series[:-1]), series[-1]) if series else (0, 0.0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in sorted(snapshot):
+            base = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_count{{{base}}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{base}}} {series[-1]}')
+        return '\n'.join(lines)
+
+
+class Counter:
+    """A labelled Prometheus counter."""
+
+    def __init__(self, name, documentation, label_names):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for labels, value in snapshot:
+            base = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            lines.append(f'{self.name}{{{base}}} {value}')
+        return '\n'.join(lines)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Registry:
+    def __init__(self):
+        self.requests = Counter(
+            'staffsync_requests_total', 'Requests handled, by endpoint, method and status.',
+            ('endpoint', 'method', 'status'))
+        self.latency = Histogram(
+            'staffsync_request_duration_seconds', 'Request latency by endpoint.',
+            ('endpoint', 'method'), LATENCY_BUCKETS)
+        self.queries = Histogram(
+            'staffsync_request_sql_queries', 'SQL statements executed per request.',
+            ('endpoint',), QUERY_COUNT_BUCKETS)
+        self.sql_time = Histogram(
+            'staffsync_request_sql_seconds', 'Time spent executing SQL per request.',
+            ('endpoint',), SQL_TIME_BUCKETS)
+
+    def render(self):
+        metrics = (self.requests, self.latency, self.queries, self.sql_time)
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+def authorized(token):
+    """Whether the request may read /metrics: an admin session, or the bearer ``token`` if one is set."""
+    if session.get('role') == 'admin' and 'user_id' in session:
+        return True
+    supplied = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode())
+
+
+def init_app(app):
+    """Time every request and serve the registry at /metrics when METRICS_ENABLED is set."""
+    app.config.setdefault('METRICS_ENABLED', True)
+    app.config.setdefault('METRICS_SERVER_TIMING', False)
+    app.config.setdefault('METRICS_TOKEN', None)
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    registry = app.extensions['staffsync_metrics'] = Registry()
+    server_timing = app.config['METRICS_SERVER_TIMING']
+
+    @app.before_request
+    def start_request_timer():
+        g._request_started = time.perf_counter()
+        # An app context pushed around the request (CLI, tests) may already hold used connections
+        g._request_queries_base = {id(conn): (getattr(conn, 'query_count', 0), getattr(conn, 'query_seconds', 0.0))
+                                   for conn in db.checked_out_connections()}
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('_request_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        # Unmatched URLs share one label so 404 scans cannot blow up the series count
+        endpoint = request.endpoint or 'unmatched'
+
+        registry.requests.inc((endpoint, request.method, str(response.status_code)))
+        registry.latency.observe((endpoint, request.method), elapsed)
+
+        base = g.pop('_request_queries_base', {})
+        query_count, query_seconds = 0, 0.0
+        for conn in db.checked_out_connections():
+            base_count, base_seconds = base.get(id(conn), (0, 0.0))
+            query_count += getattr(conn, 'query_count', 0) - base_count
+            query_seconds += getattr(conn, 'query_seconds', 0.0) - base_seconds
+        registry.queries.observe((endpoint,), query_count)
+        registry.sql_time.observe((endpoint,), query_seconds)
+
+        if server_timing:
+            response.headers.add('Server-Timing', f'app;dur={elapsed * 1000:.2f}')
+            response.headers.add('Server-Timing',
+                                 f'db;dur={query_seconds * 1000:.2f};desc="{query_count} queries"')
+        return response
+
+    def serve_metrics():
+        if not authorized(app.config['METRICS_TOKEN']):
+            return Response('Forbidden\n', status=403, mimetype='text/plain')
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', serve_metrics)
+
+
+def get_registry(app):
+    return app.extensions.get('staffsync_metrics')
@@ -0,0 +1,249 @@
+"""
+User notifications: leave decisions, processed payslips, attendance corrections.
+
+Notifications are rows in the ``notifications`` table (migration 0010), written
+in the same transaction as the change they report. Each worker process runs
+one ``NotificationBus`` thread that tails the table by id and keeps the latest
+rows in memory. That is the cross-worker fan-out: a row committed by any
+process reaches every process's bus within ``NOTIFICATIONS_POLL_INTERVAL``, and
+the process that wrote it wakes its own bus immediately with ``publish_local``.
+
+Browsers consume the bus two ways. The Server-Sent Events stream holds a
+connection open and is fed from memory, without touching the database per
+client. The plain poll endpoint compares the client's cursor with the bus
+head and answers 304 without a query when nothing is new. The stream is
+capped per process (``NOTIFICATIONS_MAX_STREAMS``) so open tabs cannot take
+every request thread. Clients turned away fall back to polling.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from database import connection as db
+
+logger = logging.getLogger(__name__)
+
+# Rows each bus keeps in memory; a client further behind than this catches up from the table
+BUFFER_SIZE = 1000
+PRUNE_INTERVAL = 3600  # seconds between retention sweeps
+RECONNECT_MS = 3000  # how long EventSource waits before reconnecting a closed stream
+
+
+class StreamLimitReached(Exception):
+    """Raised when a process already serves its maximum number of streams."""
+
+
+def publish(conn, kind, message, user_id=None, role=None, level='info', link=None):
+    """Record a notification for one user, or for everyone with ``role``. The caller commits."""
+    conn.execute('''
+        INSERT INTO notifications (user_id, role, kind, level, message, link)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (user_id, role, kind, level, message, link))
+
+
+def publish_to_employee(conn, employee_id, kind, message, level='info', link=None):
+    """Record a notification for the user account(s) linked to an employee. The caller commits."""
+    conn.execute('''
+        INSERT INTO notifications (user_id, kind, level, message, link)
+        SELECT id, ?, ?, ?, ? FROM users WHERE employee_id = ?
+    ''', (kind, level, message, link, employee_id))
+
+
+def visible_to(notification, user_id, role):
+    if notification['user_id'] is not None:
+        return notification['user_id'] == user_id
+    return notification['role'] is None or notification['role'] == role
+
+
+def to_dict(row):
+    return {key: row[key] for key in ('id', 'kind', 'level', 'message', 'link', 'created_at')}
+
+
+def fetch(conn, user_id, role, after_id, limit=50):
+    """Notifications for the user newer than ``after_id``, oldest first."""
+    rows = conn.execute('''
+        SELECT * FROM notifications
+        WHERE id > ? AND (user_id = ? OR (user_id IS NULL AND (role IS NULL OR role = ?)))
+        ORDER BY id LIMIT ?
+    ''', (after_id, user_id, role, limit)).fetchall()
+    return [to_dict(row) for row in rows]
+
+
+def prune(conn, retention_days):
+    """Delete notifications older than ``retention_days``. The caller commits."""
+    cutoff = (datetime.utcnow() - timedelta(days=retention_days)).strftime('%Y-%m-%d %H:%M:%S')
+    return conn.execute('DELETE FROM notifications WHERE created_at < ?', (cutoff,)).rowcount
+
+
+class NotificationBus:
+    """Tails the notifications table for one process and hands new rows to waiting streams."""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.pid = os.getpid()
+        self.head = 0  # highest notification id seen by this process
+        self.streams = 0
+        self._events = deque(maxlen=BUFFER_SIZE)
+        self._changed = threading.Condition()
+        self._wake = threading.Event()
+
+    def start(self):
+        conn = db.open_connection(self.settings['DATABASE'], self.settings['DATABASE_BUSY_TIMEOUT_MS'],
+                                  serialize_writes=True)
+        self.head = conn.execute('SELECT IFNULL(MAX(id), 0) FROM notifications').fetchone()[0]
+        threading.Thread(target=self._run, args=(conn,), name='notification-bus', daemon=True).start()
+
+    def _run(self, conn):
+        last_prune = 0.0
+        while True:
+            self._wake.wait(self.settings['NOTIFICATIONS_POLL_INTERVAL'])
+            self._wake.clear()
+            try:
+                self._poll(conn)
+                if time.monotonic() - last_prune > PRUNE_INTERVAL:
+                    last_prune = time.monotonic()
+                    prune(conn, self.settings['NOTIFICATIONS_RETENTION_DAYS'])
+                    conn.commit()
+            except Exception:
+                logger.exception('Notification bus could not read new notifications')
+
+    def _poll(self, conn):
+        # A primary-key range scan; nothing new costs one index seek
+        rows = conn.execute('SELECT * FROM notifications WHERE id > ? ORDER BY id', (self.head,)).fetchall()
+        if not rows:
+            return
+        with self._changed:
+            self._events.extend(
+                dict(to_dict(row), user_id=row['user_id'], role=row['role']) for row in rows)
+            self.head = rows[-1]['id']
+            self._changed.notify_all()
+
+    def poke(self):
+        """Read the table now instead of at the next poll, e.g. after this process published."""
+        self._wake.set()
+
+    def wait(self, after_id, timeout):
+        """Buffered notifications newer than ``after_id``, waiting up to ``timeout`` for one.
+
+        Returns ``(events, complete)``. ``complete`` is False when rows after
+        ``after_id`` have already left the buffer, so the caller must read them
+        from the table instead.
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.head > after_id, timeout)
+            if self.head <= after_id:
+                return [], True
+            complete = bool(self._events) and self._events[0]['id'] <= after_id + 1
+            return [event for event in self._events if event['id'] > after_id], complete
+
+    def open_stream(self):
+        with self._changed:
+            if self.streams >= self.settings['NOTIFICATIONS_MAX_STREAMS']:
+                raise StreamLimitReached()
+            self.streams += 1
+
+    def close_stream(self):
+        with self._changed:
+            self.streams -= 1
+
+
+def format_event(notification):
+    return f"id: {notification['id']}\nevent: notification\ndata: {json.dumps(notification)}\n\n"
+
+
+def catch_up(conn, bus, user_id, role, after_id, limit=50):
+    """Read the user's notifications after ``after_id`` from the table.
+
+    Returns ``(notifications, cursor)``. ``cursor`` is the id everything up to
+    which has now been checked for this user. It can run past the last row
+    returned, so a client with nothing new is not sent back to the table again.
+    """
+    head = bus.head  # every row up to here was committed before the read below
+    notifications = fetch(conn, user_id, role, after_id, limit)
+    if len(notifications) == limit:
+        return notifications, notifications[-1]['id']
+    return notifications, max([after_id, head] + [n['id'] for n in notifications[-1:]])
+
+
+def poll(conn, bus, user_id, role, after_id):
+    """Like ``catch_up``, but served from the bus buffer when it reaches back to ``after_id``."""
+    events, complete = bus.wait(after_id, 0)
+    if not complete:
+        return catch_up(conn, bus, user_id, role, after_id)
+    if not events:
+        return [], after_id
+    return [to_dict(event) for event in events if visible_to(event, user_id, role)], events[-1]['id']
+
+
+def stream(bus, user_id, role, cursor, backlog, timeout, keepalive):
+    """Yield Server-Sent Events for the user until ``timeout`` seconds have passed.
+
+    ``backlog`` and ``cursor`` come from ``catch_up``. Ending the response is
+    routine: EventSource reconnects and sends back the last ``id`` it saw.
+    The caller has already counted the stream with ``bus.open_stream()``.
+    """
+    try:
+        yield f'retry: {RECONNECT_MS}\n\n'
+        for notification in backlog:
+            yield format_event(notification)
+        # A bare id frame moves the browser's Last-Event-ID up to everything already checked
+        yield f'id: {cursor}\n\n'
+
+        deadline = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            events, complete = bus.wait(cursor, min(keepalive, remaining))
+            if not complete:
+                return  # fell behind the buffer; the reconnect catches up from the table
+            if not events:
+                yield ': keepalive\n\n'
+                continue
+            for event in events:
+                if visible_to(event, user_id, role):
+                    yield format_event(to_dict(event))
+            cursor = events[-1]['id']
+            yield f'id: {cursor}\n\n'
+    finally:
+        bus.close_stream()
+
+
+def bus_settings(app):
+    keys = ('DATABASE', 'DATABASE_BUSY_TIMEOUT_MS', 'NOTIFICATIONS_POLL_INTERVAL',
+            'NOTIFICATIONS_RETENTION_DAYS', 'NOTIFICATIONS_MAX_STREAMS')
+    return {key: app.config[key] for key in keys}
+
+
+_bus_lock = threading.Lock()
+
+
+def get_bus(app):
+    """This process's bus, started on first use (threads do not survive a fork)."""
+    bus = app.extensions.get('staffsync_notifications')
+    if bus is not None and bus.pid == os.getpid():
+        return bus
+    with _bus_lock:
+        bus = app.extensions.get('staffsync_notifications')
+        if bus is None or bus.pid != os.getpid():
+            bus = NotificationBus(bus_settings(app))
+            bus.start()
+            app.extensions['staffsync_notifications'] = bus
+    return bus
+
+
+def publish_local(app):
+    """Wake this process's bus after committing a notification so local streams get it at once."""
+    bus = app.extensions.get('staffsync_notifications')
+    if bus is not None and bus.pid == os.getpid():
+        bus.poke()
+
+
+def init_app(app):
+    app.config.setdefault('NOTIFICATIONS_STREAM', True)
+    app.config.setdefault('NOTIFICATIONS_MAX_STREAMS', 32)
+    app.config.setdefault('NOTIFICATIONS_STREAM_TIMEOUT', 300)
+    app.config.setdefault('NOTIFICATIONS_KEEPALIVE', 15)
+    app.config.setdefault('NOTIFICATIONS_POLL_INTERVAL', 1.0)
+    app.config.setdefault('NOTIFICATIONS_RETENTION_DAYS', 30)
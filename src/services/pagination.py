@@ -0,0 +1,106 @@
+"""
+Keyset (seek) pagination for the admin list pages.
+
+Instead of OFFSET, each page continues from the sort key of the last row the
+client saw, so every page costs the same index seek no matter how deep into
+the list it is. Cursors are opaque url-safe tokens holding ``[sort_value, id]``.
+"""
+import base64
+import binascii
+import json
+from collections import namedtuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+Page = namedtuple('Page', ['rows', 'next_cursor', 'prev_cursor'])
+
+# Integers SQLite can bind
+_MIN_INTEGER, _MAX_INTEGER = -2 ** 63, 2 ** 63 - 1
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Clamp a requested page size to 1..MAX_PAGE_SIZE."""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return the cursor values, or None for a missing or malformed token."""
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != 2:
+        return None
+    if not all(_bindable(value) for value in values):
+        return None
+    return values
+
+
+def _bindable(value):
+    """Whether a decoded cursor value can be bound as an SQL parameter."""
+    if isinstance(value, int):
+        return _MIN_INTEGER <= value <= _MAX_INTEGER
+    return value is None or isinstance(value, (str, float))
+
+
+def keyset_page(conn, select, where, params, sort_expr, tiebreak='id',
+                descending=False, after=None, before=None, limit=DEFAULT_PAGE_SIZE):
+    """Fetch one page of ``select`` ordered by ``(sort_expr, tiebreak)``.
+
+    ``select`` is everything up to (not including) WHERE, ``where`` a list of
+    SQL conditions joined with AND, and ``after``/``before`` decoded cursors.
+    ``sort_expr`` must produce the column named ``_sort_key`` in ``select`` so
+    cursors can be built from the fetched rows.
+    """
+    after, before = decode_cursor(after), decode_cursor(before)
+    conditions, args = list(where), list(params)
+
+    # Paging backwards walks the index in the opposite direction and flips the page afterwards
+    backwards = before is not None and after is None
+    cursor = before if backwards else after
+    scan_descending = descending != backwards
+    if cursor is not None:
+        # Equivalent to (sort_expr, tiebreak) > (?, ?), spelled out so the planner can
+        # seek expression indexes on the leading bound instead of scanning them
+        op = '<' if scan_descending else '>'
+        conditions.append(f'{sort_expr} {op}= ? AND ({sort_expr} {op} ? OR {tiebreak} {op} ?)')
+        args.extend([cursor[0], cursor[0], cursor[1]])
+
+    direction = 'DESC' if scan_descending else 'ASC'
+    sql = select
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += f' ORDER BY {sort_expr} {direction}, {tiebreak} {direction} LIMIT ?'
+    rows = conn.execute(sql, args + [limit + 1]).fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+
+    if not rows:
+        return Page(rows, None, None)
+
+    first = encode_cursor((rows[0]['_sort_key'], rows[0]['id']))
+    last = encode_cursor((rows[-1]['_sort_key'], rows[-1]['id']))
+    if backwards:
+        return Page(rows, last, first if has_more else None)
+    return Page(rows, last if has_more else None, first if cursor is not None else None)
+
+
+def contains_pattern(text):
+    """LIKE pattern matching ``text`` anywhere, with wildcards escaped (use ESCAPE '\\')."""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
@@ -0,0 +1,77 @@
+"""
+Password hashing with a cap on concurrent work.
+
+Hashing and verification are CPU-bound and deliberately slow. They run on the
+request thread (hashlib releases the GIL while it works), but a semaphore
+caps how many run at once per process. When every slot stays busy past the
+queue timeout, callers get ``HashingBusy`` instead of queueing a whole login
+burst behind each other.
+
+Whether a stored hash needs upgrading is read from its method string, which
+is compared with the configured method as werkzeug would write it; no hash
+is computed for the check.
+"""
+import threading
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    """No hashing slot became free within the configured timeout."""
+
+
+def stored_method(method):
+    """The method string werkzeug stores for ``method``, e.g. 'pbkdf2' -> 'pbkdf2:sha256:600000'."""
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        return f'scrypt:{2 ** 15}:8:1'
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    return method
+
+
+class PasswordHasher:
+    def __init__(self, method, salt_length=16, concurrency=2, queue_timeout=5.0):
+        self.method = method
+        self.salt_length = salt_length
+        self.concurrency = concurrency
+        self.queue_timeout = queue_timeout
+        self.method_prefix = stored_method(method)
+        self._slots = threading.BoundedSemaphore(concurrency)
+
+    def _run(self, timeout, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout if timeout is None else timeout):
+            raise HashingBusy()
+        try:
+            return fn(*args)
+        finally:
+            self._slots.release()
+
+    def hash(self, password, timeout=None):
+        """Hash ``password``; ``timeout`` overrides how long to wait for a slot (0: only if one is free)."""
+        return self._run(timeout, generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, password_hash, password):
+        return self._run(None, check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when a stored hash was made with different parameters than configured."""
+        return password_hash.split('$', 1)[0] != self.method_prefix
+
+
+def init_app(app):
+    app.config.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    app.config.setdefault('PASSWORD_SALT_LENGTH', 16)
+    app.config.setdefault('PASSWORD_HASH_CONCURRENCY', 2)
+    app.config.setdefault('PASSWORD_HASH_QUEUE_TIMEOUT', 5.0)
+    app.extensions['staffsync_passwords'] = PasswordHasher(
+        app.config['PASSWORD_HASH_METHOD'],
+        salt_length=app.config['PASSWORD_SALT_LENGTH'],
+        concurrency=app.config['PASSWORD_HASH_CONCURRENCY'],
+        queue_timeout=app.config['PASSWORD_HASH_QUEUE_TIMEOUT'])
+
+
+def get_hasher(app):
+    return app.extensions['staffsync_passwords']
@@ -0,0 +1,171 @@
+"""
+Monthly attendance rollups.
+
+Migration 0007 keeps ``attendance_monthly`` current with triggers. This
+module answers range questions from it: whole months inside the range come
+from the rollup rows, and only the partial months at either end are summed
+from raw ``attendance``. It can also compare the rollups against the raw data
+and rebuild them.
+
+Raw rows may sit in the hot table or in archive files (``services.archive``).
+Callers holding a connection pass ``archive.segments(conn, start, end)`` as
+``pieces`` so the edges are read from wherever their dates live; rollups for
+archived months stay in ``attendance_monthly``.
+"""
+from datetime import date, timedelta
+
+from services import archive
+
+ROLLUP_COLUMNS = ('days_present', 'late_count', 'absent_count', 'total_hours', 'overtime_hours')
+
+# The same classification the triggers apply, as aggregates over raw attendance rows
+RAW_AGGREGATES = {
+    'days_present': "SUM(IFNULL(lower(status) IN ('present', 'late', 'half_day'), 0))",
+    'late_count': "SUM(IFNULL(lower(status) = 'late', 0))",
+    'absent_count': "SUM(IFNULL(lower(status) = 'absent', 0))",
+    'total_hours': 'SUM(IFNULL(total_hours, 0))',
+    'overtime_hours': 'SUM(IFNULL(overtime_hours, 0))',
+}
+
+# Incremental REAL sums pick up rounding noise; differences below this are not drift
+TOLERANCE = 1e-6
+
+
+def split_range(start, end):
+    """Split the inclusive ISO date range into raw-row edges and whole months.
+
+    Returns ``(months, edges)``: ``months`` is a ``(first, last)`` pair of
+    'YYYY-MM' strings or None, and ``edges`` a list of inclusive date ranges
+    still to be read from raw attendance.
+    """
+    start_day, end_day = date.fromisoformat(start), date.fromisoformat(end)
+    if start_day > end_day:
+        return None, []
+
+    # Whole months run from ``first`` up to (not including) ``after_last``
+    first = start_day if start_day.day == 1 else _next_month(start_day)
+    if _next_month(end_day) - timedelta(days=1) == end_day:
+        after_last = _next_month(end_day)
+    else:
+        after_last = end_day.replace(day=1)
+    if first >= after_last:
+        return None, [(start, end)]
+
+    edges = []
+    if start_day < first:
+        edges.append((start, (first - timedelta(days=1)).isoformat()))
+    if after_last <= end_day:
+        edges.append((after_last.isoformat(), end))
+    last = after_last - timedelta(days=1)
+    return (first.strftime('%Y-%m'), last.strftime('%Y-%m')), edges
+
+
+def _next_month(day):
+    return date(day.year + (day.month == 12), day.month % 12 + 1, 1)
+
+
+def _edge_pieces(edges, pieces):
+    if pieces is None:
+        return [(archive.HOT_TABLE, edge_start, edge_end) for edge_start, edge_end in edges]
+    return [piece for edge_start, edge_end in edges for piece in archive.clip(pieces, edge_start, edge_end)]
+
+
+def range_totals_query(start, end, columns=ROLLUP_COLUMNS, employee_id=None, pieces=None):
+    """``(sql, params)`` for a query yielding ``employee_id`` plus ``columns`` summed over the range."""
+    months, edges = split_range(start, end)
+    employee_filter = ' AND employee_id = ?' if employee_id is not None else ' AND employee_id IS NOT NULL'
+    employee_params = (employee_id,) if employee_id is not None else ()
+
+    parts, params = [], []
+    if months:
+        parts.append(f"SELECT employee_id, {', '.join(columns)} FROM attendance_monthly "
+                     f"WHERE month BETWEEN ? AND ?{employee_filter}")
+        params.extend(months + employee_params)
+    for table, edge_start, edge_end in _edge_pieces(edges, pieces):
+        aggregates = ', '.join(f'{RAW_AGGREGATES[column]} AS {column}' for column in columns)
+        parts.append(f'SELECT employee_id, {aggregates} FROM {table} '
+                     f'WHERE date BETWEEN ? AND ?{employee_filter} GROUP BY employee_id')
+        params.extend((edge_start, edge_end) + employee_params)
+    if not parts:
+        parts.append(f"SELECT NULL AS employee_id, {', '.join('0' for _ in columns)} WHERE 0")
+
+    sums = ', '.join(f'SUM({column}) AS {column}' for column in columns)
+    sql = f"SELECT employee_id, {sums} FROM ({' UNION ALL '.join(parts)}) GROUP BY employee_id"
+    return sql, params
+
+
+def range_totals(conn, start, end, employee_id=None):
+    """Per-employee totals for the range as ``{employee_id: {column: value}}``."""
+    sql, params = range_totals_query(start, end, employee_id=employee_id,
+                                     pieces=archive.segments(conn, start, end))
+    return {row[0]: dict(zip(ROLLUP_COLUMNS, row[1:])) for row in conn.execute(sql, params)}
+
+
+def employee_sum_expression(column, start, end, employee_ref='e.id', pieces=None):
+    """``(sql, params)`` for a scalar expression summing ``column`` over the range for one employee.
+
+    Meant to be correlated with an outer employees query (``employee_ref``):
+    every part is an index-only seek, into idx_attendance_monthly_employee for
+    whole months and idx_attendance_employee_date_hours (which archive files
+    have too) for the edges. Only the hour columns are covered by both indexes.
+    """
+    if column not in ('total_hours', 'overtime_hours'):
+        raise ValueError(f'No covering index for {column}')
+    months, edges = split_range(start, end)
+    parts, params = [], []
+    if months:
+        parts.append(f'(SELECT IFNULL(SUM(m.{column}), 0) FROM attendance_monthly m '
+                     f'WHERE m.employee_id = {employee_ref} AND m.month BETWEEN ? AND ?)')
+        params.extend(months)
+    for table, edge_start, edge_end in _edge_pieces(edges, pieces):
+        parts.append(f'(SELECT IFNULL(SUM(a.{column}), 0) FROM {table} a '
+                     f'WHERE a.employee_id = {employee_ref} AND a.date BETWEEN ? AND ?)')
+        params.extend((edge_start, edge_end))
+    return ' + '.join(parts) or '0', params
+
+
+def _raw_rollups_query(conn):
+    """``(sql, params)`` grouping every raw row, hot and archived, into rollup rows."""
+    aggregates = ', '.join(RAW_AGGREGATES[column] for column in ROLLUP_COLUMNS)
+    rows, params = archive.source(conn, ('employee_id', 'date', 'status', 'total_hours', 'overtime_hours'))
+    return f'''
+        SELECT substr(date, 1, 7), employee_id, {aggregates}
+        FROM {rows} WHERE employee_id IS NOT NULL
+        GROUP BY substr(date, 1, 7), employee_id
+    ''', params
+
+
+def _raw_rollups(conn):
+    sql, params = _raw_rollups_query(conn)
+    return {(row[0], row[1]): row[2:] for row in conn.execute(sql, params)}
+
+
+def verify(conn):
+    """Compare every rollup row with the raw data.
+
+    Returns ``(month, employee_id, column, stored, actual)`` for each difference.
+    """
+    actual = _raw_rollups(conn)
+    stored = {(row[0], row[1]): row[2:] for row in conn.execute(
+        f"SELECT month, employee_id, {', '.join(ROLLUP_COLUMNS)} FROM attendance_monthly")}
+    zeros = (0,) * len(ROLLUP_COLUMNS)
+
+    mismatches = []
+    for key in sorted(set(actual) | set(stored), key=str):
+        for column, have, want in zip(ROLLUP_COLUMNS, stored.get(key, zeros), actual.get(key, zeros)):
+            if abs((have or 0) - (want or 0)) > TOLERANCE:
+                mismatches.append((key[0], key[1], column, have, want))
+    return mismatches
+
+
+def rebuild(conn):
+    """Recompute every rollup row from raw attendance. Returns the rows that had drifted.
+
+    The caller commits.
+    """
+    drifted = sorted({(month, employee_id) for month, employee_id, *_ in verify(conn)}, key=str)
+    sql, params = _raw_rollups_query(conn)
+    conn.execute('DELETE FROM attendance_monthly')
+    conn.execute(f"INSERT INTO attendance_monthly (month, employee_id, {', '.join(ROLLUP_COLUMNS)}) {sql}",
+                 params)
+    return drifted
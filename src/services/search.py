@@ -0,0 +1,81 @@
+"""
+Employee search.
+
+Queries run against the employees_fts index (migration 0014) instead of LIKE
+scans over the table. The user's text is split into words the way the index
+tokenizes, and every word becomes a quoted prefix term that must match, so
+"jo smi" finds John Smith and punctuation or FTS syntax in the input cannot
+break the query. Results are ranked by bm25 with names weighted above email,
+position and department.
+
+Only the first RANK_WINDOW matches in id order are scored, which keeps a
+one- or two-letter prefix cheap. Pages continue from the rank and id of the
+last row returned, with cursors encoded like the list pages' (see
+``services.pagination``).
+"""
+import re
+
+from services import pagination
+
+DEFAULT_LIMIT = 20
+
+# bm25 weights in employees_fts column order: first_name, last_name, email, position, department
+RANK_FUNCTION = 'bm25(10.0, 10.0, 5.0, 2.0, 2.0)'
+
+# Matches ranked per query. Broad prefixes ("j") match a large share of the table and
+# scoring all of them costs far more than the page; past this, narrow the query or use
+# the list page filter, which is not ranked
+RANK_WINDOW = 500
+
+# Longer queries are cut down rather than rejected; the first words narrow the results enough
+MAX_TERMS = 8
+
+# unicode61 splits on everything that is not a letter or digit, underscores included
+_WORD = re.compile(r'[^\W_]+')
+
+# For the admin list filter; takes a match_query() expression
+MATCH_CONDITION = 'id IN (SELECT rowid FROM employees_fts WHERE employees_fts MATCH ?)'
+
+
+def match_query(text):
+    """The FTS5 MATCH expression for ``text``, or None when it holds no searchable word."""
+    words = _WORD.findall(text or '')[:MAX_TERMS]
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_employees(conn, text, limit=DEFAULT_LIMIT, cursor=None):
+    """One page of employees matching ``text``, best match first.
+
+    Only the first RANK_WINDOW matches are ranked and returned. Returns
+    ``(rows, next_cursor)``; pass ``next_cursor`` back to get the page after.
+    """
+    query = match_query(text)
+    if query is None:
+        return [], None
+
+    conditions, params = [], [query, RANK_FUNCTION, RANK_WINDOW]
+    after = pagination.decode_cursor(cursor)
+    if after is not None:
+        conditions.append('(f.rank > ? OR (f.rank = ? AND f.rowid > ?))')
+        params.extend([after[0], after[0], after[1]])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    # Matches come off the index in rowid order; the window stops a one-letter query from
+    # scoring and sorting a large part of the table
+    rows = conn.execute(f'''
+        SELECT e.id, e.first_name, e.last_name, e.email, e.position, e.department, e.status, f.rank
+        FROM (SELECT rowid, rank FROM employees_fts WHERE employees_fts MATCH ? AND rank MATCH ? LIMIT ?) f
+        JOIN employees e ON e.id = f.rowid
+        {where}
+        ORDER BY f.rank, f.rowid
+        LIMIT ?
+    ''', params + [limit + 1]).fetchall()
+
+    has_more = len(rows) > limit
+    rows = [dict(row) for row in rows[:limit]]
+    next_cursor = pagination.encode_cursor((rows[-1]['rank'], rows[-1]['id'])) if has_more else None
+    for row in rows:
+        del row['rank']
+    return rows, next_cursor
@@ -0,0 +1,192 @@
+"""
+Company and system settings.
+
+Settings are key/value rows in the ``settings`` table (migration 0013). Each
+process keeps all of them in memory and they are read from there. Every
+write bumps the ``settings_version`` row, so a process can tell that its copy
+is stale, even after a change saved by another gunicorn worker, by reading
+that one integer. It is read once per request, and only by requests that use
+a setting. The table itself is reloaded only when the number has moved.
+
+Working hours, time zone and currency feed attendance and payroll
+calculations through ``payroll_rates``, ``now``, ``today`` and
+``overtime_hours``.
+"""
+import json
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from flask import current_app, g, has_app_context, has_request_context
+
+from services import payroll as payroll_engine
+
+DEFAULTS = {
+    'company_name': 'StaffSync Corporation',
+    'company_email': 'admin@staffsync.com',
+    'company_phone': '+1 (555) 123-4567',
+    'company_website': 'https://staffsync.com',
+    'company_address': '123 Business Street, Suite 100\nCity, State 12345\nCountry',
+    'timezone': '',  # server local time
+    'date_format': 'MM/DD/YYYY',
+    'currency': 'USD',
+    'working_hours': 8,
+    'email_notifications': True,
+    'auto_backup': True,
+    'two_factor_auth': False,
+}
+
+COMPANY_FIELDS = ('company_name', 'company_email', 'company_phone', 'company_website', 'company_address')
+SYSTEM_FIELDS = ('timezone', 'date_format', 'currency', 'working_hours',
+                 'email_notifications', 'auto_backup', 'two_factor_auth')
+FLAGS = ('email_notifications', 'auto_backup', 'two_factor_auth')
+
+CURRENCY_SYMBOLS = {'USD': '$', 'EUR': '€', 'GBP': '£', 'JPY': '¥', 'CAD': 'CA$'}
+DATE_FORMATS = {'MM/DD/YYYY': '%m/%d/%Y', 'DD/MM/YYYY': '%d/%m/%Y', 'YYYY-MM-DD': '%Y-%m-%d'}
+
+
+def read(conn):
+    """Every setting straight from the table, defaults filling any missing key."""
+    values = dict(DEFAULTS)
+    values.update((key, json.loads(value)) for key, value in conn.execute('SELECT key, value FROM settings'))
+    return values
+
+
+def read_version(conn):
+    row = conn.execute('SELECT version FROM settings_version WHERE id = 1').fetchone()
+    return row[0] if row else 0
+
+
+class SettingsCache:
+    """The settings as of ``version``; ``refresh`` reloads them when the stored version differs."""
+
+    def __init__(self):
+        self.version = None
+        self.values = dict(DEFAULTS)
+        self._lock = threading.Lock()
+
+    def refresh(self, conn):
+        version = read_version(conn)
+        if version != self.version:
+            with self._lock:
+                if version != self.version:
+                    # A write landing in between only makes the values newer than the
+                    # version, which costs one extra reload later
+                    self.values, self.version = read(conn), version
+        return self.values
+
+
+def get_cache(app=None):
+    return (app or current_app).extensions['staffsync_settings']
+
+
+def current(conn):
+    """The settings for this request, checking the stored version on first use only.
+
+    Outside a request the version is checked on every call; outside the app
+    (job worker processes) the table is read directly.
+    """
+    if not has_app_context():
+        return read(conn)
+    if not has_request_context():
+        return get_cache().refresh(conn)
+    values = g.get('_settings')
+    if values is None:
+        values = g._settings = get_cache().refresh(conn)
+    return values
+
+
+def get(conn, key):
+    return current(conn)[key]
+
+
+def _parse_working_hours(value):
+    try:
+        hours = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('Working hours must be a number')
+    if not 1 <= hours <= 24:
+        raise ValueError('Working hours must be between 1 and 24')
+    return int(hours) if hours.is_integer() else hours
+
+
+def _parse(key, value):
+    if key in FLAGS:
+        return value in (True, 'on', 'true', 'True', '1', 1)
+    if key == 'working_hours':
+        return _parse_working_hours(value)
+    value = (value or '').strip()
+    if key == 'timezone' and value:
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f'Unknown time zone: {value}')
+    elif key == 'currency' and value not in CURRENCY_SYMBOLS:
+        raise ValueError(f'Unsupported currency: {value}')
+    elif key == 'date_format' and value not in DATE_FORMATS:
+        raise ValueError(f'Unsupported date format: {value}')
+    elif key == 'company_name' and not value:
+        raise ValueError('Company name is required')
+    return value
+
+
+def parse_form(form, fields):
+    """``{key: value}`` for ``fields`` from a submitted form; unchecked boxes are False.
+
+    Raises ValueError for an invalid value.
+    """
+    return {key: _parse(key, form.get(key)) for key in fields if key in FLAGS or key in form}
+
+
+def update(conn, values):
+    """Store ``values`` (already parsed); returns the keys that changed. The caller commits."""
+    stored = read(conn)
+    changed = [key for key, value in values.items() if stored.get(key) != value]
+    conn.executemany('''
+        INSERT INTO settings (key, value) VALUES (?, ?)
+        ON CONFLICT (key) DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP
+    ''', [(key, json.dumps(values[key])) for key in changed])
+    return changed
+
+
+def timezone(values):
+    """The company time zone, or None for server local time (unset or unknown)."""
+    if not values['timezone']:
+        return None
+    try:
+        return ZoneInfo(values['timezone'])
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def now(values):
+    """The current wall-clock time in the company time zone (server local time if it is unset or unknown)."""
+    tz = timezone(values)
+    return datetime.now(tz).replace(tzinfo=None) if tz else datetime.now()
+
+
+def today(values):
+    return now(values).strftime('%Y-%m-%d')
+
+
+def overtime_hours(values, total_hours):
+    """Hours beyond the working day."""
+    return max(0.0, total_hours - values['working_hours'])
+
+
+def payroll_rates(values, base=None):
+    """Payroll rates with the hours per day taken from the working hours setting."""
+    return (base or payroll_engine.DEFAULT_RATES)._replace(hours_per_day=values['working_hours'])
+
+
+def currency_symbol(values):
+    return CURRENCY_SYMBOLS.get(values['currency'], values['currency'])
+
+
+def init_app(app):
+    app.extensions['staffsync_settings'] = SettingsCache()
+
+    @app.before_request
+    def reset_request_settings():
+        # An app context pushed around several requests (CLI, tests) must not carry them over
+        g.pop('_settings', None)
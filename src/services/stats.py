@@ -0,0 +1,67 @@
+"""
+Trigger-maintained dashboard counters.
+
+The counter tables are created and kept current by migration 0004; this
+module reads them and can rebuild them from the base tables if they ever
+drift (for example after rows were changed with triggers disabled).
+"""
+from services import archive
+
+
+def counter(conn, name):
+    row = conn.execute('SELECT value FROM stats_counters WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else 0
+
+
+def attendance_count(conn, day, status):
+    row = conn.execute('SELECT count FROM attendance_daily_counts WHERE date = ? AND status = ?',
+                       (day, status)).fetchone()
+    return row[0] if row else 0
+
+
+def dashboard_counts(conn, day):
+    """Return ``(total_employees, present_today, total_departments)`` for ``day``."""
+    return (counter(conn, 'employees'),
+            attendance_count(conn, day, 'Present'),
+            counter(conn, 'departments'))
+
+
+def _snapshot(conn):
+    return {
+        'counters': dict(conn.execute('SELECT name, value FROM stats_counters').fetchall()),
+        'departments': dict(conn.execute('SELECT department, employees FROM department_counts').fetchall()),
+        'attendance': {(d, s): c for d, s, c in conn.execute(
+            'SELECT date, status, count FROM attendance_daily_counts WHERE count != 0')},
+    }
+
+
+def rebuild(conn):
+    """Recompute every counter from the base tables. Returns the keys that had drifted.
+
+    The caller commits.
+    """
+    before = _snapshot(conn)
+
+    conn.execute('DELETE FROM department_counts')
+    conn.execute('''
+        INSERT INTO department_counts (department, employees)
+        SELECT department, COUNT(*) FROM employees WHERE department IS NOT NULL GROUP BY department
+    ''')
+    conn.execute('DELETE FROM stats_counters')
+    conn.execute("INSERT INTO stats_counters (name, value) SELECT 'employees', COUNT(*) FROM employees")
+    conn.execute("INSERT INTO stats_counters (name, value) SELECT 'departments', COUNT(*) FROM department_counts")
+    # Archived dates keep their counts, so archived rows are counted too
+    rows, params = archive.source(conn, ('date', 'status'))
+    conn.execute('DELETE FROM attendance_daily_counts')
+    conn.execute(f'''
+        INSERT INTO attendance_daily_counts (date, status, count)
+        SELECT date, status, COUNT(*) FROM {rows} WHERE status IS NOT NULL GROUP BY date, status
+    ''', params)
+
+    after = _snapshot(conn)
+    drifted = []
+    for section in after:
+        keys = set(before[section]) | set(after[section])
+        drifted.extend((section, key) for key in sorted(keys, key=str)
+                       if before[section].get(key, 0) != after[section].get(key, 0))
+    return drifted
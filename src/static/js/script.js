@@ -230,9 +230,74 @@ function createPayrollChart(canvas) {
 }
 
 // Notifications
+const NOTIFICATION_CURSOR_KEY = 'staffsyncNotificationCursor';
+const NOTIFICATION_POLL_INTERVAL = 30000;
+
 function initializeNotifications() {
-    // Check for new notifications every 30 seconds
-    setInterval(checkNotifications, 30000);
+    const { notificationStream, notificationPoll } = document.body.dataset;
+    if (!notificationPoll) {
+        return; // Not signed in
+    }
+    
+    if (notificationStream && window.EventSource) {
+        openNotificationStream(notificationStream, notificationPoll);
+    } else {
+        startNotificationPolling(notificationPoll);
+    }
+}
+
+function openNotificationStream(streamUrl, pollUrl) {
+    const cursor = localStorage.getItem(NOTIFICATION_CURSOR_KEY);
+    const source = new EventSource(cursor ? `${streamUrl}?since=${cursor}` : streamUrl);
+    
+    source.addEventListener('notification', event => {
+        const notification = JSON.parse(event.data);
+        rememberNotificationCursor(notification.id);
+        showNotification(escapeHtml(notification.message), notification.level);
+    });
+    
+    source.onerror = () => {
+        // EventSource reconnects on its own; it only closes when the server turns the stream away
+        if (source.readyState === EventSource.CLOSED) {
+            startNotificationPolling(pollUrl);
+        }
+    };
+}
+
+function startNotificationPolling(pollUrl) {
+    const check = async () => {
+        const cursor = localStorage.getItem(NOTIFICATION_CURSOR_KEY);
+        try {
+            const response = await fetch(cursor ? `${pollUrl}?since=${cursor}` : pollUrl);
+            if (response.status === 304 || !response.ok) {
+                return; // Nothing new
+            }
+            const data = await response.json();
+            data.notifications.forEach(notification => {
+                showNotification(escapeHtml(notification.message), notification.level);
+            });
+            rememberNotificationCursor(data.cursor);
+        } catch (error) {
+            console.error('Error checking notifications:', error);
+        }
+    };
+    
+    check();
+    setInterval(check, NOTIFICATION_POLL_INTERVAL);
+}
+
+function escapeHtml(text) {
+    const element = document.createElement('div');
+    element.textContent = text;
+    return element.innerHTML;
+}
+
+function rememberNotificationCursor(id) {
+    // Shared by every open tab, so a notification shown in one is not replayed by the next page load
+    const current = Number(localStorage.getItem(NOTIFICATION_CURSOR_KEY)) || 0;
+    if (id > current) {
+        localStorage.setItem(NOTIFICATION_CURSOR_KEY, id);
+    }
 }
 
 function showNotification(message, type = 'info', duration = 5000) {
@@ -276,21 +341,6 @@ function closeNotification(button) {
     setTimeout(() => notification.remove(), 300);
 }
 
-async function checkNotifications() {
-    try {
-        const response = await fetch('/api/notifications');
-        const data = await response.json();
-        
-        if (data.notifications && data.notifications.length > 0) {
-            data.notifications.forEach(notification => {
-                showNotification(notification.message, notification.type);
-            });
-        }
-    } catch (error) {
-        console.error('Error checking notifications:', error);
-    }
-}
-
 // Employee Management Functions
 function deleteEmployee(employeeId) {
     if (confirm('Are you sure you want to delete this employee?')) {
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from database import connection as db  # noqa: E402
+from database import demo  # noqa: E402
+from database import migrate  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Path of a migrated database holding the demo data."""
+    path = str(tmp_path / 'staffsync.db')
+    conn = db.open_connection(path)
+    migrate.migrate(conn)
+    demo.seed(conn, lambda password: f'plain${password}')
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def conn(database):
+    conn = db.open_connection(database)
+    yield conn
+    conn.close()
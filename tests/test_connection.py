@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from database import connection as db
+
+
+@pytest.mark.parametrize('sql, writes', [
+    ('INSERT INTO t VALUES (1)', True),
+    ('  update t set a = 1', True),
+    ('BEGIN IMMEDIATE', True),
+    ('begin exclusive', True),
+    ('WITH x AS (SELECT 1) INSERT INTO t SELECT * FROM x', True),
+    ('BEGIN', False),
+    ('BEGIN DEFERRED', False),
+    ('SAVEPOINT a', False),
+    ('WITH x AS (SELECT 1) SELECT * FROM x', False),
+    ('SELECT 1', False),
+])
+def test_starts_write(sql, writes):
+    assert db.starts_write(sql) is writes
+
+
+def _writer(database):
+    conn = db.open_connection(database, serialize_writes=True)
+    conn.writer_timeout = 0.5
+    return conn
+
+
+def test_snapshot_on_writer_connection_does_not_block_other_writers(database):
+    reader, writer = _writer(database), _writer(database)
+    errors = []
+
+    def check_in():
+        try:
+            writer.execute("UPDATE employees SET phone = 'snapshot-test' WHERE id = 1")
+            writer.commit()
+        except Exception as e:
+            errors.append(e)
+
+    try:
+        with db.snapshot(reader):
+            before = reader.execute('SELECT phone FROM employees WHERE id = 1').fetchone()[0]
+            assert not reader._holds_writer_lock
+            thread = threading.Thread(target=check_in)
+            thread.start()
+            thread.join()
+            assert not errors
+            # Still reading the snapshot taken before the other writer committed
+            assert reader.execute('SELECT phone FROM employees WHERE id = 1').fetchone()[0] == before
+        assert reader.execute('SELECT phone FROM employees WHERE id = 1').fetchone()[0] == 'snapshot-test'
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_write_inside_deferred_transaction_takes_the_lock(database):
+    conn = _writer(database)
+    try:
+        conn.execute('BEGIN')
+        conn.execute('SELECT COUNT(*) FROM employees').fetchone()
+        assert not conn._holds_writer_lock
+        conn.execute("UPDATE employees SET phone = phone WHERE id = 1")
+        assert conn._holds_writer_lock
+        conn.commit()
+        assert not conn._holds_writer_lock
+        assert db.writer_lock(database).acquire(blocking=False)
+        db.writer_lock(database).release()
+    finally:
+        conn.close()
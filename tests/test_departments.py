@@ -0,0 +1,19 @@
+import pytest
+
+from services import departments
+
+
+def test_utilisation_treats_salaries_as_annual(conn):
+    # Demo IT staff: John Doe 75000, Robert Miller 80000, James Wilson 70000 a year
+    conn.execute("UPDATE departments SET budget = 300000 WHERE name = 'IT'")
+    it = next(d for d in departments.summary(conn) if d['name'] == 'IT')
+
+    assert it['headcount'] == 3
+    assert it['annual_cost'] == 225000
+    assert it['utilisation'] == pytest.approx(0.75)
+
+
+def test_utilisation_is_none_without_budget(conn):
+    sales = next(d for d in departments.summary(conn) if d['name'] == 'Sales')
+    assert sales['annual_cost'] == 55000
+    assert sales['utilisation'] is None
@@ -0,0 +1,36 @@
+import sqlite3
+
+import pytest
+
+from database import connection as db
+from services import jobs
+
+
+@pytest.fixture
+def worker_conn(database):
+    conn = db.open_connection(database, serialize_writes=True)
+    conn.writer_timeout = 0.05
+    yield conn
+    conn.close()
+
+
+def test_claim_on_empty_queue_does_not_take_the_writer_lock(database, worker_conn):
+    lock = db.writer_lock(database)
+    with lock:
+        # A writer holds the lock; an idle poll must not need it
+        assert jobs.claim(worker_conn, 'w1', 300) is None
+    assert not worker_conn.in_transaction
+
+
+def test_claim_takes_queued_job(database, worker_conn, monkeypatch):
+    monkeypatch.setitem(jobs.HANDLERS, 'test.noop', lambda ctx: None)
+    job_id = jobs.submit(worker_conn, 'test.noop')
+    worker_conn.commit()
+
+    with db.writer_lock(database):
+        with pytest.raises(sqlite3.OperationalError):
+            jobs.claim(worker_conn, 'w1', 300)
+
+    job = jobs.claim(worker_conn, 'w1', 300)
+    assert job['id'] == job_id and job['status'] == 'running'
+    assert jobs.claim(worker_conn, 'w2', 300) is None
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from services import export
+from services import leave
+from services import settings
+
+
+def test_export_default_range_uses_company_today(conn, monkeypatch):
+    monkeypatch.setattr(settings, 'now', lambda values: datetime(2031, 1, 2, 0, 30))
+    _, params = export.attendance_query(conn, {})
+    assert params[:2] == ['2031-01-02', '2031-01-02']
+
+
+def test_leave_accrual_uses_company_today(conn, monkeypatch):
+    conn.execute("UPDATE leave_policies SET accrual = 'monthly', annual_allowance = 24 WHERE leave_type = 'annual'")
+    monkeypatch.setattr(settings, 'now', lambda values: datetime(2031, 3, 31, 23, 30))
+    balance = leave.balance(conn, 1)
+    assert balance['entitlement'] == 24
+    assert balance['accrued'] == 6